@@ -0,0 +1,42 @@
+import csv
+import io
+from typing import Iterable, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+INSERT_BATCH_SIZE = 5000
+
+
+def bulk_insert(db: Session, table, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """Insert many rows inside the session's current transaction.
+
+    On Postgres the rows are written as CSV into an in-memory buffer and sent
+    with a single COPY, which is several times faster than multi-row INSERTs.
+    Other dialects (SQLite in tests) fall back to batched executemany.
+    Returns the number of rows written.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+        buffer.seek(0)
+
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+        return len(rows)
+
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[i:i + INSERT_BATCH_SIZE]
+        db.execute(insert(table), [dict(zip(columns, row)) for row in batch])
+    return len(rows)
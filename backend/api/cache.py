@@ -0,0 +1,137 @@
+"""Small in-process result caches keyed on data "topics".
+
+Write paths call `bump("sales")`, `bump("inventory")`, ... after they commit.
+Every cache entry remembers the topic versions it was computed from and is
+treated as a miss as soon as any of them moves. Versions are per process, so
+entries also expire after a TTL to bound staleness from writes made by other
+workers or by scripts outside the API.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Tuple
+
+from fastapi import Request, Response
+
+from api.config import settings
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def bump(*topics: str) -> None:
+    """Mark data under each topic as changed in this process."""
+    with _versions_lock:
+        for topic in topics:
+            _versions[topic] = _versions.get(topic, 0) + 1
+
+
+def versions(topics: Iterable[str]) -> Tuple[int, ...]:
+    return tuple(_versions.get(topic, 0) for topic in topics)
+
+
+class ResultCache:
+    """LRU map of key -> computed value, invalidated by topic versions and TTL."""
+
+    def __init__(self, topics: Iterable[str], ttl: float = 60.0, max_entries: int = 256):
+        self.topics = tuple(topics)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        current = versions(self.topics)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_versions, expires_at = entry
+                if entry_versions == current and now < expires_at:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        # Computed outside the lock so one slow query doesn't serialize every caller
+        value = compute()
+        with self._lock:
+            self._entries[key] = (value, current, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """Pre-serialized JSON bodies with ETags, bounded by TTL and total bytes.
+
+    Used for small, rarely changing reference resources: the body is encoded
+    once per topic version and reused for every request until a write bumps
+    the topic. The ETag is a hash of the body, so it is identical across
+    workers holding the same data and a 304 is always safe.
+    """
+
+    def __init__(self, ttl: float = 0, max_bytes: int = 16 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (body, etag, versions, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, topics: Iterable[str], compute: Callable) -> Tuple[bytes, str]:
+        """Return (body, etag); `compute` must return the encoded body bytes."""
+        current = versions(topics)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, etag, entry_versions, expires_at = entry
+                if entry_versions == current and (not self.ttl or now < expires_at):
+                    self._entries.move_to_end(key)
+                    return body, etag
+                self._evict(key)
+
+        body = compute()
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        if len(body) <= self.max_bytes:
+            with self._lock:
+                if key in self._entries:
+                    self._evict(key)
+                self._entries[key] = (body, etag, current, now + self.ttl)
+                self._bytes += len(body)
+                while self._bytes > self.max_bytes:
+                    self._evict(next(iter(self._entries)))
+        return body, etag
+
+    def _evict(self, key) -> None:
+        body = self._entries.pop(key)[0]
+        self._bytes -= len(body)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+reference_cache = ResponseCache(
+    ttl=settings.reference_cache_ttl_seconds, max_bytes=settings.reference_cache_max_bytes
+)
+
+
+def reference_response(request: Request, resource: str, compute: Callable) -> Response:
+    """Serve a cached reference resource, answering If-None-Match with 304.
+
+    `resource` doubles as the cache key and the invalidation topic, so the
+    matching POST handler only has to call `bump(resource)`.
+    """
+    body, etag = reference_cache.get_or_compute(resource, (resource,), compute)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,298 @@
+"""Live order and sale events, pushed to WebSocket subscribers.
+
+Write paths call `publish(db, event_type, rows)` inside their transaction.
+Each event is appended to live_events, so a reconnecting client can resume
+from the last id it saw, and on Postgres announced with pg_notify on the
+"live_events" channel. Both only become visible when the transaction commits.
+
+Every worker keeps one LISTEN connection, opened for its first subscriber,
+and fans each notification out to the WebSocket clients whose region,
+location and type filters match. A client that falls more than
+LIVE_EVENTS_MAX_PENDING events behind is disconnected and resumes with
+last_event_id. Other databases have no NOTIFY, so committed events are handed
+to this process's hub directly.
+
+Event ids are assigned at insert, so two concurrent transactions can commit
+in the opposite order of their ids and a resume may skip an event committed
+a moment after a later one. Clients should treat events as a cue to update,
+not as a ledger.
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import bindparam, delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from api.config import settings
+from api.database import SessionLocal, engine
+from api.models import LiveEvent, Location
+from api.pagination import dumps
+
+logger = logging.getLogger("api.events")
+
+CHANNEL = "live_events"
+EVENT_TYPES = ("order_created", "order_status", "sale", "sales_batch")
+# Sent instead of a replay the server can't complete; the client should refetch
+RESYNC = {"type": "resync"}
+
+REPLAY_LIMIT = 1000
+SEEN_IDS = 10_000
+HEALTHCHECK_SECONDS = 30
+_PENDING_KEY = "live_events"
+
+
+def _envelope(event_id, event_type, location_id, region_id, payload, created_at) -> dict:
+    return {
+        "id": event_id,
+        "type": event_type,
+        "location_id": location_id,
+        "region_id": region_id,
+        "at": created_at,
+        "data": payload,
+    }
+
+
+def publish(db: Session, event_type: str, rows: List[dict], at: Optional[datetime] = None) -> None:
+    """Queue one event per row (each carrying its location_id) with the current transaction. Does not commit."""
+    if not rows:
+        return
+    at = at or datetime.utcnow()
+    region_id = select(Location.region_id).where(Location.location_id == bindparam("b_location_id")).scalar_subquery()
+    created = db.execute(
+        insert(LiveEvent)
+        .values(
+            event_type=event_type,
+            location_id=bindparam("b_location_id"),
+            region_id=region_id,
+            payload=bindparam("b_payload"),
+            created_at=at,
+        )
+        .returning(LiveEvent.event_id, LiveEvent.region_id, sort_by_parameter_order=True),
+        [
+            # Round-trip through orjson so datetimes and Decimals are stored as JSON
+            {"b_location_id": row.get("location_id"), "b_payload": orjson.loads(dumps(row))}
+            for row in rows
+        ],
+    ).all()
+    envelopes = [
+        _envelope(event_id, event_type, row.get("location_id"), row_region_id, row, at)
+        for (event_id, row_region_id), row in zip(created, rows)
+    ]
+
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": CHANNEL, "payloads": [dumps(envelope).decode() for envelope in envelopes]},
+        )
+    else:
+        db.info.setdefault(_PENDING_KEY, []).extend(orjson.loads(dumps(envelope)) for envelope in envelopes)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        hub.dispatch_threadsafe(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def replay(
+    after: int,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    types: FrozenSet[str] = frozenset(),
+    limit: int = REPLAY_LIMIT,
+) -> Tuple[List[dict], bool]:
+    """Stored events after `after`, oldest first, and whether that is all of them.
+
+    The replay is incomplete when more than `limit` events match or when the
+    events right after `after` have already been pruned.
+    """
+    query = select(
+        LiveEvent.event_id, LiveEvent.event_type, LiveEvent.location_id,
+        LiveEvent.region_id, LiveEvent.payload, LiveEvent.created_at,
+    ).where(LiveEvent.event_id > after)
+    if location_id:
+        query = query.where(LiveEvent.location_id == location_id)
+    elif region_id:
+        query = query.where(LiveEvent.region_id == region_id)
+    if types:
+        query = query.where(LiveEvent.event_type.in_(types))
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(query.order_by(LiveEvent.event_id).limit(limit + 1)).all()
+        oldest = db.execute(select(func.min(LiveEvent.event_id))).scalar()
+    finally:
+        db.close()
+    complete = len(rows) <= limit and (oldest is None or oldest <= after + 1)
+    return [orjson.loads(dumps(_envelope(*row))) for row in rows[:limit]], complete
+
+
+def prune(retention_hours: Optional[float] = None) -> int:
+    """Delete events older than the retention period (the hourly "prune-live-events" job). Commits."""
+    hours = settings.live_events_retention_hours if retention_hours is None else retention_hours
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(LiveEvent).where(LiveEvent.created_at < datetime.utcnow() - timedelta(hours=hours))
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    return deleted
+
+
+class Subscription:
+    """One WebSocket client's filters and the events queued for it."""
+
+    __slots__ = ("region_id", "location_id", "types", "pending", "ready", "overflowed")
+
+    def __init__(self, region_id: Optional[int], location_id: Optional[int], types: FrozenSet[str]):
+        self.region_id = region_id
+        self.location_id = location_id
+        self.types = types
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+    def matches(self, item: dict) -> bool:
+        if self.types and item["type"] not in self.types:
+            return False
+        if self.location_id:
+            return item["location_id"] == self.location_id
+        if self.region_id:
+            return item["region_id"] == self.region_id
+        return True
+
+    def push(self, item: dict) -> None:
+        if len(self.pending) >= settings.live_events_max_pending:
+            self.overflowed = True
+        else:
+            self.pending.append(item)
+        self.ready.set()
+
+    async def next(self) -> Optional[dict]:
+        """The next event, or None once the client has fallen too far behind."""
+        while not self.pending and not self.overflowed:
+            self.ready.clear()
+            await self.ready.wait()
+        if self.overflowed:
+            return None
+        return self.pending.popleft()
+
+
+class EventHub:
+    """Per-worker fan-out from one LISTEN connection to many subscriptions."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+        self._listener = None
+        self._seen = OrderedDict()  # recent ids, to drop replays that overlap notifications
+        self._last_event_id = None
+
+    def subscribe(
+        self, region_id: Optional[int] = None, location_id: Optional[int] = None, types: Iterable[str] = ()
+    ) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        if self._listener is None and engine.dialect.name == "postgresql":
+            self._listener = self._loop.create_task(self._listen())
+        subscription = Subscription(region_id, location_id, frozenset(types))
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def dispatch(self, events: Iterable[dict]) -> None:
+        for item in events:
+            if item["id"] in self._seen:
+                continue
+            self._seen[item["id"]] = None
+            if len(self._seen) > SEEN_IDS:
+                self._seen.popitem(last=False)
+            self._last_event_id = max(self._last_event_id or 0, item["id"])
+            for subscription in self._subscribers:
+                if subscription.matches(item):
+                    subscription.push(item)
+
+    def dispatch_threadsafe(self, events: List[dict]) -> None:
+        """Hand events committed on a worker thread to the event loop."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.dispatch, events)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncio.to_thread(_listen_connection)
+                conn = connection.dbapi_connection
+                if self._last_event_id is not None:
+                    # Catch up on whatever committed while we were disconnected
+                    missed, _ = await asyncio.to_thread(replay, self._last_event_id)
+                    self.dispatch(missed)
+                delay = 1.0
+
+                readable = asyncio.Event()
+                loop.add_reader(conn.fileno(), readable.set)
+                try:
+                    while True:
+                        try:
+                            await asyncio.wait_for(readable.wait(), HEALTHCHECK_SECONDS)
+                        except asyncio.TimeoutError:
+                            # Quiet channel: make sure the connection is still alive
+                            with conn.cursor() as cursor:
+                                cursor.execute("SELECT 1")
+                        readable.clear()
+                        conn.poll()
+                        if conn.notifies:
+                            notifications = [orjson.loads(notify.payload) for notify in conn.notifies]
+                            conn.notifies.clear()
+                            self.dispatch(notifications)
+                finally:
+                    loop.remove_reader(conn.fileno())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Live event listener failed; reconnecting in %.0fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+def _listen_connection():
+    # A dedicated connection detached from the pool, so listening doesn't hold a pool slot
+    connection = engine.raw_connection()
+    connection.detach()
+    conn = connection.dbapi_connection
+    conn.rollback()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {CHANNEL}")
+    return connection
+
+
+hub = EventHub()
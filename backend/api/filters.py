@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+
+from api.models import Location
+
+
+def scope_to_location(query, location_column, region_id: Optional[int] = None, location_id: Optional[int] = None):
+    """Restrict a query to one location, or to every location in a region.
+
+    Same precedence as the list routes: location_id wins over region_id. The
+    region filter is a sub-select instead of a join so it can be applied to any
+    table that carries a location_id column without clashing with other joins.
+    """
+    if location_id:
+        return query.filter(location_column == location_id)
+    if region_id:
+        region_locations = select(Location.location_id).where(Location.region_id == region_id)
+        return query.filter(location_column.in_(region_locations))
+    return query
+
+
+def resolve_window(
+    start: Optional[datetime], end: Optional[datetime], default_days: int = 30
+) -> Tuple[datetime, datetime]:
+    """Fill in a missing start/end so reporting queries are always bounded in time."""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=default_days)
+    return start, end
@@ -0,0 +1,70 @@
+"""Background jobs run by api.scheduler in every API worker.
+
+Each job takes a session and returns a small JSON-able summary that is
+stored with its run. Times are UTC. Skip any of them in a deployment with
+SCHEDULER_SKIP_JOBS, or run one by hand with `python manage.py run-job NAME`.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from api import events
+from api.config import settings
+from api.models import JobRun
+from api.scheduler import Cron, Every, scheduler
+from api.services import forecasting, inventory_history, partitions, reorder, rollups, spoilage, wastage
+
+
+@scheduler.job("reconcile-rollups", Cron("15 1 * * *"))
+def reconcile_rollups(db: Session) -> dict:
+    """Rebuild the last two days of sales_aggregates and wastage_aggregates from the raw rows."""
+    today = date.today()
+    start, end = today - timedelta(days=2), today - timedelta(days=1)
+    return {"buckets": rollups.rebuild(db, start, end), "wastage_buckets": wastage.rebuild(db, start, end)}
+
+
+@scheduler.job("refresh-forecasts", Cron("30 2 * * *"), lease_seconds=4 * 3600)
+def refresh_forecasts(db: Session) -> dict:
+    """Forecast demand for every active (location, product) series."""
+    return forecasting.run(db)
+
+
+@scheduler.job("checkpoint-inventory", Cron("0 3 * * *"))
+def checkpoint_inventory(db: Session) -> dict:
+    """Snapshot every inventory line for as-of queries."""
+    return inventory_history.checkpoint(db)
+
+
+@scheduler.job("refresh-spoilage-risk", Cron("20 * * * *"), lease_seconds=1800)
+def refresh_spoilage_risk(db: Session) -> dict:
+    """Recompute the spoilage_risk score of every line holding dated stock."""
+    return spoilage.refresh(db)
+
+
+@scheduler.job("maintain-partitions", Cron("30 3 * * *"))
+def maintain_partitions(db: Session) -> dict:
+    """Create the next months' sales and inventory_logs partitions."""
+    return {"created": partitions.ensure(db)}
+
+
+@scheduler.job("reorder", Cron("0 5 * * *"))
+def run_reorder(db: Session) -> dict:
+    """Order stock that has fallen below its reorder point."""
+    result = reorder.run(db)
+    return {"orders": len(result["orders"]), "lines": result["lines"], "units": result["units"]}
+
+
+@scheduler.job("prune-live-events", Every(hours=1), lease_seconds=600)
+def prune_live_events(db: Session) -> dict:
+    """Delete live events past LIVE_EVENTS_RETENTION_HOURS."""
+    return {"deleted": events.prune()}
+
+
+@scheduler.job("prune-job-runs", Cron("45 3 * * *"), lease_seconds=600)
+def prune_job_runs(db: Session) -> dict:
+    """Delete job history past JOB_RUNS_RETENTION_DAYS."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.job_runs_retention_days)
+    deleted = db.execute(delete(JobRun).where(JobRun.started_at < cutoff)).rowcount
+    db.commit()
+    return {"deleted": deleted}
@@ -1,8 +1,35 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import locations, product, inventory, sales, orders, regions, suppliers
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api import database, events, jobs, metrics
+from api.config import settings
+from api.routes import locations, product, inventory, sales, orders, regions, suppliers, dashboard, exports, forecasts, jobs as job_routes, live, pricing, system, transfers, wastage
+
+
+logger = logging.getLogger("api.main")
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        # ✅ Connect before the first request instead of during it
+        await asyncio.to_thread(database.warm_pools, settings.db_pool_warm_connections)
+    except Exception:
+        logger.warning("Could not pre-warm the connection pool; /readyz reports it until the database is up", exc_info=True)
+    await jobs.scheduler.start()  # ✅ Background jobs; a lease per job keeps them to one worker
+    yield
+    # In-flight requests have drained by now (uvicorn waits up to SHUTDOWN_GRACE_SECONDS)
+    await jobs.scheduler.stop()
+    await events.hub.close()  # ✅ Stop this worker's LISTEN connection
+    database.engine.dispose()
+    database.read_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,6 +39,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency covers CORS handling and streaming bodies
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Each router is now included with its dedicated prefix.
 app.include_router(regions.router, prefix="/api/regions", tags=["Regions"])
 app.include_router(locations.router, prefix="/api/locations", tags=["Locations"])
@@ -20,7 +51,39 @@ app.include_router(inventory.router, prefix="/api/inventory", tags=["Inventory"]
 app.include_router(sales.router, prefix="/api/sales", tags=["Sales"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(suppliers.router, prefix="/api/suppliers", tags=["Suppliers"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(forecasts.router, prefix="/api/forecasts", tags=["Forecasts"])
+app.include_router(pricing.router, prefix="/api/pricing", tags=["Pricing"])
+app.include_router(transfers.router, prefix="/api/transfers", tags=["Transfers"])
+app.include_router(wastage.router, prefix="/api/wastage", tags=["Wastage"])
+app.include_router(exports.router, prefix="/api/exports", tags=["Exports"])
+app.include_router(live.router, prefix="/api/events", tags=["Events"])
+app.include_router(job_routes.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(system.router, prefix="/api/system", tags=["System"])
 
 @app.get("/")
 def home():
     return {"message": "Grocery Inventory API is running!"}
+
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker's event loop is answering. Never touches the database."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Readiness: every engine can reach the database. A saturated pool is reported, not unready."""
+    checks = database.check_pools()
+    ready = not any(check.startswith("unavailable") for check in checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint for this worker."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
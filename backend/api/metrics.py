@@ -0,0 +1,245 @@
+"""Per-request latency, response size and SQL instrumentation for /metrics.
+
+`MetricsMiddleware` times every HTTP request and tracks the response size and
+the SQL statements it issued. SQL is counted by engine-wide
+before/after_cursor_execute hooks, which attribute each statement to the
+request running in the current context. Sync route handlers run in the
+threadpool with a copy of the context, so they report to the same request.
+
+Requests slower than SLOW_REQUEST_MS are logged together with their slowest
+statements on the "api.slow_requests" logger.
+
+Everything is aggregated in memory per process and rendered in the Prometheus
+text format by `render()`; with several workers, each one reports its own
+series. Recording is a few list increments under one lock per request, so it
+is meant to stay on in production.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api import cache
+from api.config import settings
+from api.database import pool_stats
+
+logger = logging.getLogger("api.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow log; later ones are only counted
+MAX_CAPTURED_STATEMENTS = 100
+SLOW_LOG_STATEMENTS = 5
+
+
+class Histogram:
+    """Prometheus-style histogram: per-bucket counts plus sum and count."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """SQL issued while serving one request."""
+
+    __slots__ = ("statements", "sql_seconds", "captured")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.captured = []  # (seconds, statement)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_lock = threading.Lock()
+_latency = {}  # (method, route, status) -> Histogram
+_size = {}  # (method, route) -> Histogram
+_statements = {}  # (method, route) -> Histogram
+_sql_seconds = {}  # (method, route) -> float
+_slow = {}  # (method, route) -> int
+_background = {"statements": 0, "seconds": 0.0}  # SQL outside any request (CLI, jobs)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        with _lock:
+            _background["statements"] += 1
+            _background["seconds"] += elapsed
+        return
+    stats.statements += 1
+    stats.sql_seconds += elapsed
+    if len(stats.captured) < MAX_CAPTURED_STATEMENTS:
+        stats.captured.append((elapsed, statement))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _record(scope, status, size, time.perf_counter() - started, stats)
+
+
+def _record(scope, status: int, size: int, elapsed: float, stats: RequestStats) -> None:
+    # The route template (not the raw path) keeps label cardinality bounded
+    route = getattr(scope.get("route"), "path", None) or "unmatched"
+    method = scope["method"]
+    key = (method, route)
+    slow = elapsed * 1000 >= settings.slow_request_ms
+
+    with _lock:
+        latency = _latency.get((method, route, status))
+        if latency is None:
+            latency = _latency[(method, route, status)] = Histogram(LATENCY_BUCKETS)
+            _size[key] = _size.get(key) or Histogram(SIZE_BUCKETS)
+            _statements[key] = _statements.get(key) or Histogram(STATEMENT_BUCKETS)
+        latency.observe(elapsed)
+        _size[key].observe(size)
+        _statements[key].observe(stats.statements)
+        _sql_seconds[key] = _sql_seconds.get(key, 0.0) + stats.sql_seconds
+        if slow:
+            _slow[key] = _slow.get(key, 0) + 1
+
+    if slow:
+        _log_slow_request(scope, status, elapsed, stats)
+
+
+def _log_slow_request(scope, status: int, elapsed: float, stats: RequestStats) -> None:
+    # Group identical statements so an N+1 shows up as one line with a count
+    grouped = {}
+    for seconds, statement in stats.captured:
+        entry = grouped.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+    slowest = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:SLOW_LOG_STATEMENTS]
+
+    path = scope["path"] + ("?" + scope["query_string"].decode() if scope.get("query_string") else "")
+    lines = [
+        f"Slow request: {scope['method']} {path} -> {status} in {elapsed * 1000:.0f} ms, "
+        f"{stats.statements} SQL statements ({stats.sql_seconds * 1000:.0f} ms)"
+    ]
+    for statement, (count, seconds) in slowest:
+        lines.append(f"  {seconds * 1000:8.1f} ms  x{count:<4} {' '.join(statement.split())[:500]}")
+    logger.warning("\n".join(lines))
+
+
+def _labels(**labels) -> str:
+    escaped = {name: str(value).replace("\\", "\\\\").replace('"', '\\"') for name, value in labels.items()}
+    return ",".join(f'{name}="{value}"' for name, value in escaped.items())
+
+
+def _render_histogram(lines, name: str, help_text: str, series: dict, label_names) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(series.items()):
+        labels = _labels(**dict(zip(label_names, key)))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def render() -> str:
+    """All metrics for this process in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        _render_histogram(lines, "http_request_duration_seconds", "Request latency, to the last body byte.",
+                          _latency, ("method", "route", "status"))
+        _render_histogram(lines, "http_response_size_bytes", "Response body size.", _size, ("method", "route"))
+        _render_histogram(lines, "db_statements_per_request", "SQL statements issued per request.",
+                          _statements, ("method", "route"))
+
+        lines.append("# HELP db_statement_seconds_total Time spent in SQL, by route.")
+        lines.append("# TYPE db_statement_seconds_total counter")
+        for (method, route), seconds in sorted(_sql_seconds.items()):
+            lines.append(f"db_statement_seconds_total{{{_labels(method=method, route=route)}}} {seconds}")
+
+        lines.append(f"# HELP http_slow_requests_total Requests slower than {settings.slow_request_ms:g} ms.")
+        lines.append("# TYPE http_slow_requests_total counter")
+        for (method, route), count in sorted(_slow.items()):
+            lines.append(f"http_slow_requests_total{{{_labels(method=method, route=route)}}} {count}")
+
+        lines.append("# HELP db_background_statements_total SQL statements issued outside HTTP requests.")
+        lines.append("# TYPE db_background_statements_total counter")
+        lines.append(f"db_background_statements_total {_background['statements']}")
+        lines.append("# HELP db_background_statement_seconds_total Time spent in SQL outside HTTP requests.")
+        lines.append("# TYPE db_background_statement_seconds_total counter")
+        lines.append(f"db_background_statement_seconds_total {_background['seconds']}")
+
+    gauges = {
+        "db_pool_size": ("Configured pool size.", "size"),
+        "db_pool_checked_out": ("Connections currently in use.", "checked_out"),
+        "db_pool_overflow": ("Connections open beyond the pool size.", "overflow"),
+        "db_pool_max_checked_out": ("High-water mark of connections in use.", "max_checked_out"),
+        "db_pool_checkouts_total": ("Connection checkouts since startup.", "checkouts"),
+        "db_pool_connects_total": ("New database connections opened.", "connects"),
+    }
+    pools = pool_stats()
+    for name, (help_text, field) in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        for engine_name, stats in pools.items():
+            if field in stats:
+                lines.append(f"{name}{{{_labels(engine=engine_name)}}} {stats[field]}")
+
+    reference = cache.reference_cache.stats()
+    lines.append("# HELP reference_cache_bytes Bytes held by the reference data cache.")
+    lines.append("# TYPE reference_cache_bytes gauge")
+    lines.append(f"reference_cache_bytes {reference['bytes']}")
+    lines.append("# HELP reference_cache_entries Entries in the reference data cache.")
+    lines.append("# TYPE reference_cache_entries gauge")
+    lines.append(f"reference_cache_entries {reference['entries']}")
+
+    return "\n".join(lines) + "\n"
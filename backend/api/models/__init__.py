@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DECIMAL, TIMESTAMP
+from sqlalchemy import Column, Integer, String, ForeignKey, DECIMAL, TIMESTAMP, Date, Float, JSON, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from api.database import Base
 from sqlalchemy.sql import func
@@ -36,7 +36,7 @@ class Product(Base):
     product_id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     category_id = Column(Integer)
-    supplier_id = Column(Integer, ForeignKey("supplier.supplier_id"))
+    supplier_id = Column(Integer, ForeignKey("suppliers.supplier_id"))
     price = Column(DECIMAL(10,2))
     shelf_life_days = Column(Integer) 
     reorder_point = Column(Integer)
@@ -46,6 +46,8 @@ class Product(Base):
 
 class Inventory(Base):
     __tablename__ = "inventory"
+    # One line per (location, product): stock.increment upserts against it
+    __table_args__ = (UniqueConstraint("location_id", "product_id", name="uq_inventory_location_product"),)
 
     inventory_id = Column(Integer, primary_key=True, index=True)
     location_id = Column(Integer, ForeignKey("locations.location_id"))
@@ -56,6 +58,20 @@ class Inventory(Base):
     location = relationship("Location", back_populates="inventory")
     product = relationship("Product", back_populates="inventory")
 
+class InventoryLot(Base):
+    """One received batch of a product at a location; `inventory` holds the per-product totals."""
+    __tablename__ = "inventory_lots"
+
+    lot_id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("locations.location_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    quantity = Column(Integer, nullable=False)
+    received_at = Column(TIMESTAMP, server_default=func.now())
+    expires_on = Column(Date)
+
+    location = relationship("Location")
+    product = relationship("Product")
+
 class Sales(Base):
     __tablename__ = "sales"
 
@@ -79,4 +95,132 @@ class Orders(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())  
 
     location = relationship("Location", back_populates="orders")
-    supplier = relationship("Supplier", back_populates="orders") 
+    supplier = relationship("Supplier", back_populates="orders")
+    items = relationship("OrderItem", back_populates="order")
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    order_item_id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.order_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    quantity = Column(Integer, nullable=False)
+    price = Column(DECIMAL(10, 2), nullable=False)
+
+    order = relationship("Orders", back_populates="items")
+
+class SalesAggregate(Base):
+    """Per-(location, product, day) sales bucket maintained by api.services.rollups."""
+    __tablename__ = "sales_aggregates"
+
+    location_id = Column(Integer, ForeignKey("locations.location_id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    sale_date = Column(Date, primary_key=True)
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+    sale_count = Column(Integer, nullable=False, default=0)
+
+class ForecastingResult(Base):
+    __tablename__ = "forecasting_results"
+
+    forecast_id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("locations.location_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    predicted_demand = Column(Integer, nullable=False)
+    confidence_level = Column(DECIMAL(5, 2))
+    timestamp = Column(TIMESTAMP, server_default=func.now())
+
+class InventoryLog(Base):
+    __tablename__ = "inventory_logs"
+
+    log_id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("locations.location_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    quantity_change = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    timestamp = Column(TIMESTAMP, server_default=func.now())
+
+class InventoryCheckpoint(Base):
+    __tablename__ = "inventory_checkpoints"
+
+    checkpoint_at = Column(TIMESTAMP, primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.location_id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+
+class StockTransfer(Base):
+    __tablename__ = "stock_transfers"
+
+    transfer_id = Column(Integer, primary_key=True, index=True)
+    from_location = Column(Integer, ForeignKey("locations.location_id"))
+    to_location = Column(Integer, ForeignKey("locations.location_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    quantity = Column(Integer, nullable=False)
+    timestamp = Column(TIMESTAMP, server_default=func.now())
+
+class WastageRecord(Base):
+    __tablename__ = "wastage_records"
+
+    wastage_id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("locations.location_id"))
+    product_id = Column(Integer, ForeignKey("products.product_id"))
+    quantity = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    timestamp = Column(TIMESTAMP, server_default=func.now())
+
+class WastageAggregate(Base):
+    """Per-(location, product, reason, day) wastage bucket maintained by api.services.wastage."""
+    __tablename__ = "wastage_aggregates"
+
+    location_id = Column(Integer, ForeignKey("locations.location_id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    reason = Column(String, primary_key=True)
+    waste_date = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+
+class SpoilageRisk(Base):
+    """Expected spoilage per inventory line, recomputed in bulk by api.services.spoilage."""
+    __tablename__ = "spoilage_risk"
+
+    location_id = Column(Integer, ForeignKey("locations.location_id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.product_id"), primary_key=True)
+    on_hand = Column(Integer, nullable=False)
+    daily_velocity = Column(Float, nullable=False)
+    days_of_cover = Column(Float)
+    next_expiry = Column(Date, nullable=False)
+    at_risk_units = Column(Integer, nullable=False)
+    at_risk_value = Column(DECIMAL(12, 2), nullable=False)
+    risk_score = Column(Float, nullable=False)
+    computed_at = Column(TIMESTAMP, nullable=False)
+
+class LiveEvent(Base):
+    __tablename__ = "live_events"
+
+    event_id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    location_id = Column(Integer)
+    region_id = Column(Integer)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    job_name = Column(String, primary_key=True)
+    next_run_at = Column(TIMESTAMP, nullable=False)
+    leased_by = Column(String)
+    leased_until = Column(TIMESTAMP)
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    run_id = Column(Integer, primary_key=True)
+    job_name = Column(String, nullable=False)
+    worker = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    started_at = Column(TIMESTAMP, nullable=False)
+    finished_at = Column(TIMESTAMP)
+    duration_ms = Column(Float)
+    result = Column(JSON)
+    error = Column(Text)
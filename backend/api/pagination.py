@@ -0,0 +1,78 @@
+from decimal import Decimal
+from typing import Callable, Optional
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api.database import ReadSessionLocal
+
+# Rows fetched per round trip when streaming, and the default page size when a
+# client passes `after` without an explicit `limit`.
+STREAM_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def dumps(value) -> bytes:
+    """orjson with Decimal support (datetimes are handled natively)."""
+    return orjson.dumps(value, default=_orjson_default)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON rendered by `dumps`. Returning one directly also skips FastAPI's `jsonable_encoder` pass."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def keyset_page(query, key_column, after: Optional[int], limit: Optional[int], serialize: Callable):
+    """Return one page ordered by `key_column`, starting strictly after `after`.
+
+    One extra row is fetched to know whether another page exists; the cursor
+    is the key of the last row returned, so the next request is an index range
+    scan no matter how deep into the table the client is.
+    """
+    limit = limit or DEFAULT_PAGE_SIZE
+    if after is not None:
+        query = query.filter(key_column > after)
+    rows = query.order_by(key_column).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    items = [serialize(row) for row in rows[:limit]]
+    next_cursor = getattr(rows[limit - 1], key_column.key) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def ndjson_response(build_query: Callable, key_column, after: Optional[int], serialize: Callable):
+    """Stream every matching row as newline-delimited JSON.
+
+    The request-scoped session from `get_read_db` is closed before a streaming body
+    is sent, so the generator owns its own session. Rows are read through a
+    server-side cursor (`yield_per`) and written out one batch at a time, which
+    keeps worker memory flat regardless of how many rows are exported.
+    """
+
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            query = build_query(db)
+            if after is not None:
+                query = query.filter(key_column > after)
+            batch = []
+            for row in query.order_by(key_column).yield_per(STREAM_BATCH_SIZE):
+                batch.append(dumps(serialize(row)))
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield b"\n".join(batch) + b"\n"
+                    batch = []
+            if batch:
+                yield b"\n".join(batch) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
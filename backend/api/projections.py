@@ -0,0 +1,74 @@
+"""Column projections for the large list endpoints.
+
+A Projection is a fixed list of labelled columns plus a slotted record class
+with one field per column. Rows come back from a Core SELECT as plain tuples
+and go straight into records (`starmap`), so no ORM instances, identity map
+entries or relationship objects are built per row. Responses are rendered
+by orjson, which writes slotted dataclasses and datetimes natively, skipping
+FastAPI's `jsonable_encoder` pass over every value.
+
+Money columns should be cast to Float in the projection: the database then
+hands back floats instead of Decimals that would be converted one by one
+while rendering. The JSON is the same, since Decimals were emitted as floats
+anyway.
+"""
+from dataclasses import make_dataclass
+from itertools import starmap
+from typing import List, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from api.database import ReadSessionLocal
+from api.pagination import DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, ORJSONResponse, dumps
+
+
+class Projection:
+    """Labelled columns and the record type their rows map into."""
+
+    def __init__(self, name: str, *columns):
+        self.columns = columns
+        self.record = make_dataclass(name, [column.key for column in columns], slots=True)
+
+    def select(self) -> Select:
+        return select(*self.columns)
+
+    def records(self, rows) -> List:
+        return list(starmap(self.record, rows))
+
+    def all(self, db: Session, query: Select) -> ORJSONResponse:
+        """Every row of `query` as a JSON list."""
+        return ORJSONResponse(self.records(db.execute(query).tuples()))
+
+    def page(
+        self, db: Session, query: Select, key_column, after: Optional[int], limit: Optional[int]
+    ) -> ORJSONResponse:
+        """One keyset page (`{"items", "next_cursor"}`), like `pagination.keyset_page`."""
+        limit = limit or DEFAULT_PAGE_SIZE
+        if after is not None:
+            query = query.where(key_column > after)
+        rows = db.execute(query.order_by(key_column).limit(limit + 1)).all()
+
+        next_cursor = getattr(rows[limit - 1], key_column.key) if len(rows) > limit else None
+        return ORJSONResponse({"items": self.records(rows[:limit]), "next_cursor": next_cursor})
+
+    def stream(self, query: Select, key_column, after: Optional[int]) -> StreamingResponse:
+        """Every row as NDJSON through a server-side cursor, like `pagination.ndjson_response`.
+
+        The statement is built up front and run on the generator's own session,
+        since the request's session is closed before the body is sent.
+        """
+        if after is not None:
+            query = query.where(key_column > after)
+        query = query.order_by(key_column).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+        def generate():
+            db = ReadSessionLocal()
+            try:
+                for rows in db.execute(query).partitions():
+                    yield b"\n".join(map(dumps, starmap(self.record, rows))) + b"\n"
+            finally:
+                db.close()
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,210 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from api.database import get_read_db
+from api.filters import scope_to_location, resolve_window
+from api.models import Inventory, Location, Orders, Product, SalesAggregate, Supplier
+from api.services import rollups
+from datetime import datetime, timedelta
+from typing import Optional
+
+router = APIRouter()
+
+ORDER_STATUSES = ["Pending", "Shipped", "Delivered", "Cancelled"]
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]):
+    """Half-open [start, end) window snapped out to whole days.
+
+    Sales come from daily buckets, which can't be split, so orders are counted
+    over the same days: start moves back to its midnight and end forward to
+    the next one (an end already at midnight is kept, and excluded).
+    """
+    end = end or datetime.utcnow()
+    midnight = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = midnight if end == midnight else midnight + timedelta(days=1)
+    if start:
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = resolve_window(start, end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+
+@router.get("/summary")
+def get_summary(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    low_stock_threshold: int = Query(20, ge=0),
+    overstock_threshold: int = Query(400, ge=0),
+    recent_hours: int = Query(72, ge=1),
+):
+    """Headline dashboard numbers, aggregated in SQL for the requested window."""
+    start, end = _window(start, end)
+
+    # ✅ Sales totals come from the daily sales_aggregates buckets, not the raw log
+    sales_query = db.query(
+        func.coalesce(func.sum(SalesAggregate.sale_count), 0),
+        func.coalesce(func.sum(SalesAggregate.revenue), 0),
+        func.coalesce(func.sum(SalesAggregate.units_sold), 0),
+    ).filter(SalesAggregate.sale_date >= start.date(), SalesAggregate.sale_date < end.date())
+    sales_query = scope_to_location(sales_query, SalesAggregate.location_id, region_id, location_id)
+    sale_count, revenue, units_sold = sales_query.one()
+    sale_count = int(sale_count)
+
+    orders_query = db.query(Orders.status, func.count(Orders.order_id)).filter(
+        Orders.created_at >= start, Orders.created_at < end
+    )
+    orders_query = scope_to_location(orders_query, Orders.location_id, region_id, location_id)
+    orders_by_status = {status: 0 for status in ORDER_STATUSES}
+    orders_by_status.update(dict(orders_query.group_by(Orders.status).all()))
+
+    recent_query = db.query(func.count(Orders.order_id)).filter(
+        Orders.created_at >= datetime.utcnow() - timedelta(hours=recent_hours)
+    )
+    recent_query = scope_to_location(recent_query, Orders.location_id, region_id, location_id)
+
+    # ✅ One pass over inventory for both stock alert counts
+    stock_query = db.query(
+        func.count(Inventory.inventory_id).filter(Inventory.quantity < low_stock_threshold),
+        func.count(Inventory.inventory_id).filter(Inventory.quantity > overstock_threshold),
+    )
+    stock_query = scope_to_location(stock_query, Inventory.location_id, region_id, location_id)
+    low_stock_count, overstock_count = stock_query.one()
+
+    revenue = float(revenue)
+    return {
+        "start": start,
+        "end": end,
+        "total_revenue": round(revenue, 2),
+        "sale_count": sale_count,
+        "units_sold": int(units_sold),
+        "avg_order_value": round(revenue / sale_count, 2) if sale_count else 0,
+        "orders_by_status": orders_by_status,
+        "recent_orders": recent_query.scalar(),
+        "recent_hours": recent_hours,
+        "low_stock_count": low_stock_count,
+        "overstock_count": overstock_count,
+    }
+
+
+@router.get("/summary/revenue")
+def get_revenue_series(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+):
+    """Daily revenue and units sold for the requested window."""
+    start, end = _window(start, end)
+    # period_totals takes an inclusive last day
+    return [
+        {
+            "date": row["period_start"],
+            "revenue": row["revenue"],
+            "units_sold": row["units_sold"],
+            "sale_count": row["sale_count"],
+        }
+        for row in rollups.period_totals(
+            db, "day", start.date(), end.date() - timedelta(days=1), region_id, location_id
+        )
+    ]
+
+
+@router.get("/summary/orders-by-status")
+def get_orders_by_status(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+):
+    """Order counts per day, pivoted by status (one row per day)."""
+    start, end = _window(start, end)
+    day = func.date(Orders.created_at)
+
+    query = db.query(day.label("date"), Orders.status, func.count(Orders.order_id)).filter(
+        Orders.created_at >= start, Orders.created_at < end
+    )
+    query = scope_to_location(query, Orders.location_id, region_id, location_id)
+
+    series = {}
+    for date, status, count in query.group_by(day, Orders.status).order_by(day).all():
+        row = series.setdefault(str(date), {"date": str(date), **{s: 0 for s in ORDER_STATUSES}})
+        row[status] = count
+    return list(series.values())
+
+
+@router.get("/summary/stock-alerts")
+def get_stock_alerts(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    low_stock_threshold: int = Query(20, ge=0),
+    overstock_threshold: int = Query(400, ge=0),
+    limit: int = Query(25, ge=1, le=500),
+):
+    """Lowest low-stock and highest overstock lines, capped at `limit` each."""
+
+    def top(condition, order):
+        query = (
+            db.query(Inventory.location_id, Inventory.product_id, Product.name, Inventory.quantity)
+            .join(Product, Product.product_id == Inventory.product_id)
+            .filter(condition)
+        )
+        query = scope_to_location(query, Inventory.location_id, region_id, location_id)
+        return [
+            {
+                "location_id": loc_id,
+                "product_id": product_id,
+                "product_name": name,
+                "quantity": quantity,
+            }
+            for loc_id, product_id, name, quantity in query.order_by(order).limit(limit).all()
+        ]
+
+    return {
+        "low_stock": top(Inventory.quantity < low_stock_threshold, Inventory.quantity.asc()),
+        "overstocked": top(Inventory.quantity > overstock_threshold, Inventory.quantity.desc()),
+    }
+
+
+@router.get("/summary/recent-orders")
+def get_recent_orders(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    hours: int = Query(72, ge=1),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Most recent orders within the last `hours`, newest first."""
+    query = (
+        db.query(
+            Orders.order_id,
+            Supplier.name,
+            Location.location_name,
+            Orders.status,
+            Orders.created_at,
+        )
+        .outerjoin(Supplier, Supplier.supplier_id == Orders.supplier_id)
+        .outerjoin(Location, Location.location_id == Orders.location_id)
+        .filter(Orders.created_at >= datetime.utcnow() - timedelta(hours=hours))
+    )
+    query = scope_to_location(query, Orders.location_id, region_id, location_id)
+
+    return [
+        {
+            "order_id": order_id,
+            "supplier_name": supplier_name or "Unknown",
+            "location_name": location_name or "Unknown",
+            "status": status,
+            "created_at": created_at,
+        }
+        for order_id, supplier_name, location_name, status, created_at in query.order_by(
+            Orders.created_at.desc()
+        ).limit(limit).all()
+    ]
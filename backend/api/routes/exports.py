@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from api.filters import resolve_window
+from api.services import exports
+from datetime import datetime
+from typing import Optional
+
+router = APIRouter()
+
+
+@router.get("/{kind}")
+def export_csv(
+    kind: str,
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    start: Optional[datetime] = Query(None, description="Rows at or after this time (default: 30 days before end)"),
+    end: Optional[datetime] = Query(None, description="Rows before this time (default: now)"),
+):
+    """Download sales, orders or inventory_logs for a time window as a gzip'd CSV file."""
+    if kind not in exports.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{kind}'; use one of {', '.join(exports.EXPORTS)}")
+    start, end = resolve_window(start, end)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    query = exports.build_query(kind, start, end, region_id, location_id)
+    permit = exports.acquire()
+    if permit is None:
+        raise HTTPException(status_code=429, detail="Too many exports running, try again shortly",
+                            headers={"Retry-After": "30"})
+    filename = f"{kind}_{start:%Y%m%d}_{end:%Y%m%d}.csv.gz"
+    return StreamingResponse(
+        exports.stream(query, permit),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        # ✅ Also frees the slot if the client disconnects before the body starts
+        background=BackgroundTask(permit.release),
+    )
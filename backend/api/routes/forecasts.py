@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from api.database import get_db, get_read_db
+from api.services import forecasting
+from typing import Optional
+
+router = APIRouter()
+
+@router.get("/")
+def get_forecasts(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+):
+    """Latest demand forecast per location/product, highest predicted demand first."""
+    return forecasting.latest(db, region_id, location_id, product_id, limit)
+
+
+@router.post("/run")
+def run_forecasts(
+    db: Session = Depends(get_db),
+    horizon: int = Query(7, ge=1, le=90),
+    history_days: int = Query(56, ge=7, le=730),
+    method: str = Query("auto"),
+):
+    """Fit every (location, product) series and store a fresh batch of forecasts."""
+    if method not in forecasting.METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(forecasting.METHODS)}")
+    return forecasting.run(db, horizon=horizon, history_days=history_days, method=method)
@@ -1,40 +1,149 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from api.database import get_db
-from api.models import Inventory, Product, Location
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from api.database import get_read_db
+from api.filters import scope_to_location
+from api.pagination import MAX_PAGE_SIZE, keyset_page
+from api.projections import Projection
+from api.models import Inventory, InventoryLot, Product, Location
+from api.services import inventory_history
+from datetime import date, datetime, timedelta
 from typing import Optional
 
 router = APIRouter()
 
+_INVENTORY = Projection(
+    "InventoryRow",
+    Inventory.inventory_id,
+    Inventory.location_id,
+    Location.location_name,
+    Inventory.product_id,
+    Product.name.label("product_name"),
+    Inventory.quantity,
+    Inventory.last_updated,
+)
+
+
+def _inventory_query(region_id: Optional[int], location_id: Optional[int]):
+    query = (
+        _INVENTORY.select()
+        .outerjoin(Location, Location.location_id == Inventory.location_id)  # ✅ Just the names, no Location/Product objects
+        .outerjoin(Product, Product.product_id == Inventory.product_id)
+    )
+    return scope_to_location(query, Inventory.location_id, region_id, location_id)
+
+
 @router.api_route("/", methods=["GET", "HEAD"])
 def get_inventory(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     region_id: Optional[int] = Query(None),
     location_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="inventory_id cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every row as NDJSON"),
+    as_of: Optional[datetime] = Query(None, description="Stock on hand at this moment instead of now"),
 ):
-    """Fetch inventory, optionally filtering by region or location."""
-    query = db.query(Inventory).options(
-        joinedload(Inventory.location),  # ✅ Fetch Location details
-        joinedload(Inventory.product),  # ✅ Fetch Product details
-    )
+    """Fetch inventory, optionally filtering by region or location.
 
-    if location_id:
-        query = query.filter(Inventory.location_id == location_id)
-    elif region_id:
-        query = query.join(Location).filter(Location.region_id == region_id)
+    Pass `limit`/`after` for keyset pages (`{"items", "next_cursor"}`) or
+    `stream=true` for an NDJSON export; without either the full list is returned.
+    `as_of` returns the full list as it stood then, rebuilt from the nearest
+    inventory checkpoint and the logs in between.
+    """
+    if request.method == "HEAD":
+        return Response(media_type="application/json")  # ✅ Probes get headers only, no query
+    if as_of is not None:
+        return inventory_history.as_of(db, as_of, region_id, location_id)
+
+    query = _inventory_query(region_id, location_id)
+    if stream:
+        return _INVENTORY.stream(query, Inventory.inventory_id, after)
+    if limit is not None or after is not None:
+        return _INVENTORY.page(db, query, Inventory.inventory_id, after, limit)
+
+    return _INVENTORY.all(db, query)
+
+
+@router.get("/expiring")
+def get_expiring_lots(
+    db: Session = Depends(get_read_db),
+    days: int = Query(7, ge=0, le=365, description="Lots expiring within this many days"),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    include_expired: bool = Query(False, description="Also return open lots already past their expiry"),
+    limit: int = Query(1000, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Open lots expiring soon, per location, soonest first.
 
-    inventory = query.all()
+    Served by a range scan on the partial (location_id, expires_on) index over
+    lots that still hold stock.
+    """
+    today = date.today()
+    query = (
+        select(
+            InventoryLot.lot_id,
+            InventoryLot.location_id,
+            Location.location_name,
+            InventoryLot.product_id,
+            Product.name,
+            InventoryLot.quantity,
+            InventoryLot.received_at,
+            InventoryLot.expires_on,
+        )
+        .join(Location, Location.location_id == InventoryLot.location_id)
+        .join(Product, Product.product_id == InventoryLot.product_id)
+        .where(InventoryLot.quantity > 0, InventoryLot.expires_on <= today + timedelta(days=days))
+    )
+    if not include_expired:
+        query = query.where(InventoryLot.expires_on >= today)
+    query = scope_to_location(query, InventoryLot.location_id, region_id, location_id)
+    rows = db.execute(
+        query.order_by(InventoryLot.location_id, InventoryLot.expires_on, InventoryLot.lot_id).limit(limit)
+    ).all()
 
-    # ✅ Convert to dictionaries for JSON serialization
     return [
         {
-            "inventory_id": item.inventory_id,
-            "location_id": item.location_id,
-            "location_name": item.location.location_name if item.location else None,
-            "product_id": item.product_id,
-            "product_name": item.product.name if item.product else None,
-            "quantity": item.quantity,
-            "last_updated": item.last_updated,
+            "lot_id": lot_id,
+            "location_id": lot_location_id,
+            "location_name": location_name,
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": quantity,
+            "received_at": received_at,
+            "expires_on": expires_on,
+            "days_left": (expires_on - today).days,
         }
-        for item in inventory
+        for lot_id, lot_location_id, location_name, product_id, product_name, quantity, received_at, expires_on in rows
     ]
+
+
+def _serialize_lot(lot):
+    return {
+        "lot_id": lot.lot_id,
+        "location_id": lot.location_id,
+        "product_id": lot.product_id,
+        "quantity": lot.quantity,
+        "received_at": lot.received_at,
+        "expires_on": lot.expires_on,
+    }
+
+
+@router.get("/lots")
+def get_lots(
+    db: Session = Depends(get_read_db),
+    location_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    include_empty: bool = Query(False, description="Include fully depleted lots"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="lot_id cursor from the previous page"),
+):
+    """Lot-level stock behind the aggregated inventory, as keyset pages."""
+    query = db.query(InventoryLot)
+    if location_id:
+        query = query.filter(InventoryLot.location_id == location_id)
+    if product_id:
+        query = query.filter(InventoryLot.product_id == product_id)
+    if not include_empty:
+        query = query.filter(InventoryLot.quantity > 0)
+    return keyset_page(query, InventoryLot.lot_id, after, limit, _serialize_lot)
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from api.database import get_db
+from api.jobs import scheduler
+from api.models import JobLease, JobRun
+from api.scheduler import FAILED, RUN_STATUSES
+from datetime import datetime, timedelta
+from typing import Optional
+
+router = APIRouter()
+
+
+def _run(row) -> dict:
+    return {
+        "run_id": row.run_id,
+        "job_name": row.job_name,
+        "worker": row.worker,
+        "status": row.status,
+        "started_at": row.started_at,
+        "finished_at": row.finished_at,
+        "duration_ms": row.duration_ms,
+        "result": row.result,
+        "error": row.error,
+    }
+
+
+@router.get("/")
+def get_jobs(db: Session = Depends(get_db), days: int = Query(7, ge=1, le=90)):
+    """Registered jobs with their schedule, lease, last run and recent run statistics."""
+    # Leases and history are read from the primary, where the scheduler writes them
+    leases = {lease.job_name: lease for lease in db.query(JobLease).all()}
+    since = datetime.utcnow() - timedelta(days=days)
+    stats = {
+        job_name: (runs, failures, avg_ms, max_ms)
+        for job_name, runs, failures, avg_ms, max_ms in db.execute(
+            select(
+                JobRun.job_name,
+                func.count(JobRun.run_id),
+                func.count(JobRun.run_id).filter(JobRun.status == FAILED),
+                func.avg(JobRun.duration_ms),
+                func.max(JobRun.duration_ms),
+            )
+            .where(JobRun.started_at >= since)
+            .group_by(JobRun.job_name)
+        ).all()
+    }
+    latest = select(func.max(JobRun.run_id)).group_by(JobRun.job_name)
+    last_runs = {run.job_name: run for run in db.query(JobRun).filter(JobRun.run_id.in_(latest)).all()}
+
+    enabled = {job.name for job in scheduler.enabled_jobs()}
+    jobs = []
+    for job in scheduler.jobs.values():
+        lease = leases.get(job.name)
+        runs, failures, avg_ms, max_ms = stats.get(job.name, (0, 0, None, None))
+        last_run = last_runs.get(job.name)
+        jobs.append({
+            "name": job.name,
+            "description": job.description,
+            "schedule": str(job.schedule),
+            "enabled": job.name in enabled,
+            "next_run_at": lease.next_run_at if lease else None,
+            "leased_by": lease.leased_by if lease else None,
+            "leased_until": lease.leased_until if lease else None,
+            "last_run": _run(last_run) if last_run else None,
+            "runs": runs,
+            "failures": failures,
+            "avg_duration_ms": round(float(avg_ms), 1) if avg_ms is not None else None,
+            "max_duration_ms": round(float(max_ms), 1) if max_ms is not None else None,
+        })
+    return {"days": days, "jobs": jobs}
+
+
+@router.get("/runs")
+def get_job_runs(
+    db: Session = Depends(get_db),
+    job_name: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    before: Optional[int] = Query(None, description="Only runs with a smaller run_id (the previous page's next_cursor)"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Job run history, newest first."""
+    if status and status not in RUN_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(RUN_STATUSES)}")
+    query = db.query(JobRun)
+    if job_name:
+        query = query.filter(JobRun.job_name == job_name)
+    if status:
+        query = query.filter(JobRun.status == status)
+    if before is not None:
+        query = query.filter(JobRun.run_id < before)
+    rows = query.order_by(JobRun.run_id.desc()).limit(limit + 1).all()
+    items = [_run(row) for row in rows[:limit]]
+    next_cursor = items[-1]["run_id"] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.post("/{job_name}/run")
+def trigger_job(job_name: str, db: Session = Depends(get_db)):
+    """Make a job due now; the next worker to poll runs it."""
+    if job_name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_name": job_name, "next_run_at": scheduler.trigger(db, job_name)}
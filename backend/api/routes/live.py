@@ -0,0 +1,75 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from api import events
+from api.pagination import dumps
+
+router = APIRouter()
+
+
+async def _forward(websocket: WebSocket, subscription: events.Subscription, skip: set):
+    while True:
+        item = await subscription.next()
+        if item is None:
+            await websocket.close(code=1013, reason="Too far behind; reconnect with last_event_id")
+            return
+        if item["id"] not in skip:
+            await websocket.send_text(dumps(item).decode())
+
+
+async def _until_disconnect(websocket: WebSocket):
+    # Clients only listen; reading is how a closed connection gets noticed
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws")
+async def live_events(
+    websocket: WebSocket,
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    types: Optional[str] = Query(None, description="Comma-separated event types (default: all)"),
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id"),
+):
+    """Push new orders, order status changes and sales as they commit.
+
+    Every message is one event: `{"id", "type", "location_id", "region_id",
+    "at", "data"}`. Reconnecting clients pass the last id they saw to get what
+    they missed first; a `{"type": "resync"}` message means the gap couldn't be
+    replayed and the client should refetch instead.
+    """
+    wanted = frozenset(name for name in (types or "").split(",") if name)
+    if wanted - set(events.EVENT_TYPES):
+        await websocket.close(code=1008, reason=f"types must be among {', '.join(events.EVENT_TYPES)}")
+        return
+
+    await websocket.accept()
+    # Subscribe before replaying so nothing committed in between is lost
+    subscription = events.hub.subscribe(region_id, location_id, wanted)
+    tasks = set()
+    try:
+        replayed = set()
+        if last_event_id is not None:
+            backlog, complete = await run_in_threadpool(events.replay, last_event_id, region_id, location_id, wanted)
+            if not complete:
+                await websocket.send_text(dumps(events.RESYNC).decode())
+            for item in backlog:
+                await websocket.send_text(dumps(item).decode())
+            replayed = {item["id"] for item in backlog}
+
+        tasks = {
+            asyncio.ensure_future(_forward(websocket, subscription, replayed)),
+            asyncio.ensure_future(_until_disconnect(websocket)),
+        }
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        events.hub.unsubscribe(subscription)
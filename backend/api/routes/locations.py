@@ -1,14 +1,36 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from api.database import get_db
+from api import cache
+from api.database import get_db, get_read_db
 from api.models import Location
+from api.pagination import dumps
+from api.services import scorecards
 
 router = APIRouter()
 
 # Using GET (which FastAPI will automatically support HEAD as well)
 @router.api_route("/", methods=["GET", "HEAD"])
-def get_locations(db: Session = Depends(get_db)):
-    return db.query(Location).all()
+def get_locations(request: Request, db: Session = Depends(get_read_db)):
+    """Fetch all locations (cached in-process, revalidated with ETag/If-None-Match)."""
+
+    def load():
+        locations = db.query(
+            Location.location_id, Location.location_name, Location.region_id
+        ).order_by(Location.location_id).all()
+        return dumps([
+            {"location_id": location_id, "location_name": location_name, "region_id": region_id}
+            for location_id, location_name, region_id in locations
+        ])
+
+    return cache.reference_response(request, "locations", load)
+
+@router.get("/{location_id}/scorecard")
+def get_location_scorecard(location_id: int, days: int = Query(30, ge=1, le=365), db: Session = Depends(get_read_db)):
+    """One location's scorecard next to its region's totals."""
+    scorecard = scorecards.location_scorecard(db, location_id, days)
+    if scorecard is None:
+        raise HTTPException(status_code=404, detail="Location not found")
+    return scorecard
 
 # Change the POST route to a relative path so that the prefix from main.py is applied.
 @router.post("/")
@@ -17,4 +39,5 @@ def create_location(location_name: str, region_id: int, db: Session = Depends(ge
     db.add(location)
     db.commit()
     db.refresh(location)
-    return location
\ No newline at end of file
+    cache.bump("locations")
+    return location
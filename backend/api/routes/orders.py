@@ -1,81 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import Optional
-from api.database import get_db
-from api.models import Orders, Location, Supplier
-from pydantic import BaseModel
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from api.database import get_db, get_read_db
+from api.filters import scope_to_location
+from api.pagination import MAX_PAGE_SIZE
+from api.projections import Projection
+from api.models import Orders, OrderItem, Location, Product, Supplier
+from api.services import purchase_orders, reorder
+from pydantic import BaseModel, Field
+from decimal import Decimal
 
 router = APIRouter()
 
+class OrderLine(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+    # Defaults to the product's current price
+    price: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+
 # ✅ Define Pydantic model for request body
 class OrderCreate(BaseModel):
     supplier_id: int
     location_id: int
+    status: str = "Pending"
+    items: List[OrderLine] = Field(default_factory=list, max_length=1000)
+
+class OrderBatch(BaseModel):
+    orders: List[OrderCreate] = Field(min_length=1, max_length=5000)
+
+class StatusChange(BaseModel):
+    order_ids: List[int] = Field(min_length=1, max_length=10_000)
     status: str
 
+_ORDERS = Projection(
+    "OrderRow",
+    Orders.order_id,
+    func.coalesce(Supplier.name, "Unknown").label("supplier_name"),
+    func.coalesce(Location.location_name, "Unknown").label("location_name"),
+    Orders.status,
+    Orders.created_at,
+)
+
+def _orders_query(region_id: Optional[int], location_id: Optional[int]):
+    query = (
+        _ORDERS.select()
+        .outerjoin(Supplier, Supplier.supplier_id == Orders.supplier_id)  # ✅ Supplier & Location names only
+        .outerjoin(Location, Location.location_id == Orders.location_id)
+    )
+    return scope_to_location(query, Orders.location_id, region_id, location_id)
+
+
 # ✅ Update to allow both GET and HEAD requests on this endpoint
 @router.api_route("/", methods=["GET", "HEAD"])
 def get_orders(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     region_id: Optional[int] = Query(None),
     location_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="order_id cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every row as NDJSON"),
 ):
-    """Fetch orders, optionally filtering by region or location."""
-    
-    query = db.query(Orders).options(
-        joinedload(Orders.supplier),  # ✅ Fetch Supplier details
-        joinedload(Orders.location)   # ✅ Fetch Location details
-    )
+    """Fetch orders, optionally filtering by region or location.
 
-    if location_id:
-        query = query.filter(Orders.location_id == location_id)
-    elif region_id:
-        query = query.join(Location).filter(Location.region_id == region_id)
+    Pass `limit`/`after` for keyset pages (`{"items", "next_cursor"}`) or
+    `stream=true` for an NDJSON export; without either the full list is returned.
+    """
+    if request.method == "HEAD":
+        return Response(media_type="application/json")  # ✅ Probes get headers only, no query
+    query = _orders_query(region_id, location_id)
+    if stream:
+        return _ORDERS.stream(query, Orders.order_id, after)
+    if limit is not None or after is not None:
+        return _ORDERS.page(db, query, Orders.order_id, after, limit)
 
-    orders = query.all()
+    return _ORDERS.all(db, query)
 
-    # ✅ Convert response to include Supplier & Location names
-    return [
-        {
-            "order_id": order.order_id,
-            "supplier_name": order.supplier.name if order.supplier else "Unknown",
-            "location_name": order.location.location_name if order.location else "Unknown",
-            "status": order.status,
-            "created_at": order.created_at,
-        }
-        for order in orders
-    ]
+@router.post("/reorder")
+def run_reorder(
+    db: Session = Depends(get_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    target_multiple: float = Query(2.0, ge=1.0, le=10.0, description="Order up to this many times the reorder point"),
+    dry_run: bool = Query(False, description="Return the proposed orders without creating them"),
+):
+    """Create Pending orders for every inventory line below its reorder point, one per supplier and location."""
+    return reorder.run(db, region_id, location_id, target_multiple=target_multiple, dry_run=dry_run)
+
+def _create(db: Session, orders: List[OrderCreate]) -> List[dict]:
+    for order in orders:
+        if order.status not in purchase_orders.STATUSES:
+            raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(purchase_orders.STATUSES)}")
+    try:
+        return purchase_orders.create(db, orders)
+    except purchase_orders.InvalidOrder as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @router.post("/")
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    """Create a new order and validate fields."""
-    
-    # Validate Supplier
-    supplier = db.query(Supplier).filter(Supplier.supplier_id == order.supplier_id).first()
-    if not supplier:
-        raise HTTPException(status_code=400, detail="Invalid supplier ID")
-    
-    # Validate Location
-    location = db.query(Location).filter(Location.location_id == order.location_id).first()
-    if not location:
-        raise HTTPException(status_code=400, detail="Invalid location ID")
-    
-    # Create Order
-    new_order = Orders(
-        supplier_id=order.supplier_id,
-        location_id=order.location_id,
-        status=order.status,
-        created_at=datetime.utcnow()
+    """Create an order with its line items; unknown supplier, location or product ids are rejected by the foreign keys."""
+    return _create(db, [order])[0]
+
+@router.post("/bulk")
+def create_orders(batch: OrderBatch, db: Session = Depends(get_db)):
+    """Create many orders and their lines in one transaction; one bad id rejects the whole batch."""
+    created = _create(db, batch.orders)
+    return {"orders_created": len(created), "orders": created}
+
+@router.post("/status")
+def change_status(change: StatusChange, db: Session = Depends(get_db)):
+    """Move orders to Shipped, Delivered or Cancelled; orders not in an allowed prior status are skipped."""
+    if change.status not in purchase_orders.TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(purchase_orders.TRANSITIONS)}")
+    return purchase_orders.transition(db, change.order_ids, change.status)
+
+@router.get("/{order_id}/items")
+def get_order_items(order_id: int, db: Session = Depends(get_read_db)):
+    """Line items of one order."""
+    rows = (
+        db.query(OrderItem.order_item_id, OrderItem.product_id, Product.name, OrderItem.quantity, OrderItem.price)
+        .outerjoin(Product, Product.product_id == OrderItem.product_id)
+        .filter(OrderItem.order_id == order_id)
+        .order_by(OrderItem.order_item_id)
+        .all()
     )
-    db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
-    
-    return {
-        "order_id": new_order.order_id,
-        "supplier_name": supplier.name,  
-        "location_name": location.location_name,  
-        "status": new_order.status,
-        "created_at": new_order.created_at,
-    }
+    if not rows and db.get(Orders, order_id) is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return [
+        {"order_item_id": order_item_id, "product_id": product_id, "product_name": product_name,
+         "quantity": quantity, "price": price}
+        for order_item_id, product_id, product_name, quantity, price in rows
+    ]
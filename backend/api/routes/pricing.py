@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from api.database import get_read_db
+from api.pagination import ORJSONResponse
+from api.services import pricing
+from typing import Optional
+
+router = APIRouter()
+
+@router.get("/recommendations", response_class=ORJSONResponse)
+def get_recommendations(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    window_days: int = Query(14, ge=1, le=365),
+    low_cover_days: float = Query(3.0, ge=0),
+    recommendation: Optional[str] = Query(None, description="Only return one recommendation type"),
+):
+    """Per-location, per-product price recommendations based on sell-through and shelf life."""
+    if recommendation and recommendation not in pricing.RECOMMENDATIONS:
+        raise HTTPException(status_code=400, detail=f"recommendation must be one of {', '.join(pricing.RECOMMENDATIONS)}")
+
+    results = pricing.recommendations(db, region_id, location_id, window_days, low_cover_days)
+    if recommendation:
+        results = [row for row in results if row["recommendation"] == recommendation]
+    # ✅ Cache hits go straight to orjson, without a jsonable_encoder pass over every row
+    return ORJSONResponse(results)
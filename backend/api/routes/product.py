@@ -1,27 +1,49 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
-from typing import List
-from api.database import get_db
+from typing import List, Optional
+from api import cache
+from api.database import get_db, get_read_db
 from api.models import Product
+from api.pagination import dumps
 from api.schemas import ProductSchema
+from api.services import product_search
 
 router = APIRouter()
 
 @router.get("/")
-def get_products(db: Session = Depends(get_db)):
-    products = db.query(Product).all()
-    result = []
-    for product in products:
-        result.append({
-            "product_id": product.product_id,
-            "name": product.name,
-            "category_id": product.category_id,
-            "supplier_id": product.supplier_id,
-            "price": float(product.price) if product.price is not None else None,
-            "shelf_life_days": product.shelf_life_days,
-            "reorder_point": product.reorder_point
-        })
-    return result
+def get_products(request: Request, db: Session = Depends(get_read_db)):
+    """Fetch the catalog (cached in-process, revalidated with ETag/If-None-Match)."""
+
+    def load():
+        products = db.query(Product).order_by(Product.product_id).all()
+        result = []
+        for product in products:
+            result.append({
+                "product_id": product.product_id,
+                "name": product.name,
+                "category_id": product.category_id,
+                "supplier_id": product.supplier_id,
+                "price": float(product.price) if product.price is not None else None,
+                "shelf_life_days": product.shelf_life_days,
+                "reorder_point": product.reorder_point
+            })
+        return dumps(result)
+
+    return cache.reference_response(request, "products", load)
+
+
+@router.get("/search")
+def search_products(
+    q: str = Query(..., min_length=1, max_length=100, description="Name, or the start of one; typos are tolerated"),
+    category_id: Optional[int] = Query(None),
+    supplier_id: Optional[int] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    fuzzy: bool = Query(True, description="Also match misspelled words"),
+    db: Session = Depends(get_read_db),
+):
+    """Autocomplete over product names, best matches first, from an in-process index."""
+    catalog = product_search.get_catalog(db)
+    return catalog.search(q, category_id=category_id, supplier_id=supplier_id, limit=limit, fuzzy=fuzzy)
 
 
 @router.post("/")
@@ -44,5 +66,7 @@ def create_product(
     )
     db.add(product)
     db.commit()
+    cache.bump("products")
     db.refresh(product)
+    product_search.add(product)  # ✅ Searchable right away, without rebuilding the index
     return product
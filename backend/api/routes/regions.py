@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from api.database import get_db
+from api import cache
+from api.database import get_db, get_read_db
 from api.models import Region
+from api.pagination import dumps
+from api.services import scorecards
 from typing import List
 
 router = APIRouter()
 
 @router.api_route("/", methods=["GET", "HEAD"])
-def get_regions(db: Session = Depends(get_db)):
-    """Fetch all regions from the database and return as dictionaries."""
-    regions = db.query(Region).all()
-    
-    return [{"region_id": region.region_id, "name": region.name} for region in regions]  # ✅ Convert to dict
+def get_regions(request: Request, db: Session = Depends(get_read_db)):
+    """Fetch all regions (cached in-process, revalidated with ETag/If-None-Match)."""
+
+    def load():
+        regions = db.query(Region.region_id, Region.name).order_by(Region.region_id).all()
+        return dumps([{"region_id": region_id, "name": name} for region_id, name in regions])  # ✅ Convert to dict
+
+    return cache.reference_response(request, "regions", load)
+
+@router.get("/{region_id}/scorecard")
+def get_region_scorecard(region_id: int, days: int = Query(30, ge=1, le=365), db: Session = Depends(get_read_db)):
+    """Inventory value, revenue, units sold, wastage and open orders per location and for the region."""
+    if db.get(Region, region_id) is None:
+        raise HTTPException(status_code=404, detail="Region not found")
+    return scorecards.region_scorecard(db, region_id, days)
 
 @router.post("/")
 def create_region(name: str, db: Session = Depends(get_db)):
@@ -20,4 +33,5 @@ def create_region(name: str, db: Session = Depends(get_db)):
     db.add(region)
     db.commit()
     db.refresh(region)
+    cache.bump("regions")
     return region
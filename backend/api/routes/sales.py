@@ -1,61 +1,165 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from api.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import Float, cast
+from sqlalchemy.orm import Session
+from api import cache, events
+from api.database import get_db, get_read_db
+from api.filters import scope_to_location
+from api.pagination import MAX_PAGE_SIZE
+from api.projections import Projection
 from api.models import Sales, Product, Location, Region
-from typing import Optional
+from api.services import rollups, sales_ingest, stock
+from pydantic import BaseModel, Field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
 
 router = APIRouter()
 
+_SALES = Projection(
+    "SaleRow",
+    Sales.sale_id,
+    Sales.location_id,
+    Location.location_name,
+    Sales.product_id,
+    Product.name.label("product_name"),
+    Sales.quantity,
+    cast(Sales.total_price, Float).label("total_price"),  # ✅ Floats from the driver, no Decimals
+    Sales.timestamp,
+)
+
+
+def _sales_query(
+    region_id: Optional[int],
+    location_id: Optional[int],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    query = (
+        _SALES.select()
+        .outerjoin(Location, Location.location_id == Sales.location_id)  # ✅ Just the names, no Location/Product objects
+        .outerjoin(Product, Product.product_id == Sales.product_id)
+    )
+    query = scope_to_location(query, Sales.location_id, region_id, location_id)
+    # ✅ Plain bounds on the partition key, so Postgres skips months outside them
+    if start:
+        query = query.where(Sales.timestamp >= start)
+    if end:
+        query = query.where(Sales.timestamp < end)
+    return query
+
+
 @router.api_route("/", methods=["GET", "HEAD"])
 def get_sales(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     region_id: Optional[int] = Query(None),
     location_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="sale_id cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every row as NDJSON"),
+    start: Optional[datetime] = Query(None, description="Only sales at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only sales before this time"),
 ):
-    """Fetch sales, optionally filtering by region or location."""
-    query = db.query(Sales).options(
-        joinedload(Sales.location),  # ✅ Fetch Location details
-        joinedload(Sales.product),  # ✅ Fetch Product details
-    )
+    """Fetch sales, optionally filtering by region, location or time window.
+
+    Pass `limit`/`after` for keyset pages (`{"items", "next_cursor"}`) or
+    `stream=true` for an NDJSON export; without either the full list is returned.
+    `start`/`end` bound the scan to the monthly partitions they overlap, so
+    always pass them when only recent sales are needed.
+    """
+    if request.method == "HEAD":
+        return Response(media_type="application/json")  # ✅ Probes get headers only, no query
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    query = _sales_query(region_id, location_id, start, end)
+    if stream:
+        return _SALES.stream(query, Sales.sale_id, after)
+    if limit is not None or after is not None:
+        return _SALES.page(db, query, Sales.sale_id, after, limit)
+
+    return _SALES.all(db, query)
+
+@router.get("/aggregates/{period}")
+def get_sales_aggregates(
+    period: str,
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    group_by: Optional[str] = Query(None, description="location or product"),
+):
+    """Daily, weekly or monthly sales totals, read from the sales_aggregates buckets."""
+    if period not in rollups.PERIODS:
+        raise HTTPException(status_code=404, detail=f"Unknown period '{period}'")
+    if group_by not in (None, "location", "product"):
+        raise HTTPException(status_code=400, detail="group_by must be 'location' or 'product'")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=365)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    return rollups.period_totals(db, period, start, end, region_id, location_id, product_id, group_by)
+
+class SaleLine(BaseModel):
+    location_id: int
+    product_id: int
+    quantity: int = Field(gt=0)
+    total_price: Decimal = Field(ge=0, max_digits=10, decimal_places=2)
+    timestamp: Optional[datetime] = None
+
+
+class SaleBatch(BaseModel):
+    lines: List[SaleLine] = Field(min_length=1, max_length=100_000)
+
+
+@router.post("/batch")
+def create_sales_batch(batch: SaleBatch, db: Session = Depends(get_db)):
+    """Ingest many sale lines at once and decrement stock in the same transaction.
 
-    if location_id:
-        query = query.filter(Sales.location_id == location_id)
-    elif region_id:
-        query = query.join(Location).filter(Location.region_id == region_id)
-
-    sales = query.all()
-
-    # ✅ Convert to dictionaries for JSON serialization
-    return [
-        {
-            "sale_id": sale.sale_id,
-            "location_id": sale.location_id,
-            "location_name": sale.location.location_name if sale.location else None,
-            "product_id": sale.product_id,
-            "product_name": sale.product.name if sale.product else None,
-            "quantity": sale.quantity,
-            "total_price": sale.total_price,
-            "timestamp": sale.timestamp,
-        }
-        for sale in sales
-    ]
+    The whole batch is rejected (409, nothing written) if any location/product
+    line would go below zero.
+    """
+    try:
+        return sales_ingest.record_sales(db, batch.lines)
+    except stock.InsufficientStock as exc:
+        raise HTTPException(status_code=409, detail={"message": str(exc), "shortages": exc.shortages})
 
 @router.post("/")
 def create_sale(
     location_id: int,
     product_id: int,
-    quantity: int,
-    total_price: float,
+    quantity: int = Query(gt=0),
+    total_price: float = Query(ge=0),
     db: Session = Depends(get_db),
 ):
-    """Create a new sale transaction."""
+    """Create a new sale transaction, take it out of stock and roll it into its daily bucket."""
     sale = Sales(
         location_id=location_id,
         product_id=product_id,
         quantity=quantity,
-        total_price=total_price
+        total_price=total_price,
+        timestamp=datetime.utcnow(),
     )
     db.add(sale)
+    try:
+        stock.decrement(db, {(location_id, product_id): quantity}, "Sale", at=sale.timestamp)
+    except stock.InsufficientStock as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={"message": str(exc), "shortages": exc.shortages})
+    rollups.apply_sales(db, [sale])  # ✅ Same transaction as the sale itself
+    db.flush()
+    events.publish(db, "sale", [{
+        "sale_id": sale.sale_id,
+        "location_id": location_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "total_price": total_price,
+        "timestamp": sale.timestamp,
+    }], at=sale.timestamp)
     db.commit()
+    cache.bump("sales", "inventory")
     db.refresh(sale)
     return sale
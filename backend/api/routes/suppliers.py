@@ -1,11 +1,34 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from api.database import get_db
+from typing import Optional
+from api import cache
+from api.database import get_db, get_read_db
 from api.models import Supplier
+from api.pagination import dumps
 
 router = APIRouter()
 
 @router.api_route("/", methods=["GET", "HEAD"])
-def get_suppliers(db: Session = Depends(get_db)):
-    """Fetch all suppliers."""
-    return db.query(Supplier).all()
+def get_suppliers(request: Request, db: Session = Depends(get_read_db)):
+    """Fetch all suppliers (cached in-process, revalidated with ETag/If-None-Match)."""
+
+    def load():
+        suppliers = db.query(
+            Supplier.supplier_id, Supplier.name, Supplier.contact_info
+        ).order_by(Supplier.supplier_id).all()
+        return dumps([
+            {"supplier_id": supplier_id, "name": name, "contact_info": contact_info}
+            for supplier_id, name, contact_info in suppliers
+        ])
+
+    return cache.reference_response(request, "suppliers", load)
+
+@router.post("/")
+def create_supplier(name: str, contact_info: Optional[str] = None, db: Session = Depends(get_db)):
+    """Create a new supplier"""
+    supplier = Supplier(name=name, contact_info=contact_info)
+    db.add(supplier)
+    db.commit()
+    db.refresh(supplier)
+    cache.bump("suppliers")
+    return supplier
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from api import cache
+from api.database import pool_stats
+
+router = APIRouter()
+
+@router.get("/db-pool")
+def get_db_pool():
+    """Connection pool utilization for the primary (and read replica) engine."""
+    return pool_stats()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Size of the in-process reference data cache in this worker."""
+    return cache.reference_cache.stats()
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from api.database import get_db, get_read_db
+from api.models import StockTransfer
+from api.pagination import MAX_PAGE_SIZE, keyset_page
+from api.services import stock, transfers
+from typing import Optional
+
+router = APIRouter()
+
+
+def _serialize_transfer(transfer):
+    return {
+        "transfer_id": transfer.transfer_id,
+        "from_location": transfer.from_location,
+        "to_location": transfer.to_location,
+        "product_id": transfer.product_id,
+        "quantity": transfer.quantity,
+        "timestamp": transfer.timestamp,
+    }
+
+
+@router.get("/")
+def get_transfers(
+    db: Session = Depends(get_read_db),
+    location_id: Optional[int] = Query(None, description="Transfers into or out of this location"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="transfer_id cursor from the previous page"),
+):
+    """Recorded stock transfers as keyset pages (`{"items", "next_cursor"}`)."""
+    query = db.query(StockTransfer)
+    if location_id:
+        query = query.filter(
+            (StockTransfer.from_location == location_id) | (StockTransfer.to_location == location_id)
+        )
+    return keyset_page(query, StockTransfer.transfer_id, after, limit, _serialize_transfer)
+
+
+@router.get("/recommendations")
+def get_transfer_recommendations(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    window_days: int = Query(28, ge=1, le=365),
+    target_cover_days: float = Query(14.0, gt=0),
+    surplus_cover_days: float = Query(28.0, gt=0),
+    min_units: int = Query(5, ge=1),
+):
+    """Proposed in-region transfers from overstocked to understocked stores, largest first."""
+    if surplus_cover_days < target_cover_days:
+        raise HTTPException(status_code=400, detail="surplus_cover_days must be at least target_cover_days")
+    return transfers.plan(db, region_id, window_days, target_cover_days, surplus_cover_days, min_units)
+
+
+@router.post("/execute")
+def execute_transfers(
+    db: Session = Depends(get_db),
+    region_id: Optional[int] = Query(None),
+    window_days: int = Query(28, ge=1, le=365),
+    target_cover_days: float = Query(14.0, gt=0),
+    surplus_cover_days: float = Query(28.0, gt=0),
+    min_units: int = Query(5, ge=1),
+):
+    """Plan transfers and carry them all out in one transaction."""
+    if surplus_cover_days < target_cover_days:
+        raise HTTPException(status_code=400, detail="surplus_cover_days must be at least target_cover_days")
+    planned = transfers.plan(db, region_id, window_days, target_cover_days, surplus_cover_days, min_units)
+    try:
+        return transfers.execute(db, planned)
+    except stock.InsufficientStock as exc:
+        raise HTTPException(status_code=409, detail={"message": str(exc), "shortages": exc.shortages})
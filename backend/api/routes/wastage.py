@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Float, cast
+from sqlalchemy.orm import Session
+from api.database import get_db, get_read_db
+from api.filters import scope_to_location
+from api.models import Location, Product, SpoilageRisk, WastageRecord
+from api.pagination import MAX_PAGE_SIZE
+from api.projections import Projection
+from api.services import stock, wastage
+from pydantic import BaseModel, Field
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+router = APIRouter()
+
+class WastageLine(BaseModel):
+    location_id: int
+    product_id: int
+    quantity: int = Field(gt=0)
+    reason: str
+    timestamp: Optional[datetime] = None
+
+
+class WastageBatch(BaseModel):
+    lines: List[WastageLine] = Field(min_length=1, max_length=100_000)
+
+
+_WASTAGE = Projection(
+    "WastageRow",
+    WastageRecord.wastage_id,
+    WastageRecord.location_id,
+    Location.location_name,
+    WastageRecord.product_id,
+    Product.name.label("product_name"),
+    WastageRecord.quantity,
+    WastageRecord.reason,
+    WastageRecord.timestamp,
+)
+
+_AT_RISK = Projection(
+    "SpoilageRiskRow",
+    SpoilageRisk.location_id,
+    Location.location_name,
+    SpoilageRisk.product_id,
+    Product.name.label("product_name"),
+    SpoilageRisk.on_hand,
+    SpoilageRisk.daily_velocity,
+    SpoilageRisk.days_of_cover,
+    SpoilageRisk.next_expiry,
+    SpoilageRisk.at_risk_units,
+    cast(SpoilageRisk.at_risk_value, Float).label("at_risk_value"),
+    SpoilageRisk.risk_score,
+    SpoilageRisk.computed_at,
+)
+
+
+@router.post("/")
+def record_wastage(batch: WastageBatch, db: Session = Depends(get_db)):
+    """Record wasted stock and take it out of inventory in one transaction.
+
+    The whole batch is rejected (409, nothing written) if any location/product
+    line would go below zero.
+    """
+    for line in batch.lines:
+        if line.reason not in wastage.REASONS:
+            raise HTTPException(status_code=400, detail=f"reason must be one of {', '.join(wastage.REASONS)}")
+    try:
+        return wastage.record(db, batch.lines)
+    except stock.InsufficientStock as exc:
+        raise HTTPException(status_code=409, detail={"message": str(exc), "shortages": exc.shortages})
+
+
+@router.get("/")
+def get_wastage(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    reason: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="wastage_id cursor from the previous page"),
+):
+    """Wastage records as keyset pages (`{"items", "next_cursor"}`)."""
+    query = (
+        _WASTAGE.select()
+        .outerjoin(Location, Location.location_id == WastageRecord.location_id)
+        .outerjoin(Product, Product.product_id == WastageRecord.product_id)
+    )
+    query = scope_to_location(query, WastageRecord.location_id, region_id, location_id)
+    if product_id:
+        query = query.where(WastageRecord.product_id == product_id)
+    if reason:
+        query = query.where(WastageRecord.reason == reason)
+    return _WASTAGE.page(db, query, WastageRecord.wastage_id, after, limit)
+
+
+@router.get("/rates")
+def get_waste_rates(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    reason: Optional[str] = Query(None),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Wasted units and waste rate per location, product and reason, read from the wastage buckets."""
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return {
+        "start": start,
+        "end": end,
+        "items": wastage.rates(db, start, end, region_id, location_id, product_id, reason, limit),
+    }
+
+
+@router.get("/at-risk")
+def get_at_risk_stock(
+    db: Session = Depends(get_read_db),
+    region_id: Optional[int] = Query(None),
+    location_id: Optional[int] = Query(None),
+    min_score: float = Query(0.25, ge=0, le=1, description="Smallest share of the line's stock expected to spoil"),
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Stock expected to expire before it sells, riskiest first.
+
+    Served from the spoilage_risk table, which the refresh-spoilage-risk job
+    recomputes every hour; `computed_at` says how fresh each row is.
+    """
+    query = (
+        _AT_RISK.select()
+        .join(Location, Location.location_id == SpoilageRisk.location_id)
+        .join(Product, Product.product_id == SpoilageRisk.product_id)
+        .where(SpoilageRisk.risk_score >= min_score, SpoilageRisk.at_risk_units > 0)
+    )
+    query = scope_to_location(query, SpoilageRisk.location_id, region_id, location_id)
+    query = query.order_by(SpoilageRisk.risk_score.desc(), SpoilageRisk.at_risk_value.desc()).limit(limit)
+    return _AT_RISK.all(db, query)
@@ -0,0 +1,353 @@
+"""In-process scheduler for periodic background jobs.
+
+Jobs are registered with `@scheduler.job(name, schedule)` (see api.jobs) and
+the scheduler is started from the app's lifespan, so every API worker runs
+one. Each job has a row in job_leases holding its next run time. A worker
+runs a job only after claiming that row with a single conditional UPDATE
+(due, and not leased by anyone else), which also moves next_run_at on, so a
+run happens on exactly one worker however many are polling. The lease lasts
+the job's `lease_seconds`; if a worker dies mid-run the lease expires, the
+next claim marks the run abandoned and the job carries on from its schedule.
+
+Jobs run on a small thread pool (SCHEDULER_MAX_WORKERS), never on the event
+loop, and a worker only claims as many jobs as it has free threads. Every
+run is recorded in job_runs with its duration, result or traceback.
+
+Schedules are `Every(...)` intervals or five-field `Cron(...)` expressions
+(minute hour day-of-month month day-of-week), evaluated in UTC.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from api.config import settings
+from api.database import SessionLocal
+from api.models import JobLease, JobRun
+from api.pagination import dumps
+from api.services.rollups import upsert_insert
+
+logger = logging.getLogger("api.scheduler")
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ABANDONED = "abandoned"
+RUN_STATUSES = (RUNNING, SUCCEEDED, FAILED, ABANDONED)
+
+MAX_ERROR_CHARS = 4000
+
+
+class Every:
+    """Run at a fixed interval after each run starts."""
+
+    def __init__(self, seconds: float = 0, minutes: float = 0, hours: float = 0, days: float = 0):
+        self.interval = timedelta(seconds=seconds, minutes=minutes, hours=hours, days=days)
+        if self.interval <= timedelta(0):
+            raise ValueError("interval must be positive")
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + self.interval
+
+    def __str__(self) -> str:
+        return f"every {self.interval}"
+
+
+def _cron_field(spec: str, low: int, high: int) -> frozenset:
+    values = set()
+    for part in spec.split(","):
+        body, _, step = part.partition("/")
+        if body == "*":
+            start, stop = low, high
+        elif "-" in body:
+            start, stop = (int(bound) for bound in body.split("-", 1))
+        else:
+            start = int(body)
+            stop = high if step else start
+        step = int(step) if step else 1
+        if not low <= start <= stop <= high or step < 1:
+            raise ValueError(f"invalid cron field {spec!r}")
+        values.update(range(start, stop + 1, step))
+    return frozenset(values)
+
+
+class Cron:
+    """Standard five-field cron expression, e.g. "30 2 * * *" for 02:30 UTC daily.
+
+    Fields take `*`, numbers, ranges `a-b`, lists `a,b` and steps `*/n`;
+    day of week is 0-7 with both 0 and 7 meaning Sunday. As in cron, when both
+    day of month and day of week are restricted a day matching either runs.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes = _cron_field(fields[0], 0, 59)
+        self.hours = _cron_field(fields[1], 0, 23)
+        self.days = _cron_field(fields[2], 1, 31)
+        self.months = _cron_field(fields[3], 1, 12)
+        weekdays = _cron_field(fields[4], 0, 7)
+        # cron counts from Sunday = 0, Python's weekday() from Monday = 0
+        self.weekdays = frozenset((day - 1) % 7 for day in weekdays)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        in_week = moment.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        give_up = candidate + timedelta(days=366 * 5)
+        while candidate < give_up:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.year * 12 + candidate.month, 12)
+                candidate = datetime(year, month + 1, 1)
+            elif not self._day_matches(candidate):
+                candidate = datetime(candidate.year, candidate.month, candidate.day) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron expression never fires: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+
+class Job:
+    __slots__ = ("name", "func", "schedule", "lease_seconds", "description")
+
+    def __init__(self, name: str, func: Callable, schedule, lease_seconds: float, description: str):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.lease_seconds = lease_seconds
+        self.description = description
+
+
+def _jsonable(value):
+    # Round-trip through orjson so datetimes and Decimals are stored as JSON
+    return None if value is None else orjson.loads(dumps(value))
+
+
+class Scheduler:
+    """Registry of jobs plus the polling loop that claims and runs them."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.worker: Optional[str] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Future] = {}
+
+    def job(self, name: str, schedule, lease_seconds: float = 3600, description: Optional[str] = None):
+        """Register the decorated `func(db) -> dict` to run on `schedule`.
+
+        `lease_seconds` should comfortably exceed the job's longest run; no
+        other worker starts it again until the lease runs out.
+        """
+        def register(func: Callable) -> Callable:
+            doc = (func.__doc__ or "").strip().splitlines()
+            self.jobs[name] = Job(name, func, schedule, lease_seconds, description or (doc[0] if doc else ""))
+            return func
+
+        return register
+
+    def enabled_jobs(self) -> List[Job]:
+        skipped = {name.strip() for name in settings.scheduler_skip_jobs.split(",") if name.strip()}
+        return [job for job in self.jobs.values() if job.name not in skipped]
+
+    async def start(self) -> None:
+        if not settings.scheduler_enabled or not self.enabled_jobs() or self._task is not None:
+            return
+        # Resolved here rather than at import, so forked workers get their own pid
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=settings.scheduler_max_workers, thread_name_prefix="job")
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._running:
+            # Jobs can't be interrupted; give them a moment to finish and release their leases
+            await asyncio.wait(list(self._running.values()), timeout=settings.shutdown_grace_seconds)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    async def _poll(self) -> None:
+        loop = asyncio.get_running_loop()
+        registered = False
+        while True:
+            try:
+                if not registered:
+                    await asyncio.to_thread(self.register_leases)
+                    registered = True
+                free = settings.scheduler_max_workers - len(self._running)
+                idle = [job.name for job in self.enabled_jobs() if job.name not in self._running]
+                if free > 0 and idle:
+                    claimed = await asyncio.to_thread(self._claim_due, idle, free)
+                    for job, run_id in claimed:
+                        future = loop.run_in_executor(self._executor, self.execute, job, run_id)
+                        self._running[job.name] = future
+                        future.add_done_callback(lambda _, name=job.name: self._running.pop(name, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job scheduler poll failed")
+            await asyncio.sleep(settings.scheduler_poll_seconds)
+
+    def register_leases(self) -> None:
+        """Give every registered job a lease row, first due one schedule step from now."""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            rows = [{"job_name": job.name, "next_run_at": job.schedule.next_after(now)} for job in self.jobs.values()]
+            db.execute(upsert_insert(db, JobLease.__table__).values(rows).on_conflict_do_nothing())
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, job: Job, now: datetime, force: bool = False) -> Optional[int]:
+        """Take the job's lease and open its run row; None if it isn't due or another worker holds it."""
+        conditions = [
+            JobLease.job_name == job.name,
+            or_(JobLease.leased_until.is_(None), JobLease.leased_until < now),
+        ]
+        if not force:
+            conditions.append(JobLease.next_run_at <= now)
+        claimed = db.execute(
+            update(JobLease)
+            .where(*conditions)
+            .values(
+                leased_by=self.worker,
+                leased_until=now + timedelta(seconds=job.lease_seconds),
+                next_run_at=job.schedule.next_after(now),
+            )
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return None
+        # Holding the lease, any run still marked running lost its worker
+        db.execute(
+            update(JobRun)
+            .where(JobRun.job_name == job.name, JobRun.status == RUNNING)
+            .values(status=ABANDONED, finished_at=now)
+        )
+        run_id = db.execute(
+            insert(JobRun)
+            .values(job_name=job.name, worker=self.worker, status=RUNNING, started_at=now)
+            .returning(JobRun.run_id)
+        ).scalar()
+        db.commit()
+        return run_id
+
+    def _claim_due(self, candidates: List[str], limit: int) -> List[Tuple[Job, int]]:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            due = db.execute(
+                select(JobLease.job_name)
+                .where(
+                    JobLease.job_name.in_(candidates),
+                    JobLease.next_run_at <= now,
+                    or_(JobLease.leased_until.is_(None), JobLease.leased_until < now),
+                )
+                .order_by(JobLease.next_run_at)
+            ).scalars().all()
+            db.rollback()
+            claimed = []
+            for name in due:
+                if len(claimed) >= limit:
+                    break
+                run_id = self._claim(db, self.jobs[name], now)
+                if run_id is not None:
+                    claimed.append((self.jobs[name], run_id))
+            return claimed
+        finally:
+            db.close()
+
+    def execute(self, job: Job, run_id: int) -> dict:
+        """Run a claimed job, record the outcome and release the lease."""
+        started = time.perf_counter()
+        status, result, error = SUCCEEDED, None, None
+        db = SessionLocal()
+        try:
+            result = job.func(db)
+        except Exception:
+            db.rollback()
+            logger.exception("Job %s failed", job.name)
+            status, error = FAILED, traceback.format_exc()[-MAX_ERROR_CHARS:]
+        finally:
+            db.close()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(JobRun)
+                .where(JobRun.run_id == run_id)
+                .values(
+                    status=status,
+                    finished_at=datetime.utcnow(),
+                    duration_ms=round(duration_ms, 1),
+                    result=_jsonable(result),
+                    error=error,
+                )
+            )
+            db.execute(
+                update(JobLease)
+                .where(JobLease.job_name == job.name, JobLease.leased_by == self.worker)
+                .values(leased_by=None, leased_until=None)
+            )
+            db.commit()
+        finally:
+            db.close()
+        return {"run_id": run_id, "job_name": job.name, "status": status, "duration_ms": round(duration_ms, 1),
+                "result": result, "error": error}
+
+    def run_now(self, name: str) -> Optional[dict]:
+        """Claim and run a job in the calling thread, ignoring its schedule; None if another worker holds it."""
+        job = self.jobs[name]
+        self.worker = self.worker or f"{socket.gethostname()}:{os.getpid()}"
+        self.register_leases()
+        db = SessionLocal()
+        try:
+            run_id = self._claim(db, job, datetime.utcnow(), force=True)
+        finally:
+            db.close()
+        return None if run_id is None else self.execute(job, run_id)
+
+    def trigger(self, db: Session, name: str) -> datetime:
+        """Make a job due now, so whichever worker polls next runs it. Commits."""
+        job = self.jobs[name]
+        now = datetime.utcnow()
+        db.execute(upsert_insert(db, JobLease.__table__).values(job_name=job.name, next_run_at=now)
+                   .on_conflict_do_update(index_elements=["job_name"], set_={"next_run_at": now}))
+        db.commit()
+        return now
+
+
+scheduler = Scheduler()
@@ -0,0 +1,243 @@
+"""Gzip'd CSV exports of the history tables, streamed in constant memory.
+
+Each export is one SELECT (see EXPORTS) over a bounded time window. On
+Postgres it runs as `COPY (...) TO STDOUT WITH (FORMAT csv, HEADER)` on a
+pooled read connection: a producer thread feeds the COPY output through a
+streaming gzip compressor into a small bounded queue, and the response body
+drains that queue. A slow client therefore stalls the COPY instead of
+buffering the export in the worker. Other databases read the same SELECT
+through a server-side cursor and write it with the csv module.
+
+At most EXPORT_MAX_CONCURRENT exports run at once per worker; `acquire`
+refuses the rest so that long exports can't take every pool connection and
+thread away from the API.
+"""
+import csv
+import io
+import queue
+import threading
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Select, and_, func, select
+
+from api.config import settings
+from api.database import ReadSessionLocal, read_engine
+from api.filters import scope_to_location
+from api.models import InventoryLog, Location, OrderItem, Orders, Product, Sales, Supplier
+
+GZIP_LEVEL = 6
+COPY_CHUNK_BYTES = 64 * 1024
+QUEUE_CHUNKS = 16
+FETCH_ROWS = 5000
+# How long the COPY thread waits on a stalled client before re-checking for a disconnect
+PUT_TIMEOUT_SECONDS = 1.0
+
+
+def _sales(start: datetime, end: datetime) -> Select:
+    return (
+        select(
+            Sales.sale_id, Sales.timestamp, Sales.location_id, Location.location_name, Location.region_id,
+            Sales.product_id, Product.name.label("product_name"), Sales.quantity, Sales.total_price,
+        )
+        .join(Location, Location.location_id == Sales.location_id)
+        .join(Product, Product.product_id == Sales.product_id)
+        .where(Sales.timestamp >= start, Sales.timestamp < end)
+        .order_by(Sales.timestamp, Sales.sale_id)
+    )
+
+
+def _orders(start: datetime, end: datetime) -> Select:
+    in_window = and_(Orders.created_at >= start, Orders.created_at < end)
+    items = (
+        select(
+            OrderItem.order_id,
+            func.count(OrderItem.order_item_id).label("lines"),
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.quantity * OrderItem.price).label("total_cost"),
+        )
+        # Only the window's lines, not every order ever placed
+        .where(OrderItem.order_id.in_(select(Orders.order_id).where(in_window)))
+        .group_by(OrderItem.order_id)
+        .subquery("items")
+    )
+    return (
+        select(
+            Orders.order_id, Orders.created_at, Orders.status, Orders.location_id, Location.location_name,
+            Location.region_id, Orders.supplier_id, Supplier.name.label("supplier_name"),
+            func.coalesce(items.c.lines, 0).label("lines"), func.coalesce(items.c.units, 0).label("units"),
+            func.coalesce(items.c.total_cost, 0).label("total_cost"),
+        )
+        .join(Location, Location.location_id == Orders.location_id)
+        .outerjoin(Supplier, Supplier.supplier_id == Orders.supplier_id)
+        .outerjoin(items, items.c.order_id == Orders.order_id)
+        .where(in_window)
+        .order_by(Orders.created_at, Orders.order_id)
+    )
+
+
+def _inventory_logs(start: datetime, end: datetime) -> Select:
+    return (
+        select(
+            InventoryLog.log_id, InventoryLog.timestamp, InventoryLog.location_id, Location.location_name,
+            Location.region_id, InventoryLog.product_id, Product.name.label("product_name"),
+            InventoryLog.quantity_change, InventoryLog.reason,
+        )
+        .join(Location, Location.location_id == InventoryLog.location_id)
+        .join(Product, Product.product_id == InventoryLog.product_id)
+        .where(InventoryLog.timestamp >= start, InventoryLog.timestamp < end)
+        .order_by(InventoryLog.timestamp, InventoryLog.log_id)
+    )
+
+
+# kind -> (query builder, the location column its region/location filters apply to)
+EXPORTS = {
+    "sales": (_sales, Sales.location_id),
+    "orders": (_orders, Orders.location_id),
+    "inventory_logs": (_inventory_logs, InventoryLog.location_id),
+}
+
+_slots = threading.BoundedSemaphore(settings.export_max_concurrent)
+
+
+class Permit:
+    """One export slot; released once, however many times `release` is called."""
+
+    def __init__(self):
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._released:
+                self._released = True
+                _slots.release()
+
+
+def acquire() -> Optional[Permit]:
+    """A slot for one export, or None when EXPORT_MAX_CONCURRENT are already running."""
+    return Permit() if _slots.acquire(blocking=False) else None
+
+
+def build_query(kind: str, start: datetime, end: datetime, region_id=None, location_id=None) -> Select:
+    build, location_column = EXPORTS[kind]
+    return scope_to_location(build(start, end), location_column, region_id, location_id)
+
+
+def stream(query: Select, permit: Permit) -> Iterator[bytes]:
+    """Gzip'd CSV chunks (with a header row) for `query`; releases `permit` when done."""
+    try:
+        if read_engine.dialect.name == "postgresql":
+            yield from _copy_chunks(query)
+        else:
+            yield from _cursor_chunks(query)
+    finally:
+        permit.release()
+
+
+def _compressor():
+    # wbits=31: a gzip container rather than a raw zlib stream
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def _cursor_chunks(query: Select) -> Iterator[bytes]:
+    compressor = _compressor()
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=FETCH_ROWS))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(result.keys())
+        for rows in result.partitions():
+            writer.writerows(rows)
+            chunk = compressor.compress(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+        yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+    finally:
+        db.close()
+
+
+class _QueueWriter:
+    """File-like target for copy_expert that compresses into a bounded queue."""
+
+    def __init__(self, chunks: queue.Queue, stopped: threading.Event):
+        self.chunks = chunks
+        self.stopped = stopped
+        self.compressor = _compressor()
+
+    def _put(self, chunk: bytes) -> None:
+        while True:
+            if self.stopped.is_set():
+                raise RuntimeError("export cancelled")
+            try:
+                self.chunks.put(chunk, timeout=PUT_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data) -> None:
+        chunk = self.compressor.compress(data.encode() if isinstance(data, str) else data)
+        if chunk:
+            self._put(chunk)
+
+    def close(self) -> None:
+        self._put(self.compressor.flush())
+
+
+_DONE = object()
+
+
+def _copy_chunks(query: Select) -> Iterator[bytes]:
+    compiled = query.compile(dialect=read_engine.dialect)
+    connection = read_engine.raw_connection()
+    conn = connection.dbapi_connection
+    chunks = queue.Queue(maxsize=QUEUE_CHUNKS)
+    stopped = threading.Event()
+    failure = []
+
+    def produce():
+        try:
+            with conn.cursor() as cursor:
+                # Exports are bounded by the semaphore instead of the read statement timeout
+                cursor.execute("SET LOCAL statement_timeout = 0")
+                sql = cursor.mogrify(str(compiled), compiled.params).decode()
+                writer = _QueueWriter(chunks, stopped)
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", writer, COPY_CHUNK_BYTES)
+                writer.close()
+        except Exception as exc:
+            failure.append(exc)
+        finally:
+            while not stopped.is_set():
+                try:
+                    chunks.put(_DONE, timeout=PUT_TIMEOUT_SECONDS)
+                    break
+                except queue.Full:
+                    continue
+
+    producer = threading.Thread(target=produce, name="export-copy", daemon=True)
+    producer.start()
+    finished = False
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        if failure:
+            raise failure[0]
+        finished = True
+    finally:
+        stopped.set()
+        if not finished:
+            # The client went away (or COPY failed): stop the server side too
+            conn.cancel()
+        producer.join()
+        if finished:
+            conn.rollback()
+            connection.close()
+        else:
+            connection.invalidate()
@@ -0,0 +1,224 @@
+"""Batch demand forecasting for every (location, product) series at once.
+
+Daily unit sales come out of the sales_aggregates buckets in one query and are
+packed into an (n_series x n_days) matrix. Simple exponential smoothing (with a
+per-series smoothing factor picked from a grid) and a weekly seasonal-naive
+baseline are then fitted column by column over time, so the cost is a handful
+of NumPy operations per day of history rather than a Python loop per series.
+
+Every row of a run carries the run's `generated_at` timestamp, so the newest
+run is one `max(timestamp)` away and `latest` never reads older ones. Runs
+older than FORECAST_RETENTION_DAYS are deleted by the run that supersedes them.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from api.config import settings
+from api.filters import scope_to_location
+from api.models import ForecastingResult, Location, Product, SalesAggregate
+
+METHODS = ("auto", "ses", "seasonal_naive")
+ALPHAS = np.linspace(0.1, 0.9, 9)
+SEASON = 7
+INSERT_BATCH_SIZE = 5000
+
+
+def load_series(db: Session, start: date, days: int):
+    """Return (keys, matrix) of daily units for every series with sales since `start`.
+
+    keys is an (n, 2) array of (location_id, product_id); matrix is (n, days)
+    with zeros on days without sales.
+    """
+    rows = db.execute(
+        select(
+            SalesAggregate.location_id,
+            SalesAggregate.product_id,
+            SalesAggregate.sale_date,
+            SalesAggregate.units_sold,
+        ).where(SalesAggregate.sale_date >= start, SalesAggregate.sale_date < start + timedelta(days=days))
+    ).all()
+    if not rows:
+        return np.empty((0, 2), dtype=np.int64), np.empty((0, days))
+
+    location_ids, product_ids, sale_dates, units = zip(*rows)
+    location_ids = np.fromiter(location_ids, dtype=np.int64, count=len(rows))
+    product_ids = np.fromiter(product_ids, dtype=np.int64, count=len(rows))
+    offsets = (np.array(sale_dates, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+    units = np.fromiter(units, dtype=np.float64, count=len(rows))
+
+    # Pack both ids into one int64 key so np.unique can number the series
+    packed = (location_ids << 32) | product_ids
+    series_keys, series_index = np.unique(packed, return_inverse=True)
+
+    matrix = np.zeros((len(series_keys), days))
+    np.add.at(matrix, (series_index, offsets), units)
+    keys = np.column_stack((series_keys >> 32, series_keys & 0xFFFFFFFF))
+    return keys, matrix
+
+
+def fit_ses(matrix: np.ndarray):
+    """Simple exponential smoothing for all rows; returns (level, residual std)."""
+    n, days = matrix.shape
+    levels = np.repeat(matrix[:, :1].T, len(ALPHAS), axis=0)  # (alphas, n)
+    sse = np.zeros_like(levels)
+    for t in range(1, days):
+        error = matrix[:, t] - levels
+        sse += error ** 2
+        levels += ALPHAS[:, None] * error
+
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(n)
+    sigma = np.sqrt(sse[best, columns] / max(days - 1, 1))
+    return levels[best, columns], sigma
+
+
+def fit_seasonal_naive(matrix: np.ndarray, weeks: int = 4):
+    """Average weekday profile over the last `weeks` weeks; returns (profile, residual std)."""
+    n, days = matrix.shape
+    weeks = max(1, min(weeks, days // SEASON))
+    recent = matrix[:, days - weeks * SEASON:]
+    profile = recent.reshape(n, weeks, SEASON).mean(axis=1)
+
+    if days > SEASON:
+        errors = matrix[:, SEASON:] - matrix[:, :-SEASON]
+        sigma = np.sqrt((errors ** 2).mean(axis=1))
+    else:
+        sigma = matrix.std(axis=1)
+    return profile, sigma
+
+
+def forecast(matrix: np.ndarray, horizon: int, method: str = "auto"):
+    """Total demand over the next `horizon` days plus a 0-1 confidence score per row.
+
+    Confidence is one minus the coefficient of variation of the horizon total
+    (residual std scaled by sqrt(horizon), relative to the forecast), clipped
+    to [0, 1], so noisy or sparse series score low.
+    """
+    level, ses_sigma = fit_ses(matrix)
+    ses_total = level * horizon
+
+    if method == "ses" or matrix.shape[1] < SEASON:
+        # Less than a week of history has no weekday profile to fit
+        total, sigma = ses_total, ses_sigma
+    else:
+        total, sigma = _seasonal(matrix, horizon, method, ses_total, ses_sigma)
+
+    total = np.clip(total, 0, None)
+    spread = sigma * np.sqrt(horizon)
+    confidence = np.clip(1 - spread / np.maximum(total, 1), 0, 1)
+    return np.rint(total).astype(np.int64), np.round(confidence, 2)
+
+
+def _seasonal(matrix: np.ndarray, horizon: int, method: str, ses_total: np.ndarray, ses_sigma: np.ndarray):
+    """(total, sigma) for seasonal_naive, or per series the better of it and SES for auto."""
+    profile, naive_sigma = fit_seasonal_naive(matrix)
+    # Column p of the profile lines up with day (days - weeks*7 + p); that is
+    # congruent mod 7 with horizon step h whenever p == h % 7.
+    naive_total = profile[:, np.arange(horizon) % SEASON].sum(axis=1)
+
+    if method == "seasonal_naive":
+        return naive_total, naive_sigma
+    use_naive = naive_sigma < ses_sigma
+    return np.where(use_naive, naive_total, ses_total), np.where(use_naive, naive_sigma, ses_sigma)
+
+
+def run(
+    db: Session,
+    horizon: int = 7,
+    history_days: int = 56,
+    method: str = "auto",
+    as_of: Optional[date] = None,
+) -> dict:
+    """Forecast every active series and bulk-insert one forecasting_results row each.
+
+    Runs generated more than FORECAST_RETENTION_DAYS before this one are
+    deleted in the same transaction.
+    """
+    as_of = as_of or date.today()
+    start = as_of - timedelta(days=history_days)
+
+    keys, matrix = load_series(db, start, history_days)
+    if not len(keys):
+        return {"series": 0, "horizon": horizon, "method": method}
+
+    demand, confidence = forecast(matrix, horizon, method)
+    generated_at = datetime.utcnow()
+
+    rows = [
+        {
+            "location_id": location_id,
+            "product_id": product_id,
+            "predicted_demand": predicted,
+            "confidence_level": conf,
+            "timestamp": generated_at,
+        }
+        for location_id, product_id, predicted, conf in zip(
+            keys[:, 0].tolist(), keys[:, 1].tolist(), demand.tolist(), confidence.tolist()
+        )
+    ]
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(ForecastingResult), rows[i:i + INSERT_BATCH_SIZE])
+    cutoff = generated_at - timedelta(days=settings.forecast_retention_days)
+    pruned = db.execute(delete(ForecastingResult).where(ForecastingResult.timestamp < cutoff)).rowcount
+    db.commit()
+
+    return {
+        "series": len(rows),
+        "horizon": horizon,
+        "method": method,
+        "generated_at": generated_at,
+        "pruned": pruned,
+    }
+
+
+def latest(
+    db: Session,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    limit: int = 500,
+):
+    """Forecasts of the newest run, highest predicted demand first.
+
+    The run's timestamp is one max() off idx_forecasting_run_demand, and the
+    rows come back in index order, so older runs are never read. Series
+    without sales in the newest run's history window have no forecast.
+    """
+    newest = select(func.max(ForecastingResult.timestamp)).scalar_subquery()
+
+    query = (
+        db.query(
+            ForecastingResult.location_id,
+            Location.location_name,
+            ForecastingResult.product_id,
+            Product.name,
+            ForecastingResult.predicted_demand,
+            ForecastingResult.confidence_level,
+            ForecastingResult.timestamp,
+        )
+        .outerjoin(Location, Location.location_id == ForecastingResult.location_id)
+        .outerjoin(Product, Product.product_id == ForecastingResult.product_id)
+        .filter(ForecastingResult.timestamp == newest)
+    )
+    query = scope_to_location(query, ForecastingResult.location_id, region_id, location_id)
+    if product_id:
+        query = query.filter(ForecastingResult.product_id == product_id)
+
+    return [
+        {
+            "location_id": loc_id,
+            "location_name": location_name,
+            "product_id": prod_id,
+            "product_name": product_name,
+            "predicted_demand": predicted,
+            "confidence_level": float(conf) if conf is not None else None,
+            "timestamp": timestamp,
+        }
+        for loc_id, location_name, prod_id, product_name, predicted, conf, timestamp in query.order_by(
+            ForecastingResult.predicted_demand.desc()
+        ).limit(limit).all()
+    ]
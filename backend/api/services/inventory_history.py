@@ -0,0 +1,164 @@
+"""Inventory as of a past moment, from checkpoints plus inventory_logs.
+
+`checkpoint` snapshots every non-zero inventory line into
+inventory_checkpoints. `as_of(T)` starts from whichever snapshot is closest to
+T (the live inventory table counts as one taken now) and applies the log
+deltas between the two in one grouped query: added when the snapshot is
+before T, subtracted when it is after. Only the logs in that window are read,
+and with inventory_logs partitioned by month only their partitions, so the
+cost depends on the checkpoint interval rather than on how much history is
+kept.
+
+`compact_logs` folds old log rows into one net row per (location, product)
+per day, stamped with the last change it replaces. Days are also split at
+checkpoints, so as-of answers stay exact at checkpoints, day boundaries and
+any moment outside a line's first and last change of the day.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import TIMESTAMP, and_, delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from api import cache
+from api.filters import scope_to_location
+from api.models import Inventory, InventoryCheckpoint, InventoryLog, Location, Product
+from api.services.partitions import add_months
+
+COMPACTED_REASON = "Compacted"
+
+
+def checkpoint(db: Session) -> dict:
+    """Snapshot the current quantity of every non-zero line. Commits.
+
+    On Postgres inventory is locked in SHARE mode for the copy, so in-flight
+    stock movements finish first and new ones wait until it is taken.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE inventory IN SHARE MODE"))
+    at = datetime.utcnow()
+    quantity = func.sum(Inventory.quantity)
+    lines = db.execute(
+        insert(InventoryCheckpoint).from_select(
+            ["checkpoint_at", "location_id", "product_id", "quantity"],
+            select(literal(at, TIMESTAMP), Inventory.location_id, Inventory.product_id, quantity)
+            .group_by(Inventory.location_id, Inventory.product_id)
+            .having(quantity != 0),
+        )
+    ).rowcount
+    db.commit()
+    return {"checkpoint_at": at, "lines": lines}
+
+
+def as_of(
+    db: Session,
+    when: datetime,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+) -> List[dict]:
+    """Quantity of every (location, product) line at `when`, with its names."""
+    log = InventoryLog
+    earlier = db.execute(
+        select(func.max(InventoryCheckpoint.checkpoint_at)).where(InventoryCheckpoint.checkpoint_at <= when)
+    ).scalar()
+    later = db.execute(
+        select(func.min(InventoryCheckpoint.checkpoint_at)).where(InventoryCheckpoint.checkpoint_at > when)
+    ).scalar()
+    later_at = later or datetime.utcnow()
+
+    if earlier is not None and when - earlier <= later_at - when:
+        # Roll the earlier snapshot forward
+        base = select(
+            InventoryCheckpoint.location_id, InventoryCheckpoint.product_id, InventoryCheckpoint.quantity
+        ).where(InventoryCheckpoint.checkpoint_at == earlier)
+        base = scope_to_location(base, InventoryCheckpoint.location_id, region_id, location_id)
+        deltas = select(log.location_id, log.product_id, log.quantity_change).where(
+            log.timestamp > earlier, log.timestamp <= when
+        )
+    elif later is not None:
+        # Roll the later snapshot back
+        base = select(
+            InventoryCheckpoint.location_id, InventoryCheckpoint.product_id, InventoryCheckpoint.quantity
+        ).where(InventoryCheckpoint.checkpoint_at == later)
+        base = scope_to_location(base, InventoryCheckpoint.location_id, region_id, location_id)
+        deltas = select(log.location_id, log.product_id, -log.quantity_change).where(
+            log.timestamp > when, log.timestamp <= later
+        )
+    else:
+        # Roll the live inventory back
+        base = select(Inventory.location_id, Inventory.product_id, Inventory.quantity)
+        base = scope_to_location(base, Inventory.location_id, region_id, location_id)
+        deltas = select(log.location_id, log.product_id, -log.quantity_change).where(log.timestamp > when)
+    deltas = scope_to_location(deltas, log.location_id, region_id, location_id)
+
+    lines = base.union_all(deltas).subquery("lines")
+    totals = (
+        select(lines.c.location_id, lines.c.product_id, func.sum(lines.c.quantity).label("quantity"))
+        .group_by(lines.c.location_id, lines.c.product_id)
+        .subquery("totals")
+    )
+    rows = db.execute(
+        select(totals.c.location_id, Location.location_name, totals.c.product_id, Product.name, totals.c.quantity)
+        .join(Location, Location.location_id == totals.c.location_id)
+        .join(Product, Product.product_id == totals.c.product_id)
+        .order_by(totals.c.location_id, totals.c.product_id)
+    ).all()
+
+    return [
+        {
+            "location_id": line_location_id,
+            "location_name": location_name,
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": int(quantity),
+            "as_of": when,
+        }
+        for line_location_id, location_name, product_id, product_name, quantity in rows
+    ]
+
+
+def compact_logs(db: Session, before: datetime) -> dict:
+    """Fold log rows up to `before` into net daily rows, one month per transaction. Commits.
+
+    Rows already compacted are left alone, so it can be rerun with a later
+    cutoff. Lines whose changes cancel out over a day leave no row.
+    """
+    log = InventoryLog
+    oldest = db.execute(
+        select(func.min(log.timestamp)).where(log.timestamp <= before, log.reason != COMPACTED_REASON)
+    ).scalar()
+    summary = {"removed": 0, "written": 0}
+    if oldest is None:
+        return summary
+
+    # Segments are (start, end], the same side of a checkpoint that as_of uses
+    first = oldest - timedelta(microseconds=1)
+    month = datetime(first.year, first.month, 1)
+    while month < before:
+        following = datetime.combine(add_months(month.date(), 1), datetime.min.time())
+        checkpoints = db.execute(
+            select(InventoryCheckpoint.checkpoint_at.distinct()).where(
+                InventoryCheckpoint.checkpoint_at > month, InventoryCheckpoint.checkpoint_at < following
+            )
+        ).scalars()
+        days = (month + timedelta(days=offset) for offset in range((following - month).days + 1))
+        bounds = sorted({bound for bound in (*days, *checkpoints) if bound < before} | {min(following, before)})
+
+        for start, end in zip(bounds, bounds[1:]):
+            segment = and_(log.timestamp > start, log.timestamp <= end, log.reason != COMPACTED_REASON)
+            change = func.sum(log.quantity_change)
+            summary["written"] += db.execute(
+                insert(log).from_select(
+                    ["location_id", "product_id", "quantity_change", "reason", "timestamp"],
+                    select(log.location_id, log.product_id, change, literal(COMPACTED_REASON), func.max(log.timestamp))
+                    .where(segment)
+                    .group_by(log.location_id, log.product_id)
+                    .having(change != 0),
+                )
+            ).rowcount
+            summary["removed"] += db.execute(delete(log).where(segment)).rowcount
+        db.commit()
+        month = following
+
+    cache.bump("inventory")
+    return summary
@@ -0,0 +1,161 @@
+"""Monthly range partitions for the append-only history tables.
+
+`sales` and `inventory_logs` are partitioned on `timestamp`, one partition per
+calendar month named `<table>_pYYYYMM`, plus `<table>_default` for rows that
+fall outside every month created so far. A query bounded on `timestamp` only
+scans the months it overlaps, so last week's sales cost the same however much
+history is kept.
+
+`ensure` creates the months ahead of time (and any month that has rows parked
+in the default partition, moving them into place); `archive` detaches months
+past the retention period, writes each to a gzip'd CSV with COPY TO STDOUT and
+drops it. Both are run by `python manage.py maintain-partitions`.
+
+Only Postgres is partitioned; on other databases both are no-ops.
+"""
+import gzip
+import re
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from api import cache
+
+PARTITIONED_TABLES = ("sales", "inventory_logs")
+CACHE_TOPICS = {"sales": "sales", "inventory_logs": "inventory"}
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    ).scalar()
+
+
+def list_partitions(db: Session, table: str) -> List[date]:
+    """First day of every monthly partition attached to `table`, oldest first."""
+    names = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).scalars()
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+    months = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _create_partition(db: Session, table: str, month: date) -> None:
+    name = partition_name(table, month)
+    bounds = {"low": month, "high": add_months(month, 1)}
+    in_month = "timestamp >= :low AND timestamp < :high"
+    parked = db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {in_month})"), bounds
+    ).scalar()
+
+    if not parked:
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{bounds['low']}') TO ('{bounds['high']}')"
+        ))
+        return
+
+    # Postgres refuses a new partition while the default one holds rows for
+    # its range, so build it standalone, move the rows across and attach it.
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(f"INSERT INTO {name} SELECT * FROM {table}_default WHERE {in_month}"), bounds)
+    db.execute(text(f"DELETE FROM {table}_default WHERE {in_month}"), bounds)
+    db.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['low']}') TO ('{bounds['high']}')"
+    ))
+
+
+def ensure(db: Session, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """Create every missing month from the oldest parked row up to `months_ahead` out. Commits."""
+    current = month_start(today or date.today())
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        existing = set(list_partitions(db, table))
+        oldest_parked = db.execute(text(f"SELECT MIN(timestamp) FROM {table}_default")).scalar()
+        month = min(current, month_start(oldest_parked)) if oldest_parked else current
+        while month <= add_months(current, months_ahead):
+            if month not in existing:
+                _create_partition(db, table, month)
+                db.commit()
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def archive(
+    db: Session,
+    retain_months: int,
+    archive_dir: Optional[Path] = None,
+    today: Optional[date] = None,
+) -> List[dict]:
+    """Detach every month older than `retain_months` full months before the current one.
+
+    With `archive_dir` each detached month is written to
+    `<archive_dir>/<partition>.csv.gz` and then dropped; without it the tables
+    are only detached and stay queryable by name. A month is detached and
+    committed before it is exported, so a failed export leaves the data in
+    place. sales_aggregates is not touched, so reports over archived months
+    keep working.
+    """
+    cutoff = add_months(month_start(today or date.today()), -retain_months)
+    if archive_dir is not None:
+        archive_dir.mkdir(parents=True, exist_ok=True)
+
+    archived = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        for month in list_partitions(db, table):
+            if month >= cutoff:
+                break
+            name = partition_name(table, month)
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            db.commit()
+            rows = db.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+            entry = {"partition": name, "rows": rows, "file": None}
+
+            if archive_dir is not None:
+                path = archive_dir / f"{name}.csv.gz"
+                partial = path.with_name(path.name + ".partial")
+                cursor = db.connection().connection.cursor()
+                with gzip.open(partial, "wb", compresslevel=6) as out:
+                    cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", out)
+                partial.replace(path)
+                db.execute(text(f"DROP TABLE {name}"))
+                db.commit()
+                entry["file"] = str(path)
+
+            archived.append(entry)
+            cache.bump(CACHE_TOPICS[table])
+    return archived
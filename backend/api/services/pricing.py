@@ -0,0 +1,121 @@
+"""Per-(location, product) pricing recommendations from sell-through and shelf life.
+
+One grouped query joins current inventory to units sold per location and
+product over the window (from the sales_aggregates buckets). Velocity, days of
+cover and the recommendation are then computed on NumPy arrays for the whole
+result at once. Results are cached per filter and dropped when sales or
+inventory change.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from api.cache import ResultCache
+from api.filters import scope_to_location
+from api.models import Inventory, Location, Product, SalesAggregate
+
+REDUCE = "Reduce Price"
+INCREASE = "Increase Price"
+MAINTAIN = "Maintain Price"
+RECOMMENDATIONS = (REDUCE, INCREASE, MAINTAIN)
+
+_cache = ResultCache(topics=("sales", "inventory", "products"), ttl=300)
+
+
+def _compute(
+    db: Session,
+    region_id: Optional[int],
+    location_id: Optional[int],
+    window_days: int,
+    low_cover_days: float,
+):
+    window_start = date.today() - timedelta(days=window_days)
+    sold = select(
+        SalesAggregate.location_id,
+        SalesAggregate.product_id,
+        func.sum(SalesAggregate.units_sold).label("units_sold"),
+    ).where(SalesAggregate.sale_date > window_start)
+    sold = scope_to_location(sold, SalesAggregate.location_id, region_id, location_id)
+    sold = sold.group_by(SalesAggregate.location_id, SalesAggregate.product_id).subquery()
+
+    query = (
+        db.query(
+            Inventory.location_id,
+            Location.location_name,
+            Inventory.product_id,
+            Product.name,
+            Inventory.quantity,
+            Product.shelf_life_days,
+            func.coalesce(sold.c.units_sold, 0),
+        )
+        .join(Product, Product.product_id == Inventory.product_id)
+        .join(Location, Location.location_id == Inventory.location_id)
+        .outerjoin(
+            sold,
+            and_(sold.c.location_id == Inventory.location_id, sold.c.product_id == Inventory.product_id),
+        )
+    )
+    query = scope_to_location(query, Inventory.location_id, region_id, location_id)
+    rows = query.all()
+    if not rows:
+        return []
+
+    location_ids, location_names, product_ids, product_names, quantity, shelf_life, units_sold = zip(*rows)
+    quantity = np.array(quantity, dtype=np.float64)
+    units_sold = np.array(units_sold, dtype=np.float64)
+    shelf_life = np.array([np.nan if s is None else s for s in shelf_life], dtype=np.float64)
+
+    velocity = units_sold / window_days
+    cover = np.divide(quantity, velocity, out=np.full_like(quantity, np.inf), where=velocity > 0)
+
+    # Stock that will not sell through before it expires gets marked down,
+    # harder the further cover overshoots shelf life (5-30%). Lines close to
+    # selling out can take a small increase.
+    reduce = (quantity > 0) & (cover > shelf_life)
+    increase = ~reduce & (velocity > 0) & (cover < low_cover_days)
+
+    recommendation = np.where(reduce, REDUCE, np.where(increase, INCREASE, MAINTAIN))
+    # np.where evaluates both branches; rows that are not marked down may
+    # overflow here and are discarded anyway.
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        overshoot = 1 - shelf_life / cover
+        change_pct = np.where(
+            reduce,
+            -np.clip(np.rint(np.nan_to_num(overshoot) * 50), 5, 30),
+            np.where(increase, 5, 0),
+        )
+    cover_days = np.where(np.isfinite(cover), np.round(cover, 1), np.nan)
+
+    return [
+        {
+            "location_id": location_ids[i],
+            "location_name": location_names[i],
+            "product_id": product_ids[i],
+            "product_name": product_names[i],
+            "inventory": int(quantity[i]),
+            "units_sold": int(units_sold[i]),
+            "daily_velocity": round(float(velocity[i]), 2),
+            "days_of_cover": None if np.isnan(cover_days[i]) else float(cover_days[i]),
+            "shelf_life_days": None if np.isnan(shelf_life[i]) else int(shelf_life[i]),
+            "recommendation": str(recommendation[i]),
+            "suggested_price_change_pct": int(change_pct[i]),
+        }
+        for i in range(len(rows))
+    ]
+
+
+def recommendations(
+    db: Session,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    window_days: int = 14,
+    low_cover_days: float = 3.0,
+):
+    """Cached recommendations for one filter combination."""
+    key = (region_id, location_id, window_days, low_cover_days)
+    return _cache.get_or_compute(
+        key, lambda: _compute(db, region_id, location_id, window_days, low_cover_days)
+    )
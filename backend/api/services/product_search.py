@@ -0,0 +1,231 @@
+"""In-process product name search for autocomplete.
+
+Names are split into lowercase ASCII words. The distinct words are kept
+sorted, with the products containing each word laid out in one flat array in
+the same order, so all words starting with a prefix map to one contiguous
+slice of products. Typo tolerance comes from trigram postings over the
+vocabulary: a query word matches any word whose trigram similarity (as in
+pg_trgm) clears FUZZY_THRESHOLD. A product matches when every query word
+matches one of its words; scores add up per word (exact > prefix > fuzzy),
+with a bonus when the first query word starts the name and shorter names
+first on ties.
+
+Each worker builds the index on first use and rebuilds it when the
+"products" topic moves or after REFERENCE_CACHE_TTL_SECONDS, like the
+reference cache. Products created through this worker are added
+incrementally to a small side index instead of triggering a rebuild.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import chain
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from api import cache
+from api.config import settings
+from api.models import Product
+
+TOPICS = ("products",)
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.75
+FUZZY_WEIGHT = 0.7
+FIRST_WORD_BONUS = 0.25
+FUZZY_THRESHOLD = 0.3
+# Products added since the last full build; past this many the index is rebuilt
+MAX_RECENT = 1000
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(text: Optional[str]) -> List[str]:
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return _WORD.findall(ascii_text.lower())
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductIndex:
+    """Immutable word index over a list of products."""
+
+    def __init__(self, products: List[dict]):
+        self.products = products
+        self.name_lengths = np.array([len(p["name"] or "") for p in products], dtype=np.int32)
+        self.categories = np.array([p["category_id"] or -1 for p in products], dtype=np.int64)
+        self.suppliers = np.array([p["supplier_id"] or -1 for p in products], dtype=np.int64)
+
+        postings = defaultdict(set)
+        first_words = []
+        for row, product in enumerate(products):
+            name_words = words(product["name"])
+            first_words.append(name_words[0] if name_words else "")
+            for word in name_words:
+                postings[word].add(row)
+
+        self.vocabulary = sorted(postings)
+        sizes = [len(postings[word]) for word in self.vocabulary]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes, dtype=np.int64)))
+        self.rows = np.fromiter(
+            chain.from_iterable(sorted(postings[word]) for word in self.vocabulary),
+            dtype=np.int32, count=int(self.offsets[-1]),
+        )
+        word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        self.first_word = np.array([word_ids.get(word, -1) for word in first_words], dtype=np.int64)
+
+        grams = defaultdict(list)
+        gram_counts = []
+        for word_id, word in enumerate(self.vocabulary):
+            word_grams = trigrams(word)
+            gram_counts.append(len(word_grams))
+            for gram in word_grams:
+                grams[gram].append(word_id)
+        self.gram_words = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self.gram_counts = np.array(gram_counts, dtype=np.int32)
+
+    def _prefix_range(self, term: str):
+        return bisect_left(self.vocabulary, term), bisect_left(self.vocabulary, term + "\x7f")
+
+    def _similar_words(self, term: str):
+        """(word ids, similarity) for vocabulary words within FUZZY_THRESHOLD of `term`."""
+        query_grams = trigrams(term)
+        hits = [self.gram_words[gram] for gram in query_grams if gram in self.gram_words]
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.vocabulary))
+        similarity = shared / (len(query_grams) + self.gram_counts - shared)
+        similar = np.flatnonzero(similarity >= FUZZY_THRESHOLD)
+        return similar, similarity[similar]
+
+    def search(self, terms: List[str], category_id=None, supplier_id=None, limit=10, fuzzy=True) -> list:
+        """Top `limit` (score, product) pairs, best first."""
+        count = len(self.products)
+        if not count or not terms:
+            return []
+        total = np.zeros(count)
+        matched = np.ones(count, dtype=bool)
+        if category_id is not None:
+            matched &= self.categories == category_id
+        if supplier_id is not None:
+            matched &= self.suppliers == supplier_id
+
+        first_range = None
+        for term in terms:
+            best = np.zeros(count)
+            low, high = self._prefix_range(term)
+            if first_range is None:
+                first_range = (low, high)
+            if fuzzy and len(term) >= 3:
+                for word_id, similarity in zip(*self._similar_words(term)):
+                    rows = self.rows[self.offsets[word_id]:self.offsets[word_id + 1]]
+                    best[rows] = np.maximum(best[rows], similarity * FUZZY_WEIGHT)
+            if low < high:
+                rows = self.rows[self.offsets[low]:self.offsets[high]]
+                best[rows] = np.maximum(best[rows], PREFIX_SCORE)
+                if self.vocabulary[low] == term:
+                    best[self.rows[self.offsets[low]:self.offsets[low + 1]]] = EXACT_SCORE
+            matched &= best > 0
+            total += best
+
+        candidates = np.flatnonzero(matched)
+        if not len(candidates):
+            return []
+        scores = total[candidates] / len(terms)
+        low, high = first_range
+        first_word = self.first_word[candidates]
+        scores += np.where((first_word >= low) & (first_word < high), FIRST_WORD_BONUS, 0.0)
+
+        if len(candidates) > limit:
+            # Everything scoring at least the limit-th best, so ties are broken by name length below
+            cutoff = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= cutoff
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.lexsort((self.name_lengths[candidates], -scores))[:limit]
+        return [(float(scores[i]), self.products[candidates[i]]) for i in order]
+
+
+class Catalog:
+    """The full index plus a side index of products added since it was built."""
+
+    def __init__(self, products: List[dict], versions):
+        self.main = ProductIndex(products)
+        self.recent_products = []
+        self.recent = ProductIndex([])
+        self.versions = versions
+        ttl = settings.reference_cache_ttl_seconds
+        self.expires_at = time.monotonic() + ttl if ttl else None
+
+    def add(self, product: dict) -> None:
+        self.recent_products = self.recent_products + [product]
+        self.recent = ProductIndex(self.recent_products)
+
+    def search(self, query: str, category_id=None, supplier_id=None, limit=10, fuzzy=True) -> List[dict]:
+        terms = words(query)
+        hits = self.main.search(terms, category_id, supplier_id, limit, fuzzy)
+        if self.recent_products:
+            hits = sorted(
+                hits + self.recent.search(terms, category_id, supplier_id, limit, fuzzy),
+                key=lambda hit: (-hit[0], len(hit[1]["name"] or "")),
+            )[:limit]
+        return [dict(product, score=round(score, 3)) for score, product in hits]
+
+
+_catalog: Optional[Catalog] = None
+_build_lock = threading.Lock()
+
+
+def _serialize(product) -> dict:
+    return {
+        "product_id": product.product_id,
+        "name": product.name,
+        "category_id": product.category_id,
+        "supplier_id": product.supplier_id,
+        "price": float(product.price) if product.price is not None else None,
+    }
+
+
+def _is_current(catalog: Optional[Catalog]) -> bool:
+    return (
+        catalog is not None
+        and catalog.versions == cache.versions(TOPICS)
+        and (catalog.expires_at is None or time.monotonic() < catalog.expires_at)
+    )
+
+
+def get_catalog(db) -> Catalog:
+    """This worker's index, (re)built from the database when stale."""
+    global _catalog
+    catalog = _catalog
+    if _is_current(catalog):
+        return catalog
+    with _build_lock:
+        if not _is_current(_catalog):
+            versions = cache.versions(TOPICS)
+            rows = db.execute(
+                select(
+                    Product.product_id, Product.name, Product.category_id, Product.supplier_id, Product.price
+                ).order_by(Product.product_id)
+            ).all()
+            _catalog = Catalog([_serialize(row) for row in rows], versions)
+        return _catalog
+
+
+def add(product) -> None:
+    """Index a product committed by this worker without rebuilding. Call after bumping "products"."""
+    global _catalog
+    with _build_lock:
+        catalog = _catalog
+        if catalog is None:
+            return
+        if len(catalog.recent_products) >= MAX_RECENT:
+            _catalog = None  # the next search rebuilds from the database
+            return
+        catalog.add(_serialize(product))
+        catalog.versions = cache.versions(TOPICS)
@@ -0,0 +1,153 @@
+"""Purchase order intake and set-based status transitions.
+
+`create` writes any number of orders with one multi-row INSERT ... RETURNING
+and all of their lines with a second one, so a single order or a batch of
+hundreds costs the same handful of round trips. Supplier, location and
+product ids are not looked up first: the foreign keys reject bad ones and the
+violated constraint is reported back. A line without a price takes the
+product's current price inside the INSERT.
+
+`transition` moves a list of orders along Pending -> Shipped -> Delivered
+(or to Cancelled) with one UPDATE that only matches orders in an allowed
+starting status; the rest are reported as skipped.
+"""
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api import cache, events
+from api.models import OrderItem, Orders, Product
+
+STATUSES = ("Pending", "Shipped", "Delivered", "Cancelled")
+# target status -> the statuses an order may move to it from
+TRANSITIONS = {
+    "Shipped": ("Pending",),
+    "Delivered": ("Shipped",),
+    "Cancelled": ("Pending", "Shipped"),
+}
+
+# Postgres' default names for the REFERENCES constraints in schema.sql
+_CONSTRAINT_FIELDS = {
+    "orders_supplier_id_fkey": "supplier_id",
+    "orders_location_id_fkey": "location_id",
+    "order_items_product_id_fkey": "product_id",
+}
+
+
+class InvalidOrder(Exception):
+    """Raised when an order refers to a supplier, location or product that does not exist."""
+
+
+def _invalid_reference(exc: IntegrityError) -> InvalidOrder:
+    diag = getattr(exc.orig, "diag", None)
+    field = _CONSTRAINT_FIELDS.get(getattr(diag, "constraint_name", None))
+    if field is None and getattr(diag, "column_name", None) == "price":
+        # No price given and no product to take one from
+        field = "product_id"
+    if field is None:
+        return InvalidOrder("Invalid supplier_id, location_id or product_id")
+    return InvalidOrder(f"Invalid {field}")
+
+
+def create(db: Session, orders: List) -> List[dict]:
+    """Insert orders (objects with supplier_id, location_id, status, items) and their lines. Commits.
+
+    Raises InvalidOrder, with nothing written, if any id does not exist.
+    """
+    now = datetime.utcnow()
+    summaries = []
+    try:
+        created = db.execute(
+            insert(Orders).returning(Orders.order_id, sort_by_parameter_order=True),
+            [
+                {"supplier_id": order.supplier_id, "location_id": order.location_id,
+                 "status": order.status, "created_at": now}
+                for order in orders
+            ],
+        ).scalars().all()
+
+        lines = [
+            {"b_order_id": order_id, "b_product_id": item.product_id, "b_quantity": item.quantity, "b_price": item.price}
+            for order_id, order in zip(created, orders)
+            for item in order.items
+        ]
+        totals = {order_id: [0, 0, 0] for order_id in created}
+        if lines:
+            product_price = select(Product.price).where(
+                Product.product_id == bindparam("b_product_id")
+            ).scalar_subquery()
+            written = db.execute(
+                insert(OrderItem)
+                .values(
+                    order_id=bindparam("b_order_id"),
+                    product_id=bindparam("b_product_id"),
+                    quantity=bindparam("b_quantity"),
+                    price=func.coalesce(bindparam("b_price", type_=OrderItem.price.type), product_price),
+                )
+                .returning(OrderItem.order_id, OrderItem.quantity, OrderItem.price, sort_by_parameter_order=True),
+                lines,
+            ).all()
+            for order_id, quantity, price in written:
+                total = totals[order_id]
+                total[0] += 1
+                total[1] += quantity
+                total[2] += quantity * price
+
+        for order_id, order in zip(created, orders):
+            line_count, units, total_cost = totals[order_id]
+            summaries.append({
+                "order_id": order_id,
+                "supplier_id": order.supplier_id,
+                "location_id": order.location_id,
+                "status": order.status,
+                "created_at": now,
+                "lines": line_count,
+                "units": units,
+                "total_cost": total_cost,
+            })
+        events.publish(db, "order_created", summaries, at=now)  # ✅ Announced when the commit lands
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise _invalid_reference(exc) from exc
+
+    cache.bump("orders")
+    return summaries
+
+
+def transition(db: Session, order_ids: Iterable[int], status: str) -> dict:
+    """Move every listed order allowed to reach `status` there in one UPDATE. Commits."""
+    ids = sorted(set(order_ids))
+    now = datetime.utcnow()
+    # Lock in primary-key order first so overlapping batches can't deadlock
+    db.query(Orders.order_id).filter(Orders.order_id.in_(ids)).order_by(Orders.order_id).with_for_update().all()
+    moved = db.execute(
+        update(Orders)
+        .where(Orders.order_id.in_(ids), Orders.status.in_(TRANSITIONS[status]))
+        .values(status=status)
+        .returning(Orders.order_id, Orders.supplier_id, Orders.location_id)
+    ).all()
+
+    updated = {order_id for order_id, _, _ in moved}
+    skipped = []
+    rest = [order_id for order_id in ids if order_id not in updated]
+    if rest:
+        current = dict(db.execute(select(Orders.order_id, Orders.status).where(Orders.order_id.in_(rest))).all())
+        skipped = [{"order_id": order_id, "status": current.get(order_id)} for order_id in rest]
+
+    events.publish(
+        db,
+        "order_status",
+        [
+            {"order_id": order_id, "supplier_id": supplier_id, "location_id": location_id, "status": status}
+            for order_id, supplier_id, location_id in moved
+        ],
+        at=now,
+    )
+    db.commit()
+    if moved:
+        cache.bump("orders")
+    return {"status": status, "updated": sorted(updated), "skipped": skipped}
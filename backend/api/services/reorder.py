@@ -0,0 +1,158 @@
+"""Reorder-point scanning and bulk purchase order creation.
+
+One query finds every inventory line whose stock position (on hand plus
+units already on Pending/Shipped orders) is below the product's reorder
+point. The shortfall is topped up to `target_multiple` x reorder point and
+grouped into one order per (supplier, location); the orders are inserted
+with a single multi-row INSERT ... RETURNING and their lines with one COPY.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from api import cache, events
+from api.bulk import bulk_insert
+from api.filters import scope_to_location
+from api.models import Inventory, OrderItem, Orders, Product
+
+OPEN_STATUSES = ("Pending", "Shipped")
+ORDER_ITEM_COLUMNS = ("order_id", "product_id", "quantity", "price")
+# pg_advisory_xact_lock key: one reorder run at a time, so two runs can't
+# both see the same shortfall before either has committed its orders.
+REORDER_LOCK_KEY = 0x52454F52
+
+
+def scan(
+    db: Session,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    target_multiple: float = 2.0,
+) -> list:
+    """Every (location, product) below its reorder point, with the quantity to order."""
+    on_order = (
+        select(
+            Orders.location_id,
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity).label("quantity"),
+        )
+        .join(Orders, Orders.order_id == OrderItem.order_id)
+        .where(Orders.status.in_(OPEN_STATUSES))
+        .group_by(Orders.location_id, OrderItem.product_id)
+        .subquery("on_order")
+    )
+    on_order_quantity = func.coalesce(on_order.c.quantity, 0)
+
+    query = (
+        select(
+            Inventory.location_id,
+            Inventory.product_id,
+            Product.supplier_id,
+            Product.price,
+            Product.reorder_point,
+            Inventory.quantity,
+            on_order_quantity,
+        )
+        .join(Product, Product.product_id == Inventory.product_id)
+        .outerjoin(
+            on_order,
+            and_(on_order.c.location_id == Inventory.location_id, on_order.c.product_id == Inventory.product_id),
+        )
+        .where(
+            Product.supplier_id.isnot(None),
+            Product.reorder_point > 0,
+            Inventory.quantity + on_order_quantity < Product.reorder_point,
+        )
+        .order_by(Inventory.location_id, Product.supplier_id, Inventory.product_id)
+    )
+    query = scope_to_location(query, Inventory.location_id, region_id, location_id)
+
+    lines = []
+    for location_id, product_id, supplier_id, price, reorder_point, on_hand, incoming in db.execute(query):
+        quantity = math.ceil(reorder_point * target_multiple) - on_hand - incoming
+        if quantity > 0:
+            lines.append({
+                "location_id": location_id,
+                "product_id": product_id,
+                "supplier_id": supplier_id,
+                "price": price,
+                "reorder_point": reorder_point,
+                "on_hand": on_hand,
+                "on_order": int(incoming),
+                "quantity": quantity,
+            })
+    return lines
+
+
+def run(
+    db: Session,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    target_multiple: float = 2.0,
+    dry_run: bool = False,
+) -> dict:
+    """Create Pending orders and order_items for every shortfall. Commits unless `dry_run`."""
+    if db.get_bind().dialect.name == "postgresql" and not dry_run:
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": REORDER_LOCK_KEY})
+
+    lines = scan(db, region_id, location_id, target_multiple)
+    groups = defaultdict(list)
+    for line in lines:
+        groups[(line["supplier_id"], line["location_id"])].append(line)
+
+    summary = {
+        "dry_run": dry_run,
+        "orders_created": 0 if dry_run else len(groups),
+        "lines": len(lines),
+        "units": sum(line["quantity"] for line in lines),
+        "orders": [],
+    }
+    if dry_run or not groups:
+        db.rollback()
+        summary["orders"] = [
+            {"order_id": None, "supplier_id": supplier_id, "location_id": location_id, "lines": group}
+            for (supplier_id, location_id), group in groups.items()
+        ]
+        return summary
+
+    now = datetime.utcnow()
+    try:
+        created = db.execute(
+            insert(Orders).returning(Orders.order_id, sort_by_parameter_order=True),
+            [
+                {"supplier_id": supplier_id, "location_id": location_id, "status": "Pending", "created_at": now}
+                for supplier_id, location_id in groups
+            ],
+        ).scalars().all()
+
+        items = []
+        for order_id, ((supplier_id, location_id), group) in zip(created, groups.items()):
+            items.extend((order_id, line["product_id"], line["quantity"], line["price"]) for line in group)
+            summary["orders"].append({
+                "order_id": order_id,
+                "supplier_id": supplier_id,
+                "location_id": location_id,
+                "lines": len(group),
+                "units": sum(line["quantity"] for line in group),
+            })
+        bulk_insert(db, OrderItem.__table__, ORDER_ITEM_COLUMNS, items)
+        events.publish(
+            db,
+            "order_created",
+            [
+                {"order_id": order["order_id"], "supplier_id": order["supplier_id"],
+                 "location_id": order["location_id"], "status": "Pending", "created_at": now}
+                for order in summary["orders"]
+            ],
+            at=now,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    cache.bump("orders")
+    return summary
@@ -0,0 +1,165 @@
+"""Incrementally maintained daily sales buckets (the sales_aggregates table).
+
+Every write path that inserts into `sales` calls `apply_sales` inside its own
+transaction, so the buckets are always consistent with the raw log. Reporting
+reads (`period_totals`, the dashboard) only ever touch the buckets.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from api.filters import scope_to_location
+from api.models import Sales, SalesAggregate
+
+PERIODS = ("day", "week", "month")
+
+
+def upsert_insert(db: Session, table):
+    """Dialect-specific INSERT that supports ON CONFLICT (Postgres, or SQLite for tests)."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
+def apply_sales(db: Session, sales: Iterable) -> int:
+    """Add a batch of sales to their day buckets with one multi-row upsert.
+
+    `sales` are objects (or rows) exposing location_id, product_id, quantity,
+    total_price and timestamp. Lines are pre-summed per bucket first, since a
+    single INSERT ... ON CONFLICT may not touch the same row twice. Does not
+    commit; the caller owns the transaction. Returns the number of buckets.
+    """
+    buckets = defaultdict(lambda: [0, Decimal("0"), 0])
+    for sale in sales:
+        sale_date = (sale.timestamp or datetime.utcnow()).date()
+        bucket = buckets[(sale.location_id, sale.product_id, sale_date)]
+        bucket[0] += sale.quantity
+        bucket[1] += Decimal(str(sale.total_price))
+        bucket[2] += 1
+
+    if not buckets:
+        return 0
+
+    table = SalesAggregate.__table__
+    stmt = upsert_insert(db, table).values([
+        {
+            "location_id": location_id,
+            "product_id": product_id,
+            "sale_date": sale_date,
+            "units_sold": units,
+            "revenue": revenue,
+            "sale_count": count,
+        }
+        for (location_id, product_id, sale_date), (units, revenue, count) in buckets.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.location_id, table.c.product_id, table.c.sale_date],
+        set_={
+            "units_sold": table.c.units_sold + stmt.excluded.units_sold,
+            "revenue": table.c.revenue + stmt.excluded.revenue,
+            "sale_count": table.c.sale_count + stmt.excluded.sale_count,
+        },
+    )
+    db.execute(stmt)
+    return len(buckets)
+
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recompute buckets for [start, end] (inclusive dates) straight from `sales`.
+
+    Deletes the affected buckets and re-inserts them with a single
+    INSERT ... SELECT ... GROUP BY, so the whole backfill runs inside the
+    database. Commits and returns the number of buckets written.
+    """
+    sale_date = func.date(Sales.timestamp)
+    delete_query = db.query(SalesAggregate)
+    source = select(
+        Sales.location_id,
+        Sales.product_id,
+        sale_date,
+        func.sum(Sales.quantity),
+        func.sum(Sales.total_price),
+        func.count(Sales.sale_id),
+    ).where(Sales.location_id.isnot(None), Sales.product_id.isnot(None), Sales.timestamp.isnot(None))
+
+    if start:
+        delete_query = delete_query.filter(SalesAggregate.sale_date >= start)
+        source = source.where(Sales.timestamp >= datetime.combine(start, datetime.min.time()))
+    if end:
+        delete_query = delete_query.filter(SalesAggregate.sale_date <= end)
+        source = source.where(Sales.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    source = source.group_by(Sales.location_id, Sales.product_id, sale_date)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Hold off concurrent apply_sales upserts until the rebuilt buckets are
+        # committed; sales committed after the lock is released add on top.
+        db.execute(text("LOCK TABLE sales_aggregates IN SHARE ROW EXCLUSIVE MODE"))
+    delete_query.delete(synchronize_session=False)
+    table = SalesAggregate.__table__
+    result = db.execute(
+        table.insert().from_select(
+            ["location_id", "product_id", "sale_date", "units_sold", "revenue", "sale_count"],
+            source,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def period_start(db: Session, column, period: str):
+    """SQL expression truncating a DATE column to the start of its day/week/month."""
+    if period == "day":
+        return column
+    if db.get_bind().dialect.name == "sqlite":
+        if period == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        return func.date(column, "start of month")
+    return func.date(func.date_trunc(period, column))
+
+
+def period_totals(
+    db: Session,
+    period: str,
+    start: date,
+    end: date,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    group_by: Optional[str] = None,
+):
+    """Units, revenue and sale count per period, served entirely from the buckets.
+
+    `group_by` may be "location" or "product" to split each period further.
+    """
+    bucket = period_start(db, SalesAggregate.sale_date, period).label("period_start")
+    keys = [bucket]
+    if group_by == "location":
+        keys.append(SalesAggregate.location_id)
+    elif group_by == "product":
+        keys.append(SalesAggregate.product_id)
+
+    query = db.query(
+        *keys,
+        func.sum(SalesAggregate.units_sold),
+        func.sum(SalesAggregate.revenue),
+        func.sum(SalesAggregate.sale_count),
+    ).filter(SalesAggregate.sale_date >= start, SalesAggregate.sale_date <= end)
+    query = scope_to_location(query, SalesAggregate.location_id, region_id, location_id)
+    if product_id:
+        query = query.filter(SalesAggregate.product_id == product_id)
+
+    results = []
+    for row in query.group_by(*keys).order_by(*keys).all():
+        *key_values, units, revenue, count = row
+        item = {"period_start": str(key_values[0])}
+        if group_by:
+            item[f"{group_by}_id"] = key_values[1]
+        item.update({"units_sold": int(units), "revenue": float(revenue), "sale_count": int(count)})
+        results.append(item)
+    return results
@@ -0,0 +1,55 @@
+"""Bulk sales ingestion: sales rows, inventory decrement, logs and rollups in one transaction."""
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from api import cache, events
+from api.bulk import bulk_insert
+from api.models import Sales
+from api.services import rollups, stock
+
+SALE_COLUMNS = ("location_id", "product_id", "quantity", "total_price", "timestamp")
+SaleRow = namedtuple("SaleRow", SALE_COLUMNS)
+
+
+def _location_totals(rows) -> list:
+    """One small summary per location for the live event stream, instead of one event per line."""
+    totals = {}
+    for row in rows:
+        entry = totals.setdefault(row.location_id, {"location_id": row.location_id, "lines": 0, "units": 0, "revenue": 0})
+        entry["lines"] += 1
+        entry["units"] += row.quantity
+        entry["revenue"] += row.total_price
+    return list(totals.values())
+
+
+def record_sales(db: Session, lines: Iterable, reason: str = "Sale") -> dict:
+    """Write a batch of sale lines and take their units out of stock.
+
+    `lines` expose location_id, product_id, quantity, total_price and an
+    optional timestamp. Stock is checked and decremented per (location,
+    product) before anything is inserted, so a batch that would oversell is
+    rejected with stock.InsufficientStock and nothing is written. Commits.
+    """
+    now = datetime.utcnow()
+    rows = []
+    demand = defaultdict(int)
+    for line in lines:
+        timestamp = line.timestamp or now
+        rows.append(SaleRow(line.location_id, line.product_id, line.quantity, line.total_price, timestamp))
+        demand[(line.location_id, line.product_id)] += line.quantity
+
+    try:
+        stock.decrement(db, demand, reason, at=now)
+        bulk_insert(db, Sales.__table__, SALE_COLUMNS, rows)
+        buckets = rollups.apply_sales(db, rows)
+        events.publish(db, "sales_batch", _location_totals(rows), at=now)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    cache.bump("sales", "inventory")
+    return {"lines": len(rows), "stock_lines": len(demand), "buckets": buckets}
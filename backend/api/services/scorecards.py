@@ -0,0 +1,138 @@
+"""Per-location scorecards for comparing stores within a region.
+
+One statement computes every location in the region: each metric is a CTE
+grouped by location_id (inventory value at current prices, revenue and units
+from the daily sales_aggregates buckets, wastage, open orders), left-joined
+onto the region's locations. The region's totals are the sum of its rows. A
+location's scorecard is its row out of the cached region result, so looking
+at several stores of one region runs the query once.
+
+Windows are whole days ending today, which keeps cache keys stable between
+requests. Results are cached briefly and dropped when any of the underlying
+topics move.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from api.cache import ResultCache
+from api.models import Inventory, Location, Orders, Product, SalesAggregate, WastageRecord
+from api.services.reorder import OPEN_STATUSES
+
+METRICS = ("inventory_value", "revenue", "units_sold", "wastage_quantity", "open_orders")
+
+_cache = ResultCache(topics=("sales", "inventory", "orders", "products", "wastage", "locations"), ttl=30)
+
+
+def _compute(db: Session, region_id: int, days: int) -> dict:
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    in_region = select(Location.location_id).where(Location.region_id == region_id)
+
+    stock = (
+        select(
+            Inventory.location_id,
+            func.sum(Inventory.quantity * func.coalesce(Product.price, 0)).label("inventory_value"),
+        )
+        .join(Product, Product.product_id == Inventory.product_id)
+        .where(Inventory.location_id.in_(in_region))
+        .group_by(Inventory.location_id)
+        .cte("stock")
+    )
+    sold = (
+        select(
+            SalesAggregate.location_id,
+            func.sum(SalesAggregate.revenue).label("revenue"),
+            func.sum(SalesAggregate.units_sold).label("units_sold"),
+        )
+        .where(
+            SalesAggregate.location_id.in_(in_region),
+            SalesAggregate.sale_date >= start,
+            SalesAggregate.sale_date <= end,
+        )
+        .group_by(SalesAggregate.location_id)
+        .cte("sold")
+    )
+    wasted = (
+        select(WastageRecord.location_id, func.sum(WastageRecord.quantity).label("wastage_quantity"))
+        .where(
+            WastageRecord.location_id.in_(in_region),
+            WastageRecord.timestamp >= start,
+            WastageRecord.timestamp < end + timedelta(days=1),
+        )
+        .group_by(WastageRecord.location_id)
+        .cte("wasted")
+    )
+    pending = (
+        select(Orders.location_id, func.count(Orders.order_id).label("open_orders"))
+        .where(Orders.location_id.in_(in_region), Orders.status.in_(OPEN_STATUSES))
+        .group_by(Orders.location_id)
+        .cte("pending")
+    )
+
+    rows = db.execute(
+        select(
+            Location.location_id,
+            Location.location_name,
+            func.coalesce(stock.c.inventory_value, 0),
+            func.coalesce(sold.c.revenue, 0),
+            func.coalesce(sold.c.units_sold, 0),
+            func.coalesce(wasted.c.wastage_quantity, 0),
+            func.coalesce(pending.c.open_orders, 0),
+        )
+        .outerjoin(stock, stock.c.location_id == Location.location_id)
+        .outerjoin(sold, sold.c.location_id == Location.location_id)
+        .outerjoin(wasted, wasted.c.location_id == Location.location_id)
+        .outerjoin(pending, pending.c.location_id == Location.location_id)
+        .where(Location.region_id == region_id)
+        .order_by(Location.location_id)
+    ).all()
+
+    locations = [
+        {
+            "location_id": location_id,
+            "location_name": location_name,
+            "inventory_value": round(float(inventory_value), 2),
+            "revenue": round(float(revenue), 2),
+            "units_sold": int(units_sold),
+            "wastage_quantity": int(wastage_quantity),
+            "open_orders": int(open_orders),
+        }
+        for location_id, location_name, inventory_value, revenue, units_sold, wastage_quantity, open_orders in rows
+    ]
+    totals = {metric: sum(location[metric] for location in locations) for metric in METRICS}
+    totals["inventory_value"] = round(totals["inventory_value"], 2)
+    totals["revenue"] = round(totals["revenue"], 2)
+    return {
+        "region_id": region_id,
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "locations": locations,
+    }
+
+
+def region_scorecard(db: Session, region_id: int, days: int = 30) -> dict:
+    """Scorecard rows for every location in the region plus the region's totals."""
+    return _cache.get_or_compute((region_id, days, date.today()), lambda: _compute(db, region_id, days))
+
+
+def location_scorecard(db: Session, location_id: int, days: int = 30) -> Optional[dict]:
+    """One location's row alongside its region's totals; None for an unknown location."""
+    region_id = db.execute(select(Location.region_id).where(Location.location_id == location_id)).scalar()
+    if region_id is None:
+        return None
+    scorecard = region_scorecard(db, region_id, days)
+    location = next((row for row in scorecard["locations"] if row["location_id"] == location_id), None)
+    if location is None:
+        return None
+    return {
+        **location,
+        "region_id": region_id,
+        "start": scorecard["start"],
+        "end": scorecard["end"],
+        "region_totals": scorecard["totals"],
+        "region_locations": len(scorecard["locations"]),
+    }
@@ -0,0 +1,118 @@
+"""Spoilage risk of the stock on hand, recomputed for every inventory line at once.
+
+For each (location, product) the open lots with an expiry date are taken in
+first-expiry-first-out order and sold down at the line's recent daily sales
+velocity (units over the last VELOCITY_DAYS days of sales_aggregates). With
+C_i the cumulative quantity up to lot i and d_i the days until lot i
+expires, the units still on the shelf when their lots expire are
+
+    at_risk = max(0, max_i(C_i - velocity * d_i))
+
+which NumPy evaluates for every lot of every line in a few array passes
+(cumsum, then maximum.reduceat per line). The risk score is the at-risk
+share of the line's dated stock, 0 to 1.
+
+`refresh` replaces the whole spoilage_risk table in one transaction, so
+readers always see one complete snapshot, and flagging at-risk stock is an
+index scan on risk_score instead of a join over lots and sales history.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from api.bulk import bulk_insert
+from api.models import InventoryLot, Product, SalesAggregate, SpoilageRisk
+
+VELOCITY_DAYS = 28
+RISK_COLUMNS = (
+    "location_id", "product_id", "on_hand", "daily_velocity", "days_of_cover", "next_expiry",
+    "at_risk_units", "at_risk_value", "risk_score", "computed_at",
+)
+
+
+def _velocity(db: Session, today: date, series_keys: np.ndarray) -> np.ndarray:
+    """Average units sold per day over the last VELOCITY_DAYS full days, per series key."""
+    rows = db.execute(
+        select(SalesAggregate.location_id, SalesAggregate.product_id, func.sum(SalesAggregate.units_sold))
+        .where(SalesAggregate.sale_date >= today - timedelta(days=VELOCITY_DAYS), SalesAggregate.sale_date < today)
+        .group_by(SalesAggregate.location_id, SalesAggregate.product_id)
+    ).all()
+    velocity = np.zeros(len(series_keys))
+    if not rows:
+        return velocity
+
+    location_ids, product_ids, units = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    keys = (location_ids << 32) | product_ids
+    index = np.minimum(np.searchsorted(series_keys, keys), len(series_keys) - 1)
+    found = series_keys[index] == keys
+    velocity[index[found]] = units[found] / VELOCITY_DAYS
+    return velocity
+
+
+def score(quantity: np.ndarray, days_left: np.ndarray, starts: np.ndarray, velocity: np.ndarray):
+    """Per-line (on_hand, at_risk_units) for lots grouped by line and sorted by expiry.
+
+    `starts` are the index of each line's first lot; `velocity` is per line.
+    """
+    counts = np.diff(np.append(starts, len(quantity)))
+    cumulative = np.cumsum(quantity)
+    # Cumulative quantity within each line: subtract everything before its first lot
+    line_cumulative = cumulative - np.repeat(cumulative[starts] - quantity[starts], counts)
+    excess = line_cumulative - np.repeat(velocity, counts) * days_left
+    at_risk = np.clip(np.maximum.reduceat(excess, starts), 0, None)
+    on_hand = np.add.reduceat(quantity, starts)
+    return on_hand, np.rint(at_risk).astype(np.int64)
+
+
+def refresh(db: Session) -> dict:
+    """Recompute spoilage_risk for every line holding dated stock. Commits."""
+    now = datetime.utcnow()
+    today = now.date()
+    # Served by the (location_id, product_id, expires_on) FEFO index over open lots
+    lots = db.execute(
+        select(InventoryLot.location_id, InventoryLot.product_id, InventoryLot.expires_on, InventoryLot.quantity)
+        .where(InventoryLot.quantity > 0, InventoryLot.expires_on.isnot(None))
+        .order_by(InventoryLot.location_id, InventoryLot.product_id, InventoryLot.expires_on)
+    ).all()
+
+    db.execute(delete(SpoilageRisk))
+    if not lots:
+        db.commit()
+        return {"lines": 0, "at_risk_lines": 0, "at_risk_units": 0}
+
+    location_ids, product_ids, expires_on, quantity = zip(*lots)
+    location_ids = np.fromiter(location_ids, dtype=np.int64, count=len(lots))
+    product_ids = np.fromiter(product_ids, dtype=np.int64, count=len(lots))
+    expires_on = np.array(expires_on, dtype="datetime64[D]")
+    quantity = np.fromiter(quantity, dtype=np.float64, count=len(lots))
+    # Lots already past their date count as expiring today
+    days_left = np.clip((expires_on - np.datetime64(today, "D")).astype(np.int64), 0, None)
+
+    packed = (location_ids << 32) | product_ids
+    starts = np.flatnonzero(np.r_[True, packed[1:] != packed[:-1]])
+    series_keys = packed[starts]
+    velocity = _velocity(db, today, series_keys)
+    on_hand, at_risk = score(quantity, days_left, starts, velocity)
+
+    line_products = product_ids[starts]
+    prices = dict(db.execute(
+        select(Product.product_id, Product.price).where(Product.product_id.in_(np.unique(line_products).tolist()))
+    ).all())
+    price = np.array([float(prices.get(product_id) or 0) for product_id in line_products.tolist()])
+    with np.errstate(divide="ignore"):
+        cover = np.where(velocity > 0, on_hand / velocity, np.nan)
+    risk = np.round(at_risk / np.maximum(on_hand, 1), 4)
+
+    rows = [
+        (location_id, product_id, int(units), round(v, 3), None if np.isnan(days) else round(days, 1),
+         expiry, int(risky), round(risky * unit_price, 2), r, now)
+        for location_id, product_id, units, v, days, expiry, risky, unit_price, r in zip(
+            location_ids[starts].tolist(), line_products.tolist(), on_hand.tolist(), velocity.tolist(),
+            cover.tolist(), expires_on[starts].tolist(), at_risk.tolist(), price.tolist(), risk.tolist(),
+        )
+    ]
+    bulk_insert(db, SpoilageRisk.__table__, RISK_COLUMNS, rows)
+    db.commit()
+    return {"lines": len(rows), "at_risk_lines": int((at_risk > 0).sum()), "at_risk_units": int(at_risk.sum())}
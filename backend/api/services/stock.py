@@ -0,0 +1,269 @@
+"""Set-based stock movements on the inventory table, with matching inventory_logs.
+
+Stock is held in lots (inventory_lots: one received batch with its expiry
+date); `inventory` keeps the per-(location, product) totals and is updated in
+the same transaction, so it stays a cheap aggregated view. Decrements take
+units from the lots that expire first (FEFO).
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, bindparam, column, func, select, tuple_, update, values
+
+from api.bulk import INSERT_BATCH_SIZE, bulk_insert
+from api.models import Inventory, InventoryLog, InventoryLot, Product
+from api.services.rollups import upsert_insert
+
+StockKey = Tuple[int, int]  # (location_id, product_id)
+LotPiece = namedtuple("LotPiece", ("location_id", "product_id", "expires_on", "quantity"))
+LOT_COLUMNS = ("location_id", "product_id", "quantity", "received_at", "expires_on")
+
+
+class InsufficientStock(Exception):
+    """Raised when a decrement would take one or more inventory lines below zero."""
+
+    def __init__(self, shortages: List[dict]):
+        super().__init__(f"Insufficient stock for {len(shortages)} location/product line(s)")
+        self.shortages = shortages
+
+
+def decrement(db, demand: Dict[StockKey, int], reason: str, at: Optional[datetime] = None) -> List[LotPiece]:
+    """Subtract `demand[(location_id, product_id)]` units from inventory.
+
+    Every line is updated by one UPDATE ... FROM (VALUES ...) that only matches
+    rows with enough stock; if any line is missing or short the whole batch is
+    refused with InsufficientStock (the caller rolls back). Rows are locked in
+    primary-key order first so concurrent batches cannot deadlock each other.
+    The units come out of the lots first-expiry-first-out; the pieces taken
+    are returned. One inventory_logs row per line is appended. Does not commit.
+    """
+    if not demand:
+        return []
+    at = at or datetime.utcnow()
+    keys = list(demand)
+
+    db.query(Inventory.inventory_id).filter(
+        tuple_(Inventory.location_id, Inventory.product_id).in_(keys)
+    ).order_by(Inventory.inventory_id).with_for_update().all()
+
+    if db.get_bind().dialect.name == "postgresql":
+        lines = values(
+            column("location_id", Integer),
+            column("product_id", Integer),
+            column("quantity", Integer),
+            name="demand",
+        ).data([(location_id, product_id, qty) for (location_id, product_id), qty in demand.items()])
+
+        updated = db.execute(
+            update(Inventory)
+            .where(
+                Inventory.location_id == lines.c.location_id,
+                Inventory.product_id == lines.c.product_id,
+                Inventory.quantity >= lines.c.quantity,
+            )
+            .values(quantity=Inventory.quantity - lines.c.quantity, last_updated=at)
+            .returning(Inventory.location_id, Inventory.product_id),
+            execution_options={"synchronize_session": False},
+        ).all()
+    else:
+        # SQLite can't alias VALUES columns; same conditional update, one line at a time
+        updated = []
+        for (location_id, product_id), qty in demand.items():
+            result = db.execute(
+                update(Inventory)
+                .where(
+                    Inventory.location_id == location_id,
+                    Inventory.product_id == product_id,
+                    Inventory.quantity >= qty,
+                )
+                .values(quantity=Inventory.quantity - qty, last_updated=at),
+                execution_options={"synchronize_session": False},
+            )
+            if result.rowcount:
+                updated.append((location_id, product_id))
+
+    updated = set(map(tuple, updated))
+    if len(updated) < len(keys):
+        missing = [key for key in keys if key not in updated]
+        on_hand = {
+            (location_id, product_id): quantity
+            for location_id, product_id, quantity in db.query(
+                Inventory.location_id, Inventory.product_id, Inventory.quantity
+            ).filter(tuple_(Inventory.location_id, Inventory.product_id).in_(missing))
+        }
+        raise InsufficientStock([
+            {
+                "location_id": location_id,
+                "product_id": product_id,
+                "requested": demand[(location_id, product_id)],
+                "available": on_hand.get((location_id, product_id), 0),
+            }
+            for location_id, product_id in missing
+        ])
+
+    pieces = deplete_lots(db, demand)
+    log_rows(db, {key: -qty for key, qty in demand.items()}, reason, at)
+    return pieces
+
+
+def increment(
+    db,
+    supply: Dict[StockKey, int],
+    reason: str,
+    at: Optional[datetime] = None,
+    lots: Iterable[LotPiece] = (),
+) -> None:
+    """Add `supply[(location_id, product_id)]` units to inventory.
+
+    Every line is written by one INSERT ... ON CONFLICT (location_id,
+    product_id) DO UPDATE, so lines the location doesn't stock yet are created
+    and existing ones topped up without a check-then-insert race; rows go in
+    key order so concurrent batches lock in the same order. `lots` describes
+    the batches the units arrive in (e.g. the pieces a transfer took from its
+    source); anything they don't cover becomes a fresh lot expiring after the
+    product's shelf life. One inventory_logs row per line is appended. Does
+    not commit.
+    """
+    if not supply:
+        return
+    at = at or datetime.utcnow()
+    keys = sorted(supply)
+
+    table = Inventory.__table__
+    for i in range(0, len(keys), INSERT_BATCH_SIZE):
+        stmt = upsert_insert(db, table).values([
+            {
+                "location_id": location_id,
+                "product_id": product_id,
+                "quantity": supply[(location_id, product_id)],
+                "last_updated": at,
+            }
+            for location_id, product_id in keys[i:i + INSERT_BATCH_SIZE]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.location_id, table.c.product_id],
+            set_={"quantity": table.c.quantity + stmt.excluded.quantity, "last_updated": stmt.excluded.last_updated},
+        )
+        db.execute(stmt)
+
+    lots = list(lots)
+    covered = defaultdict(int)
+    for lot in lots:
+        covered[(lot.location_id, lot.product_id)] += lot.quantity
+    remainder = {key: qty - covered[key] for key, qty in supply.items() if qty > covered[key]}
+    add_lots(db, lots + fresh_lots(db, remainder, at), at)
+    log_rows(db, supply, reason, at)
+
+
+def fresh_lots(db, supply: Dict[StockKey, int], at: datetime) -> List[LotPiece]:
+    """One lot per line, expiring `shelf_life_days` after `at` (never, if unset)."""
+    if not supply:
+        return []
+    shelf_life = dict(
+        db.query(Product.product_id, Product.shelf_life_days).filter(
+            Product.product_id.in_({product_id for _, product_id in supply})
+        )
+    )
+    return [
+        LotPiece(
+            location_id,
+            product_id,
+            (at + timedelta(days=shelf_life[product_id])).date() if shelf_life.get(product_id) is not None else None,
+            qty,
+        )
+        for (location_id, product_id), qty in supply.items()
+    ]
+
+
+def add_lots(db, lots: Iterable[LotPiece], received_at: datetime) -> int:
+    return bulk_insert(
+        db,
+        InventoryLot.__table__,
+        LOT_COLUMNS,
+        (
+            (lot.location_id, lot.product_id, lot.quantity, received_at, lot.expires_on)
+            for lot in lots
+            if lot.quantity > 0
+        ),
+    )
+
+
+def deplete_lots(db, demand: Dict[StockKey, int]) -> List[LotPiece]:
+    """Take `demand` units from each line's lots, earliest expiry first.
+
+    Each lot gives min(its quantity, demand still open after the lots that
+    expire before it); on Postgres a running SUM() window over the lots does
+    that for every line in one UPDATE. Callers hold the inventory row locks,
+    which serialize writers of the same lots. Lots with no expiry go last.
+    Returns the pieces taken, in FEFO order per line.
+    """
+    lot = InventoryLot.__table__
+    fefo_order = (lot.c.expires_on.asc().nulls_last(), lot.c.lot_id)
+
+    if db.get_bind().dialect.name == "postgresql":
+        lines = values(
+            column("location_id", Integer),
+            column("product_id", Integer),
+            column("quantity", Integer),
+            name="demand",
+        ).data([(location_id, product_id, qty) for (location_id, product_id), qty in demand.items()])
+
+        running = func.sum(lot.c.quantity).over(
+            partition_by=(lot.c.location_id, lot.c.product_id), order_by=fefo_order
+        )
+        ranked = (
+            select(
+                lot.c.lot_id,
+                lot.c.quantity,
+                lines.c.quantity.label("wanted"),
+                (running - lot.c.quantity).label("taken_before"),
+            )
+            .join(lines, and_(lot.c.location_id == lines.c.location_id, lot.c.product_id == lines.c.product_id))
+            .where(lot.c.quantity > 0)
+            .cte("ranked")
+        )
+        taken = func.least(ranked.c.quantity, ranked.c.wanted - ranked.c.taken_before)
+        rows = db.execute(
+            update(lot)
+            .where(lot.c.lot_id == ranked.c.lot_id, ranked.c.taken_before < ranked.c.wanted)
+            .values(quantity=lot.c.quantity - taken)
+            .returning(lot.c.location_id, lot.c.product_id, lot.c.expires_on, taken, lot.c.lot_id)
+        ).all()
+        rows.sort(key=lambda row: (row[0], row[1], row[2] or date.max, row[4]))
+        return [LotPiece(*row[:4]) for row in rows]
+
+    # SQLite: same FEFO walk in Python over the open lots, one executemany
+    open_lots = db.execute(
+        select(lot.c.lot_id, lot.c.location_id, lot.c.product_id, lot.c.expires_on, lot.c.quantity)
+        .where(tuple_(lot.c.location_id, lot.c.product_id).in_(list(demand)), lot.c.quantity > 0)
+        .order_by(lot.c.location_id, lot.c.product_id, *fefo_order)
+    ).all()
+    wanted = dict(demand)
+    pieces, changes = [], []
+    for lot_id, location_id, product_id, expires_on, quantity in open_lots:
+        take = min(quantity, wanted[(location_id, product_id)])
+        if take > 0:
+            wanted[(location_id, product_id)] -= take
+            pieces.append(LotPiece(location_id, product_id, expires_on, take))
+            changes.append({"b_lot_id": lot_id, "b_quantity": quantity - take})
+    if changes:
+        db.execute(
+            update(lot).where(lot.c.lot_id == bindparam("b_lot_id")).values(quantity=bindparam("b_quantity")),
+            changes,
+        )
+    return pieces
+
+
+def log_rows(db, changes: Dict[StockKey, int], reason: str, at: datetime) -> int:
+    """Append one inventory_logs row per (location_id, product_id) change."""
+    return bulk_insert(
+        db,
+        InventoryLog.__table__,
+        ("location_id", "product_id", "quantity_change", "reason", "timestamp"),
+        (
+            (location_id, product_id, change, reason, at)
+            for (location_id, product_id), change in changes.items()
+            if change
+        ),
+    )
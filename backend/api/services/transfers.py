@@ -0,0 +1,216 @@
+"""In-region stock transfer planning and execution.
+
+Current inventory and units sold over a recent window are loaded for every
+(location, product) in one query. Each line gets a surplus (stock beyond
+`surplus_cover_days` of sales, or everything when nothing sold) or a deficit
+(stock short of `target_cover_days`). Surplus is then matched to deficit
+within each (region, product), largest donors to largest receivers.
+
+The matching runs for all regions and products at once: donors and receivers
+are laid out on one number line, each (region, product) occupying a stretch
+as long as the units it can actually move, and every donor/receiver an
+interval in it sized by its surplus/deficit. Each run between consecutive
+interval boundaries is one transfer, found with `np.searchsorted`, so the
+cost is a few sorts over the inventory rather than a loop per product.
+
+There are no distances between stores, so every store in a region is an
+equally good source; greedy largest-first matching keeps the number of
+shipments low.
+"""
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from api import cache
+from api.bulk import bulk_insert
+from api.models import Inventory, Location, SalesAggregate, StockTransfer
+from api.services import stock
+
+TRANSFER_COLUMNS = ("from_location", "to_location", "product_id", "quantity", "timestamp")
+
+
+def _load(db: Session, region_id: Optional[int], window_days: int):
+    window_start = date.today() - timedelta(days=window_days)
+    sold = (
+        select(
+            SalesAggregate.location_id,
+            SalesAggregate.product_id,
+            func.sum(SalesAggregate.units_sold).label("units_sold"),
+        )
+        .where(SalesAggregate.sale_date > window_start)
+        .group_by(SalesAggregate.location_id, SalesAggregate.product_id)
+        .subquery()
+    )
+    query = (
+        select(
+            Location.region_id,
+            Inventory.location_id,
+            Inventory.product_id,
+            Inventory.quantity,
+            func.coalesce(sold.c.units_sold, 0),
+        )
+        .join(Location, Location.location_id == Inventory.location_id)
+        .outerjoin(
+            sold,
+            and_(sold.c.location_id == Inventory.location_id, sold.c.product_id == Inventory.product_id),
+        )
+        .where(Location.region_id.isnot(None))
+    )
+    if region_id:
+        query = query.where(Location.region_id == region_id)
+
+    rows = db.execute(query).all()
+    if not rows:
+        return np.empty((0, 5), dtype=np.int64)
+    return np.array(rows, dtype=np.int64)
+
+
+def _intervals(group, amount, matched_start, matched_total):
+    """Global [start, end) of each entry, clipped to its group's matched stretch.
+
+    Entries must be sorted by group; `matched_start`/`matched_total` are
+    indexed by the group's position in the sorted group list.
+    """
+    if not len(group):
+        return np.empty(0, dtype=np.int64)
+    cumulative = np.cumsum(amount)
+    first_of_group = np.r_[True, group[1:] != group[:-1]]
+    group_base = np.maximum.accumulate(np.where(first_of_group, cumulative - amount, 0))
+    local_end = np.minimum(cumulative - group_base, matched_total)
+    return matched_start + local_end
+
+
+def plan(
+    db: Session,
+    region_id: Optional[int] = None,
+    window_days: int = 28,
+    target_cover_days: float = 14.0,
+    surplus_cover_days: float = 28.0,
+    min_units: int = 5,
+) -> List[dict]:
+    """Recommended transfers, largest first."""
+    data = _load(db, region_id, window_days)
+    return match(data, window_days, target_cover_days, surplus_cover_days, min_units)
+
+
+def match(
+    data: np.ndarray,
+    window_days: int,
+    target_cover_days: float,
+    surplus_cover_days: float,
+    min_units: int,
+) -> List[dict]:
+    """Greedy surplus/deficit matching over (region, location, product, quantity, units_sold) rows."""
+    if not len(data):
+        return []
+    region, location, product, quantity, units_sold = data.T
+    velocity = units_sold / window_days
+
+    surplus = np.maximum(quantity - np.ceil(velocity * surplus_cover_days), 0).astype(np.int64)
+    deficit = np.where(velocity > 0, np.maximum(np.ceil(velocity * target_cover_days) - quantity, 0), 0).astype(np.int64)
+
+    group = region * (product.max() + 1) + product
+    donors = np.flatnonzero(surplus > 0)
+    receivers = np.flatnonzero(deficit > 0)
+    donors = donors[np.lexsort((-surplus[donors], group[donors]))]
+    receivers = receivers[np.lexsort((-deficit[receivers], group[receivers]))]
+
+    # Units each (region, product) can move, and where its stretch starts
+    groups, donor_slot = np.unique(group[donors], return_inverse=True)
+    supply = np.bincount(donor_slot, weights=surplus[donors], minlength=len(groups))
+    receiver_slot = np.searchsorted(groups, group[receivers])
+    has_donor = receiver_slot < len(groups)
+    has_donor[has_donor] = groups[receiver_slot[has_donor]] == group[receivers[has_donor]]
+    receivers, receiver_slot = receivers[has_donor], receiver_slot[has_donor]
+    if not len(receivers):
+        return []
+    demand = np.bincount(receiver_slot, weights=deficit[receivers], minlength=len(groups))
+    matched = np.minimum(supply, demand).astype(np.int64)
+    starts = np.cumsum(matched) - matched
+
+    donor_ends = _intervals(group[donors], surplus[donors], starts[donor_slot], matched[donor_slot])
+    receiver_ends = _intervals(group[receivers], deficit[receivers], starts[receiver_slot], matched[receiver_slot])
+
+    bounds = np.unique(np.concatenate(([0], donor_ends, receiver_ends)))
+    segment_start, segment_units = bounds[:-1], np.diff(bounds)
+    source = donors[np.searchsorted(donor_ends, segment_start, side="right")]
+    target = receivers[np.searchsorted(receiver_ends, segment_start, side="right")]
+
+    keep = segment_units >= min_units
+    source, target, segment_units = source[keep], target[keep], segment_units[keep]
+    order = np.argsort(-segment_units, kind="stable")
+
+    return [
+        {
+            "region_id": int(region[s]),
+            "product_id": int(product[s]),
+            "from_location": int(location[s]),
+            "to_location": int(location[t]),
+            "quantity": int(units),
+            "from_on_hand": int(quantity[s]),
+            "to_on_hand": int(quantity[t]),
+        }
+        for s, t, units in zip(source[order], target[order], segment_units[order])
+    ]
+
+
+def _moved_lots(transfers: List[dict], taken: List[stock.LotPiece]) -> List[stock.LotPiece]:
+    """Hand the lot pieces taken from each source to its transfers, so expiry dates travel with the stock."""
+    pieces = defaultdict(deque)
+    for piece in taken:
+        pieces[(piece.location_id, piece.product_id)].append(piece)
+
+    moved = []
+    for transfer in transfers:
+        source = pieces[(transfer["from_location"], transfer["product_id"])]
+        needed = transfer["quantity"]
+        while needed and source:
+            piece = source[0]
+            quantity = min(needed, piece.quantity)
+            moved.append(stock.LotPiece(transfer["to_location"], transfer["product_id"], piece.expires_on, quantity))
+            needed -= quantity
+            if quantity == piece.quantity:
+                source.popleft()
+            else:
+                source[0] = piece._replace(quantity=piece.quantity - quantity)
+    return moved
+
+
+def execute(db: Session, transfers: List[dict]) -> dict:
+    """Move stock for every transfer and record it, in one transaction. Commits.
+
+    Raises stock.InsufficientStock (and writes nothing) if a source no longer
+    has the units, e.g. because it sold them since the plan was made.
+    """
+    if not transfers:
+        return {"transfers": 0, "units": 0}
+
+    now = datetime.utcnow()
+    outgoing, incoming = defaultdict(int), defaultdict(int)
+    for transfer in transfers:
+        outgoing[(transfer["from_location"], transfer["product_id"])] += transfer["quantity"]
+        incoming[(transfer["to_location"], transfer["product_id"])] += transfer["quantity"]
+
+    try:
+        taken = stock.decrement(db, outgoing, "Transfer out", at=now)
+        stock.increment(db, incoming, "Transfer in", at=now, lots=_moved_lots(transfers, taken))
+        bulk_insert(
+            db,
+            StockTransfer.__table__,
+            TRANSFER_COLUMNS,
+            (
+                (t["from_location"], t["to_location"], t["product_id"], t["quantity"], now)
+                for t in transfers
+            ),
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    cache.bump("inventory")
+    return {"transfers": len(transfers), "units": sum(t["quantity"] for t in transfers)}
@@ -0,0 +1,216 @@
+"""Wastage intake and the daily wastage_aggregates buckets behind waste rates.
+
+`record` writes a batch of wastage records, takes the units out of stock and
+adds them to their (location, product, reason, day) buckets in one
+transaction, the same way sales feed sales_aggregates. Waste rates compare
+those buckets with the sales buckets over a window, so reading them never
+scans the raw records.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import Float, cast, func, select, text
+from sqlalchemy.orm import Session
+
+from api import cache
+from api.bulk import bulk_insert
+from api.filters import scope_to_location
+from api.models import SalesAggregate, WastageAggregate, WastageRecord
+from api.services import stock
+from api.services.rollups import upsert_insert
+
+REASONS = ("Expired", "Damaged", "Spoiled")
+
+WASTAGE_COLUMNS = ("location_id", "product_id", "quantity", "reason", "timestamp")
+WastageRow = namedtuple("WastageRow", WASTAGE_COLUMNS)
+
+
+def apply_wastage(db: Session, records: Iterable) -> int:
+    """Add wastage records to their day buckets with one multi-row upsert.
+
+    `records` expose location_id, product_id, quantity, reason and timestamp.
+    Does not commit; returns the number of buckets touched.
+    """
+    buckets = defaultdict(lambda: [0, 0])
+    for record in records:
+        bucket = buckets[(record.location_id, record.product_id, record.reason, record.timestamp.date())]
+        bucket[0] += record.quantity
+        bucket[1] += 1
+
+    if not buckets:
+        return 0
+
+    table = WastageAggregate.__table__
+    stmt = upsert_insert(db, table).values([
+        {
+            "location_id": location_id,
+            "product_id": product_id,
+            "reason": reason,
+            "waste_date": waste_date,
+            "quantity": quantity,
+            "record_count": count,
+        }
+        for (location_id, product_id, reason, waste_date), (quantity, count) in buckets.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.location_id, table.c.product_id, table.c.reason, table.c.waste_date],
+        set_={
+            "quantity": table.c.quantity + stmt.excluded.quantity,
+            "record_count": table.c.record_count + stmt.excluded.record_count,
+        },
+    )
+    db.execute(stmt)
+    return len(buckets)
+
+
+def record(db: Session, lines: Iterable) -> dict:
+    """Write a batch of wastage lines and take their units out of stock.
+
+    `lines` expose location_id, product_id, quantity, reason and an optional
+    timestamp. A batch that would take any line below zero is rejected with
+    stock.InsufficientStock and nothing is written. Commits.
+    """
+    now = datetime.utcnow()
+    rows = []
+    removed = defaultdict(int)
+    for line in lines:
+        rows.append(WastageRow(line.location_id, line.product_id, line.quantity, line.reason, line.timestamp or now))
+        removed[(line.location_id, line.product_id)] += line.quantity
+
+    reasons = {row.reason for row in rows}
+    log_reason = f"Wastage: {reasons.pop()}" if len(reasons) == 1 else "Wastage"
+    try:
+        stock.decrement(db, removed, log_reason, at=now)
+        bulk_insert(db, WastageRecord.__table__, WASTAGE_COLUMNS, rows)
+        buckets = apply_wastage(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    cache.bump("wastage", "inventory")
+    return {"records": len(rows), "stock_lines": len(removed), "buckets": buckets}
+
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recompute buckets for [start, end] (inclusive dates) from wastage_records. Commits."""
+    waste_date = func.date(WastageRecord.timestamp)
+    delete_query = db.query(WastageAggregate)
+    source = select(
+        WastageRecord.location_id,
+        WastageRecord.product_id,
+        WastageRecord.reason,
+        waste_date,
+        func.sum(WastageRecord.quantity),
+        func.count(WastageRecord.wastage_id),
+    ).where(
+        WastageRecord.location_id.isnot(None),
+        WastageRecord.product_id.isnot(None),
+        WastageRecord.timestamp.isnot(None),
+    )
+
+    if start:
+        delete_query = delete_query.filter(WastageAggregate.waste_date >= start)
+        source = source.where(WastageRecord.timestamp >= datetime.combine(start, datetime.min.time()))
+    if end:
+        delete_query = delete_query.filter(WastageAggregate.waste_date <= end)
+        source = source.where(WastageRecord.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+    source = source.group_by(WastageRecord.location_id, WastageRecord.product_id, WastageRecord.reason, waste_date)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Same as rollups.rebuild: hold off concurrent upserts until the rebuilt buckets commit
+        db.execute(text("LOCK TABLE wastage_aggregates IN SHARE ROW EXCLUSIVE MODE"))
+    delete_query.delete(synchronize_session=False)
+    result = db.execute(
+        WastageAggregate.__table__.insert().from_select(
+            ["location_id", "product_id", "reason", "waste_date", "quantity", "record_count"],
+            source,
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _scoped(query, model, region_id, location_id, product_id):
+    query = scope_to_location(query, model.location_id, region_id, location_id)
+    if product_id:
+        query = query.where(model.product_id == product_id)
+    return query
+
+
+def rates(
+    db: Session,
+    start: date,
+    end: date,
+    region_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    reason: Optional[str] = None,
+    limit: int = 500,
+):
+    """Units wasted per (location, product, reason) over [start, end], largest first.
+
+    `waste_rate` is the share of the line's units that left the shelf as
+    waste of this reason: wasted / (sold + wasted for every reason).
+    """
+    wasted = _scoped(
+        select(
+            WastageAggregate.location_id,
+            WastageAggregate.product_id,
+            WastageAggregate.reason,
+            func.sum(WastageAggregate.quantity).label("quantity"),
+            func.sum(WastageAggregate.record_count).label("records"),
+        ).where(WastageAggregate.waste_date.between(start, end)),
+        WastageAggregate, region_id, location_id, product_id,
+    ).group_by(WastageAggregate.location_id, WastageAggregate.product_id, WastageAggregate.reason).cte("wasted")
+
+    sold = _scoped(
+        select(
+            SalesAggregate.location_id,
+            SalesAggregate.product_id,
+            func.sum(SalesAggregate.units_sold).label("units_sold"),
+        ).where(SalesAggregate.sale_date.between(start, end)),
+        SalesAggregate, region_id, location_id, product_id,
+    ).group_by(SalesAggregate.location_id, SalesAggregate.product_id).cte("sold")
+
+    lines = (
+        select(
+            wasted,
+            func.coalesce(sold.c.units_sold, 0).label("units_sold"),
+            func.sum(wasted.c.quantity).over(
+                partition_by=(wasted.c.location_id, wasted.c.product_id)
+            ).label("line_wasted"),
+        )
+        .outerjoin(sold, (sold.c.location_id == wasted.c.location_id) & (sold.c.product_id == wasted.c.product_id))
+        .subquery("lines")
+    )
+    query = select(
+        lines.c.location_id,
+        lines.c.product_id,
+        lines.c.reason,
+        lines.c.quantity,
+        lines.c.records,
+        lines.c.units_sold,
+        cast(lines.c.quantity, Float) / cast(lines.c.units_sold + lines.c.line_wasted, Float),
+    )
+    if reason:
+        # Filtered outside the window sum, so the rate still counts every reason
+        query = query.where(lines.c.reason == reason)
+    rows = db.execute(
+        query.order_by(lines.c.quantity.desc(), lines.c.location_id, lines.c.product_id, lines.c.reason).limit(limit)
+    ).all()
+
+    return [
+        {
+            "location_id": line_location_id,
+            "product_id": line_product_id,
+            "reason": line_reason,
+            "wasted_units": int(quantity),
+            "records": int(records),
+            "units_sold": int(units_sold),
+            "waste_rate": round(float(rate), 4),
+        }
+        for line_location_id, line_product_id, line_reason, quantity, records, units_sold, rate in rows
+    ]
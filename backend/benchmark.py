@@ -0,0 +1,518 @@
+"""HTTP benchmark for the API, run in-process through httpx's ASGI transport.
+
+Seeds the configured database at a fixed scale, then hits every GET route and
+reports per endpoint: p50/p95/p99 latency, throughput, SQL statements per
+request, peak Python memory and response size. Results are written as JSON
+and compared with a stored baseline; the exit status is 1 on any regression.
+
+Run from the backend directory:
+
+    DATABASE_URL=sqlite:// python benchmark.py                 # scratch in-memory DB
+    DATABASE_URL=postgresql://.../bench python benchmark.py --seed-db --scale medium
+    python benchmark.py --update-baseline                      # accept current numbers
+    DATABASE_URL=sqlite:// python benchmark.py --check         # CI: a missing baseline fails too
+
+--seed-db deletes every row in the target database first; never point it at
+real data. An in-memory SQLite URL is always seeded.
+
+--micro skips HTTP and times only the list endpoints' row handling: for
+inventory, sales and orders it loads the same rows the way the handlers used
+to (ORM entities with joined relationships, dicts, jsonable_encoder, json)
+and through their column projections (tuples into slotted records, orjson),
+and prints CPU time per row for both.
+
+Statement counts and the rows each endpoint returns are deterministic for a
+given scale (the data is anchored to today's midnight), so any increase in
+statements or change in rows is a regression; that is what catches N+1
+queries and unbounded loads. The committed benchmark_baseline.json is the
+small scale on the in-memory SQLite stand-in. Latency (p50/p95) and memory
+only fail past a relative tolerance plus a small absolute floor, to stay quiet
+on noise.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload
+
+from api import models
+from api.bulk import bulk_insert
+from api.database import Base, SessionLocal, engine
+from api.main import app
+from api.routes import inventory, orders, sales
+from api.services import forecasting, rollups, spoilage
+
+SCALES = {
+    "small": {"regions": 2, "stores": 8, "suppliers": 10, "products": 200, "days": 60, "sales_per_store_day": 40, "orders_per_store": 40},
+    "medium": {"regions": 4, "stores": 40, "suppliers": 30, "products": 1000, "days": 120, "sales_per_store_day": 60, "orders_per_store": 200},
+}
+
+# (name, path) for every GET route, including the filtered and paged variants
+# clients actually use. Location/region ids refer to the seeded data.
+ENDPOINTS = [
+    ("regions", "/api/regions/"),
+    ("regions.scorecard", "/api/regions/1/scorecard"),
+    ("regions.scorecard_week", "/api/regions/1/scorecard?days=7"),
+    ("locations", "/api/locations/"),
+    ("suppliers", "/api/suppliers/"),
+    ("products", "/api/products/"),
+    # Autocomplete, one request per keystroke: short prefix, longer prefix, typo, filtered
+    ("products.search_short_prefix", "/api/products/search?q=pro"),
+    ("products.search_prefix", "/api/products/search?q=Product%2012"),
+    ("products.search_fuzzy", "/api/products/search?q=Prodcut%2012"),
+    ("products.search_filtered", "/api/products/search?q=Product%201&category_id=3&supplier_id=3"),
+    ("inventory", "/api/inventory/"),
+    ("inventory.region", "/api/inventory/?region_id=1"),
+    ("inventory.page", "/api/inventory/?limit=500"),
+    ("inventory.expiring", "/api/inventory/expiring?days=7"),
+    ("inventory.expiring_location", "/api/inventory/expiring?days=30&location_id=1"),
+    ("sales.page", "/api/sales/?limit=500"),
+    ("sales.location_page", "/api/sales/?location_id=1&limit=500"),
+    ("sales.aggregates_day", "/api/sales/aggregates/day"),
+    ("sales.aggregates_month_product", "/api/sales/aggregates/month?group_by=product"),
+    ("orders", "/api/orders/"),
+    ("orders.page", "/api/orders/?limit=500"),
+    ("dashboard.summary", "/api/dashboard/summary"),
+    ("dashboard.revenue", "/api/dashboard/summary/revenue"),
+    ("dashboard.orders_by_status", "/api/dashboard/summary/orders-by-status"),
+    ("dashboard.stock_alerts", "/api/dashboard/summary/stock-alerts"),
+    ("dashboard.recent_orders", "/api/dashboard/summary/recent-orders"),
+    ("forecasts", "/api/forecasts/"),
+    ("pricing.recommendations", "/api/pricing/recommendations"),
+    ("transfers.recommendations", "/api/transfers/recommendations"),
+    ("transfers.recommendations_region", "/api/transfers/recommendations?region_id=1"),
+    ("wastage.rates", "/api/wastage/rates"),
+    ("wastage.at_risk", "/api/wastage/at-risk"),
+    ("wastage.at_risk_location", "/api/wastage/at-risk?location_id=1&min_score=0"),
+]
+
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+
+# SQL statement counter shared by every engine (primary and read replica)
+_statements = 0
+_statements_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    global _statements
+    with _statements_lock:
+        _statements += 1
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+
+def seed_database(scale: dict, seed: int) -> None:
+    """Replace all rows with a deterministic dataset at the given scale."""
+    rng = np.random.default_rng(seed)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        for table in reversed(Base.metadata.sorted_tables):
+            db.execute(table.delete())
+
+        n_regions, n_stores, n_suppliers, n_products = (
+            scale["regions"], scale["stores"], scale["suppliers"], scale["products"]
+        )
+        # Anchored to midnight, so day windows see the same rows whenever it runs
+        now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = now - timedelta(days=scale["days"])
+
+        bulk_insert(db, models.Region.__table__, ("region_id", "name"),
+                    [(r + 1, f"Region {r + 1}") for r in range(n_regions)])
+        bulk_insert(db, models.Location.__table__, ("location_id", "location_name", "region_id"),
+                    [(s + 1, f"Store {s + 1}", s % n_regions + 1) for s in range(n_stores)])
+        bulk_insert(db, models.Supplier.__table__, ("supplier_id", "name", "contact_info"),
+                    [(s + 1, f"Supplier {s + 1}", f"555-{s:04d}") for s in range(n_suppliers)])
+
+        price = np.round(rng.lognormal(1.2, 0.5, n_products), 2)
+        shelf_life = rng.integers(2, 365, n_products)
+        reorder_point = rng.integers(10, 60, n_products)
+        bulk_insert(
+            db, models.Product.__table__,
+            ("product_id", "name", "category_id", "supplier_id", "price", "shelf_life_days", "reorder_point"),
+            [
+                (p + 1, f"Product {p + 1}", p % 8 + 1, p % n_suppliers + 1, float(price[p]),
+                 int(shelf_life[p]), int(reorder_point[p]))
+                for p in range(n_products)
+            ],
+        )
+
+        quantity = rng.integers(0, 400, (n_stores, n_products))
+        bulk_insert(
+            db, models.Inventory.__table__,
+            ("inventory_id", "location_id", "product_id", "quantity", "last_updated"),
+            [
+                (s * n_products + p + 1, s + 1, p + 1, int(quantity[s, p]), now)
+                for s in range(n_stores) for p in range(n_products)
+            ],
+        )
+
+        bulk_insert(
+            db, models.InventoryLot.__table__,
+            ("lot_id", "location_id", "product_id", "quantity", "received_at", "expires_on"),
+            [
+                (s * n_products + p + 1, s + 1, p + 1, int(quantity[s, p]), now,
+                 (now + timedelta(days=int(shelf_life[p]))).date())
+                for s in range(n_stores) for p in range(n_products)
+            ],
+        )
+
+        n_sales = n_stores * scale["days"] * scale["sales_per_store_day"]
+        popularity = 1.0 / np.arange(1, n_products + 1)
+        popularity /= popularity.sum()
+        sale_store = rng.integers(1, n_stores + 1, n_sales)
+        sale_product = rng.choice(np.arange(1, n_products + 1), n_sales, p=popularity)
+        sale_quantity = 1 + rng.poisson(0.7, n_sales)
+        sale_seconds = np.sort(rng.integers(0, scale["days"] * 86400, n_sales))
+        bulk_insert(
+            db, models.Sales.__table__,
+            ("sale_id", "location_id", "product_id", "quantity", "total_price", "timestamp"),
+            [
+                (i + 1, int(sale_store[i]), int(sale_product[i]), int(sale_quantity[i]),
+                 round(float(price[sale_product[i] - 1]) * int(sale_quantity[i]), 2),
+                 start + timedelta(seconds=int(sale_seconds[i])))
+                for i in range(n_sales)
+            ],
+        )
+
+        n_orders = n_stores * scale["orders_per_store"]
+        statuses = np.array(["Pending", "Shipped", "Delivered", "Cancelled"])
+        order_status = rng.choice(statuses, n_orders, p=[0.15, 0.15, 0.65, 0.05])
+        order_seconds = rng.integers(0, scale["days"] * 86400, n_orders)
+        bulk_insert(
+            db, models.Orders.__table__,
+            ("order_id", "supplier_id", "location_id", "status", "created_at"),
+            [
+                (i + 1, int(rng.integers(1, n_suppliers + 1)), i % n_stores + 1, str(order_status[i]),
+                 start + timedelta(seconds=int(order_seconds[i])))
+                for i in range(n_orders)
+            ],
+        )
+
+        if engine.dialect.name == "postgresql":
+            for table in Base.metadata.sorted_tables:
+                key = table.primary_key.columns.values()
+                if len(key) == 1 and key[0].autoincrement:
+                    db.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', '{key[0].name}'), "
+                        f"COALESCE(MAX({key[0].name}), 0) + 1, false) FROM {table.name}"
+                    ))
+        db.commit()
+
+        rollups.rebuild(db)
+        forecasting.run(db)
+        spoilage.refresh(db)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, warmup: int, concurrency: int) -> dict:
+    global _statements
+    for _ in range(warmup):
+        await client.get(path)
+
+    latencies = []
+    statuses = set()
+    body = b""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal body
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            statuses.add(response.status_code)
+            body = response.content
+
+    with _statements_lock:
+        _statements = 0
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - wall_started
+    statements = _statements
+
+    # Memory is measured on a separate sequential pass: tracemalloc slows
+    # allocation-heavy code down enough to distort the latency numbers.
+    tracemalloc.start()
+    for _ in range(min(requests, 5)):
+        tracemalloc.reset_peak()
+        await client.get(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ms = np.array(latencies) * 1000
+    return {
+        "path": path,
+        "status": sorted(statuses),
+        "requests": requests,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_rps": round(requests / wall, 1),
+        "queries_per_request": round(statements / requests, 2),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "response_bytes": len(body),
+        "rows": _row_count(body),
+    }
+
+
+def _row_count(body: bytes):
+    """Items in a list response or a keyset page; None for other shapes."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        data = data.get("items")
+    return len(data) if isinstance(data, list) else None
+
+
+async def run_all(endpoints, requests: int, warmup: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, path in endpoints:
+            results[name] = await measure(client, path, requests, warmup, concurrency)
+            r = results[name]
+            print(f"{name:34} p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  p99 {r['p99_ms']:8.2f}ms  "
+                  f"{r['throughput_rps']:8.1f} rps  {r['queries_per_request']:5.2f} q/req  "
+                  f"{r['peak_memory_kb']:9.1f} KiB  {r['response_bytes']:>9} B")
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Row handling microbenchmark
+# ---------------------------------------------------------------------------
+
+def _orm_inventory(db):
+    return [
+        {
+            "inventory_id": item.inventory_id,
+            "location_id": item.location_id,
+            "location_name": item.location.location_name if item.location else None,
+            "product_id": item.product_id,
+            "product_name": item.product.name if item.product else None,
+            "quantity": item.quantity,
+            "last_updated": item.last_updated,
+        }
+        for item in db.query(models.Inventory).options(
+            joinedload(models.Inventory.location), joinedload(models.Inventory.product)
+        ).all()
+    ]
+
+
+def _orm_sales(db):
+    return [
+        {
+            "sale_id": sale.sale_id,
+            "location_id": sale.location_id,
+            "location_name": sale.location.location_name if sale.location else None,
+            "product_id": sale.product_id,
+            "product_name": sale.product.name if sale.product else None,
+            "quantity": sale.quantity,
+            "total_price": sale.total_price,
+            "timestamp": sale.timestamp,
+        }
+        for sale in db.query(models.Sales).options(
+            joinedload(models.Sales.location), joinedload(models.Sales.product)
+        ).all()
+    ]
+
+
+def _orm_orders(db):
+    return [
+        {
+            "order_id": order.order_id,
+            "supplier_name": order.supplier.name if order.supplier else "Unknown",
+            "location_name": order.location.location_name if order.location else "Unknown",
+            "status": order.status,
+            "created_at": order.created_at,
+        }
+        for order in db.query(models.Orders).options(
+            joinedload(models.Orders.supplier), joinedload(models.Orders.location)
+        ).all()
+    ]
+
+
+# name -> (ORM entities + jsonable_encoder, the handler's projection and query)
+MICRO = {
+    "inventory": (_orm_inventory, inventory._INVENTORY, lambda: inventory._inventory_query(None, None)),
+    "sales": (_orm_sales, sales._SALES, lambda: sales._sales_query(None, None)),
+    "orders": (_orm_orders, orders._ORDERS, lambda: orders._orders_query(None, None)),
+}
+
+
+def _best_of(repeat: int, run) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        run()
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def micro(repeat: int) -> dict:
+    """CPU seconds per row for the old ORM path and the projection path of each list endpoint."""
+    results = {}
+    db = SessionLocal()
+    try:
+        for name, (load_orm, projection, build_query) in MICRO.items():
+            rows = len(projection.records(db.execute(build_query()).tuples()))
+            if rows == 0:
+                continue
+
+            def orm():
+                db.expunge_all()  # a fresh request's session starts with an empty identity map
+                JSONResponse(jsonable_encoder(load_orm(db))).body
+
+            def projected():
+                projection.all(db, build_query()).body
+
+            orm_seconds = _best_of(repeat, orm)
+            projection_seconds = _best_of(repeat, projected)
+            results[name] = {
+                "rows": rows,
+                "orm_us_per_row": round(orm_seconds / rows * 1e6, 3),
+                "projection_us_per_row": round(projection_seconds / rows * 1e6, 3),
+                "speedup": round(orm_seconds / projection_seconds, 2),
+            }
+            r = results[name]
+            print(f"{name:12} {rows:>9} rows  ORM {r['orm_us_per_row']:8.2f}us/row  "
+                  f"projection {r['projection_us_per_row']:8.2f}us/row  {r['speedup']:6.2f}x")
+    finally:
+        db.close()
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(results: dict, baseline: dict, latency_tolerance: float, memory_tolerance: float) -> list:
+    """Return human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    base_endpoints = baseline.get("endpoints", {})
+    for name, current in results["endpoints"].items():
+        if any(status >= 400 for status in current["status"]):
+            regressions.append(f"{name}: HTTP {current['status']}")
+        previous = base_endpoints.get(name)
+        if previous is None:
+            continue
+
+        if previous.get("rows") is not None and current["rows"] != previous["rows"]:
+            regressions.append(f"{name}: rows {previous['rows']} -> {current['rows']}")
+        if current["queries_per_request"] > previous["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}"
+            )
+        # p99 is reported but not gated: at a few dozen samples it is the max
+        for metric in ("p50_ms", "p95_ms"):
+            limit = previous[metric] * (1 + latency_tolerance) + 2.0
+            if current[metric] > limit:
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]} (limit {limit:.2f})")
+        limit = previous["peak_memory_kb"] * (1 + memory_tolerance) + 256
+        if current["peak_memory_kb"] > limit:
+            regressions.append(
+                f"{name}: peak_memory_kb {previous['peak_memory_kb']} -> {current['peak_memory_kb']} (limit {limit:.0f})"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--seed-db", action="store_true", help="Delete all rows and seed the target database")
+    parser.add_argument("--requests", type=int, default=50, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--only", help="Run endpoints whose name contains this substring")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="CI: also fail when there is no baseline or it has endpoints this run didn't measure")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed p50/p95 growth (0.5 = 50%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.5, help="Allowed peak memory growth")
+    parser.add_argument("--micro", action="store_true", help="Only compare ORM and projection row handling")
+    args = parser.parse_args(argv)
+
+    if args.seed_db or str(engine.url) in ("sqlite://", "sqlite:///:memory:"):
+        started = time.perf_counter()
+        seed_database(SCALES[args.scale], args.seed)
+        print(f"Seeded '{args.scale}' dataset in {time.perf_counter() - started:.1f}s")
+
+    if args.micro:
+        micro(repeat=max(args.warmup, 3))
+        return
+
+    endpoints = [(name, path) for name, path in ENDPOINTS if not args.only or args.only in name]
+    results = {
+        "meta": {
+            "scale": args.scale,
+            "seed": args.seed,
+            "dialect": engine.dialect.name,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "endpoints": asyncio.run(run_all(endpoints, args.requests, args.warmup, args.concurrency)),
+    }
+    args.output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"✅ Baseline updated: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; rerun with --update-baseline to create one.")
+        if args.check:
+            sys.exit(1)
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    settings_keys = ("scale", "dialect", "concurrency")
+    if any(baseline["meta"].get(key) != results["meta"][key] for key in settings_keys):
+        recorded = ", ".join(f"{key}={baseline['meta'].get(key)}" for key in settings_keys)
+        print(f"⚠️ Baseline was recorded with {recorded}; numbers may not be comparable.")
+
+    regressions = compare(results, baseline, args.latency_tolerance, args.memory_tolerance)
+    if args.check and not args.only:
+        regressions += [
+            f"{name}: in the baseline but not measured" for name in baseline["endpoints"] if name not in results["endpoints"]
+        ]
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
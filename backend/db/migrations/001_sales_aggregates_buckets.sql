@@ -0,0 +1,20 @@
+-- Replace the placeholder sales_aggregates table (random seed data only) with
+-- per-(location, product, day) buckets. Run `python manage.py rebuild-rollups`
+-- afterwards to backfill from the sales table.
+BEGIN;
+
+DROP TABLE IF EXISTS sales_aggregates;
+
+CREATE TABLE sales_aggregates (
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    sale_date DATE NOT NULL,
+    units_sold INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    sale_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_id, product_id, sale_date)
+);
+
+CREATE INDEX idx_sales_aggregates_date ON sales_aggregates (sale_date);
+
+COMMIT;
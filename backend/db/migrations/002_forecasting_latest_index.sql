@@ -0,0 +1,4 @@
+-- Superseded by 011_forecasting_runs.sql: latest forecasts are read from the
+-- newest run through idx_forecasting_run_demand, so the per-series
+-- (location_id, product_id, timestamp DESC) index this used to add is no
+-- longer needed. Kept as a no-op so the migration numbering stays intact.
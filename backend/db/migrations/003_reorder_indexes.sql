@@ -0,0 +1,4 @@
+-- Reorder scans sum open order lines per (location, product).
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_open_location
+    ON orders (location_id, order_id) WHERE status IN ('Pending', 'Shipped');
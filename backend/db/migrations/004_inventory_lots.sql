@@ -0,0 +1,28 @@
+-- Lot-level inventory: received batches with an expiry date. `inventory`
+-- keeps the per-(location, product) totals and is updated alongside.
+CREATE TABLE IF NOT EXISTS inventory_lots (
+    lot_id SERIAL PRIMARY KEY,
+    location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    received_at TIMESTAMP DEFAULT NOW(),
+    expires_on DATE
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_lots_fefo
+    ON inventory_lots (location_id, product_id, expires_on, lot_id) WHERE quantity > 0;
+CREATE INDEX IF NOT EXISTS idx_inventory_lots_location_expiry
+    ON inventory_lots (location_id, expires_on) WHERE quantity > 0;
+CREATE INDEX IF NOT EXISTS idx_inventory_lots_expiry
+    ON inventory_lots (expires_on) WHERE quantity > 0;
+
+-- Existing stock becomes one lot per line, received at its last update.
+INSERT INTO inventory_lots (location_id, product_id, quantity, received_at, expires_on)
+SELECT i.location_id, i.product_id, i.quantity, COALESCE(i.last_updated, NOW()),
+       (COALESCE(i.last_updated, NOW()) + make_interval(days => p.shelf_life_days))::date
+FROM inventory i
+JOIN products p ON p.product_id = i.product_id
+WHERE i.quantity > 0
+  AND NOT EXISTS (
+      SELECT 1 FROM inventory_lots l WHERE l.location_id = i.location_id AND l.product_id = i.product_id
+  );
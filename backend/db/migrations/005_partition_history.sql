@@ -0,0 +1,89 @@
+-- Monthly range partitioning of the append-only history tables.
+--
+-- sales and inventory_logs become partitioned on timestamp: one partition per
+-- month (<table>_pYYYYMM) from the oldest row to three months ahead, plus a
+-- default partition for anything outside them. Queries bounded on timestamp
+-- only scan the months they overlap. Afterwards, schedule
+-- `python manage.py maintain-partitions` to keep creating months ahead and
+-- to archive old ones.
+--
+-- A partitioned table's primary key must include the partition key, so the
+-- keys become (sale_id, timestamp) and (log_id, timestamp) and timestamp is
+-- NOT NULL; ids keep coming from the existing sequences. Every row is copied,
+-- so run this in a maintenance window.
+BEGIN;
+
+ALTER TABLE sales RENAME TO sales_unpartitioned;
+ALTER TABLE sales_unpartitioned RENAME CONSTRAINT sales_pkey TO sales_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_sales_timestamp;
+DROP INDEX IF EXISTS idx_sales_location_timestamp;
+
+CREATE TABLE sales (
+    sale_id INT NOT NULL DEFAULT nextval('sales_sale_id_seq'),
+    location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
+    customer_id INT REFERENCES customers(customer_id) ON DELETE SET NULL,
+    quantity INT NOT NULL CHECK (quantity > 0),
+    total_price DECIMAL(10,2) NOT NULL CHECK (total_price >= 0),
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (sale_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+ALTER SEQUENCE sales_sale_id_seq OWNED BY sales.sale_id;
+CREATE TABLE sales_default PARTITION OF sales DEFAULT;
+
+ALTER TABLE inventory_logs RENAME TO inventory_logs_unpartitioned;
+ALTER TABLE inventory_logs_unpartitioned RENAME CONSTRAINT inventory_logs_pkey TO inventory_logs_unpartitioned_pkey;
+
+CREATE TABLE inventory_logs (
+    log_id INT NOT NULL DEFAULT nextval('inventory_logs_log_id_seq'),
+    location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity_change INT NOT NULL,
+    reason TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (log_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+ALTER SEQUENCE inventory_logs_log_id_seq OWNED BY inventory_logs.log_id;
+CREATE TABLE inventory_logs_default PARTITION OF inventory_logs DEFAULT;
+
+DO $$
+DECLARE
+    parent TEXT;
+    first_day DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['sales', 'inventory_logs'] LOOP
+        FOR first_day IN
+            EXECUTE format(
+                'SELECT generate_series(date_trunc(''month'', COALESCE(MIN(timestamp), NOW())), '
+                'date_trunc(''month'', NOW()) + INTERVAL ''3 months'', INTERVAL ''1 month'')::date '
+                'FROM %I', parent || '_unpartitioned')
+        LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           parent || '_p' || to_char(first_day, 'YYYYMM'), parent,
+                           first_day, (first_day + INTERVAL '1 month')::date);
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Rows without a timestamp (the app always sets one) are stamped with the
+-- migration time.
+INSERT INTO sales (sale_id, location_id, product_id, customer_id, quantity, total_price, timestamp)
+SELECT sale_id, location_id, product_id, customer_id, quantity, total_price, COALESCE(timestamp, NOW())
+FROM sales_unpartitioned;
+
+INSERT INTO inventory_logs (log_id, location_id, product_id, quantity_change, reason, timestamp)
+SELECT log_id, location_id, product_id, quantity_change, reason, COALESCE(timestamp, NOW())
+FROM inventory_logs_unpartitioned;
+
+DROP TABLE sales_unpartitioned;
+DROP TABLE inventory_logs_unpartitioned;
+
+-- Built once the rows are in; each partition gets its own copy.
+CREATE INDEX idx_sales_timestamp ON sales (timestamp);
+CREATE INDEX idx_sales_location_timestamp ON sales (location_id, timestamp);
+CREATE INDEX idx_inventory_logs_timestamp ON inventory_logs (timestamp);
+
+COMMIT;
+
+ANALYZE sales;
+ANALYZE inventory_logs;
@@ -0,0 +1,13 @@
+-- Order and sale events pushed to WebSocket clients (/api/events/ws). Rows
+-- are announced with pg_notify('live_events', ...) by the transaction that
+-- writes them and kept for a while so reconnecting clients can resume.
+CREATE TABLE IF NOT EXISTS live_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    location_id INT,
+    region_id INT,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_live_events_created_at ON live_events (created_at);
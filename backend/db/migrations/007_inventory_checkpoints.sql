@@ -0,0 +1,13 @@
+-- Periodic per-(location, product) snapshots of inventory, so stock as of a
+-- past moment only replays the inventory_logs rows since the nearest one.
+-- Take the first with `python manage.py checkpoint-inventory`.
+CREATE TABLE IF NOT EXISTS inventory_checkpoints (
+    checkpoint_at TIMESTAMP NOT NULL,
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INT NOT NULL,
+    PRIMARY KEY (checkpoint_at, location_id, product_id)
+);
+
+-- As-of queries for one store read its log rows in a time range
+CREATE INDEX IF NOT EXISTS idx_inventory_logs_location_timestamp ON inventory_logs (location_id, timestamp);
@@ -0,0 +1,24 @@
+-- Lease and history tables for the in-process job scheduler (api.scheduler).
+-- Every API worker runs the scheduler; a job only runs on the worker that
+-- claims its job_leases row, and each run is recorded in job_runs.
+CREATE TABLE IF NOT EXISTS job_leases (
+    job_name VARCHAR(100) PRIMARY KEY,
+    next_run_at TIMESTAMP NOT NULL,
+    leased_by VARCHAR(255),
+    leased_until TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL,
+    worker VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_ms DOUBLE PRECISION,
+    result JSONB,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs (job_name, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_job_runs_started ON job_runs (started_at);
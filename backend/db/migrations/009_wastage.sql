@@ -0,0 +1,40 @@
+-- Daily wastage buckets per (location, product, reason) and the precomputed
+-- spoilage risk of current stock. The buckets are backfilled from the
+-- existing wastage_records here; the first spoilage_risk snapshot is written
+-- by `python manage.py run-job refresh-spoilage-risk` (or the hourly job).
+CREATE TABLE IF NOT EXISTS wastage_aggregates (
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    waste_date DATE NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    record_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_id, product_id, reason, waste_date)
+);
+
+CREATE TABLE IF NOT EXISTS spoilage_risk (
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    on_hand INT NOT NULL,
+    daily_velocity DOUBLE PRECISION NOT NULL,
+    days_of_cover DOUBLE PRECISION,
+    next_expiry DATE NOT NULL,
+    at_risk_units INT NOT NULL,
+    at_risk_value DECIMAL(12,2) NOT NULL,
+    risk_score DOUBLE PRECISION NOT NULL,
+    computed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (location_id, product_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_wastage_aggregates_date ON wastage_aggregates (waste_date);
+CREATE INDEX IF NOT EXISTS idx_wastage_location_timestamp ON wastage_records (location_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_spoilage_risk_score ON spoilage_risk (risk_score DESC) WHERE at_risk_units > 0;
+CREATE INDEX IF NOT EXISTS idx_spoilage_risk_location_score
+    ON spoilage_risk (location_id, risk_score DESC) WHERE at_risk_units > 0;
+
+INSERT INTO wastage_aggregates (location_id, product_id, reason, waste_date, quantity, record_count)
+SELECT location_id, product_id, reason, timestamp::date, SUM(quantity), COUNT(*)
+FROM wastage_records
+WHERE location_id IS NOT NULL AND product_id IS NOT NULL AND timestamp IS NOT NULL
+GROUP BY location_id, product_id, reason, timestamp::date
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,30 @@
+-- One inventory row per (location, product). Concurrent transfers into a line
+-- a store didn't stock yet could each insert a row; merge any such duplicates
+-- into the oldest row, then enforce uniqueness so stock.increment can upsert.
+BEGIN;
+
+LOCK TABLE inventory IN SHARE ROW EXCLUSIVE MODE;
+
+WITH merged AS (
+    SELECT location_id, product_id, MIN(inventory_id) AS keep_id,
+           SUM(quantity) AS quantity, MAX(last_updated) AS last_updated
+    FROM inventory
+    GROUP BY location_id, product_id
+    HAVING COUNT(*) > 1
+)
+UPDATE inventory i
+SET quantity = m.quantity, last_updated = m.last_updated
+FROM merged m
+WHERE i.inventory_id = m.keep_id;
+
+DELETE FROM inventory i
+USING inventory keep
+WHERE keep.location_id = i.location_id
+  AND keep.product_id = i.product_id
+  AND keep.inventory_id < i.inventory_id;
+
+-- The unique index replaces the plain lookup index on the same columns
+CREATE UNIQUE INDEX IF NOT EXISTS uq_inventory_location_product ON inventory (location_id, product_id);
+DROP INDEX IF EXISTS idx_inventory_location_product;
+
+COMMIT;
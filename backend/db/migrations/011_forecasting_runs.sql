@@ -0,0 +1,8 @@
+-- /api/forecasts/ reads only the newest forecast run: max(timestamp), then
+-- that run's rows by predicted demand. This index serves both and the
+-- pruning of old runs, and covers idx_forecasting_timestamp. Nothing reads
+-- forecasts per series any more, so migration 002's index goes too.
+CREATE INDEX IF NOT EXISTS idx_forecasting_run_demand
+    ON forecasting_results (timestamp, predicted_demand DESC);
+DROP INDEX IF EXISTS idx_forecasting_timestamp;
+DROP INDEX IF EXISTS idx_forecasting_location_product_timestamp;
@@ -0,0 +1,4 @@
+-- Dashboard order counts and totals filter orders by time window, overall
+-- and per location.
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_location_created_at ON orders (location_id, created_at);
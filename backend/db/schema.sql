@@ -57,19 +57,35 @@ CREATE TABLE inventory (
     location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
     product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
     quantity INT NOT NULL CHECK (quantity >= 0),
-    last_updated TIMESTAMP DEFAULT NOW()
+    last_updated TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_inventory_location_product UNIQUE (location_id, product_id)
+);
+
+-- Inventory Lots Table (Received batches with expiry; inventory holds the totals)
+CREATE TABLE inventory_lots (
+    lot_id SERIAL PRIMARY KEY,
+    location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    received_at TIMESTAMP DEFAULT NOW(),
+    expires_on DATE
 );
 
 -- Sales Table (Transaction Log)
+-- Range-partitioned by month on timestamp (sales_pYYYYMM); rows outside the
+-- created months land in sales_default. `python manage.py maintain-partitions`
+-- creates months ahead and archives old ones.
 CREATE TABLE sales (
-    sale_id SERIAL PRIMARY KEY,
+    sale_id SERIAL,
     location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
     product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
     customer_id INT REFERENCES customers(customer_id) ON DELETE SET NULL,
     quantity INT NOT NULL CHECK (quantity > 0),
     total_price DECIMAL(10,2) NOT NULL CHECK (total_price >= 0),
-    timestamp TIMESTAMP DEFAULT NOW()
-);
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (sale_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+CREATE TABLE sales_default PARTITION OF sales DEFAULT;
 
 -- Orders Table (Purchase Orders from Suppliers)
 CREATE TABLE orders (
@@ -99,26 +115,43 @@ CREATE TABLE stock_transfers (
     timestamp TIMESTAMP DEFAULT NOW()
 );
 -- Inventory Logs Table (For Tracking Changes Over Time)
+-- Partitioned by month like sales.
 CREATE TABLE inventory_logs (
-    log_id SERIAL PRIMARY KEY,
+    log_id SERIAL,
     location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
     product_id INT REFERENCES products(product_id) ON DELETE CASCADE,
     quantity_change INT NOT NULL,
     reason TEXT NOT NULL,
-    timestamp TIMESTAMP DEFAULT NOW()
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (log_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+CREATE TABLE inventory_logs_default PARTITION OF inventory_logs DEFAULT;
+
+-- Inventory Checkpoints (quantity per line at a point in time)
+-- Snapshots of `inventory` taken by `python manage.py checkpoint-inventory`;
+-- stock as of any moment is the nearest checkpoint plus the inventory_logs
+-- deltas between the two. Lines at zero are left out.
+CREATE TABLE inventory_checkpoints (
+    checkpoint_at TIMESTAMP NOT NULL,
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INT NOT NULL,
+    PRIMARY KEY (checkpoint_at, location_id, product_id)
 );
 
 -- Sales Aggregates Table (OLAP View for Reporting)
+-- One bucket per (location, product, day), upserted by create_sale and
+-- rebuilt in bulk by `python manage.py rebuild-rollups`.
 CREATE TABLE sales_aggregates (
-    location_id INT REFERENCES locations(location_id) ON DELETE CASCADE,
-    product_id INT REFERENCES products(product_id) ON DELETE CASCADE NULL,
-    daily_sales INT DEFAULT 0,
-    weekly_sales INT DEFAULT 0,
-    monthly_sales INT DEFAULT 0
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    sale_date DATE NOT NULL,
+    units_sold INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12,2) NOT NULL DEFAULT 0,
+    sale_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_id, product_id, sale_date)
 );
 
-ALTER TABLE sales_aggregates ALTER COLUMN product_id DROP NOT NULL;
-
 
 -- Forecasting Results Table (AI-Powered Demand Prediction)
 CREATE TABLE forecasting_results (
@@ -140,9 +173,106 @@ CREATE TABLE wastage_records (
     timestamp TIMESTAMP DEFAULT NOW()
 );
 
+-- Wastage Aggregates (daily wastage per location, product and reason)
+-- Upserted by the wastage ingest alongside wastage_records and rebuilt in
+-- bulk by `python manage.py rebuild-rollups`; waste rates read only these.
+CREATE TABLE wastage_aggregates (
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    waste_date DATE NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    record_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_id, product_id, reason, waste_date)
+);
+
+-- Spoilage Risk (expected spoilage per inventory line)
+-- Replaced as a whole by the refresh-spoilage-risk job.
+CREATE TABLE spoilage_risk (
+    location_id INT NOT NULL REFERENCES locations(location_id) ON DELETE CASCADE,
+    product_id INT NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    on_hand INT NOT NULL,
+    daily_velocity DOUBLE PRECISION NOT NULL,
+    days_of_cover DOUBLE PRECISION,
+    next_expiry DATE NOT NULL,
+    at_risk_units INT NOT NULL,
+    at_risk_value DECIMAL(12,2) NOT NULL,
+    risk_score DOUBLE PRECISION NOT NULL,
+    computed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (location_id, product_id)
+);
+
+-- Live Events (order/sale deltas pushed to /api/events/ws)
+-- Short-lived: kept so reconnecting clients can resume from an event id,
+-- pruned after LIVE_EVENTS_RETENTION_HOURS.
+CREATE TABLE live_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    location_id INT,
+    region_id INT,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Scheduled Jobs (api.scheduler)
+-- One lease row per job: a worker runs a job only after claiming its row,
+-- so several API workers never run the same job twice.
+CREATE TABLE job_leases (
+    job_name VARCHAR(100) PRIMARY KEY,
+    next_run_at TIMESTAMP NOT NULL,
+    leased_by VARCHAR(255),
+    leased_until TIMESTAMP
+);
+
+-- Job Runs (history served at /api/jobs/runs)
+CREATE TABLE job_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL,
+    worker VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_ms DOUBLE PRECISION,
+    result JSONB,
+    error TEXT
+);
+
 -- Indexes for Performance Optimization
-CREATE INDEX idx_inventory_location_product ON inventory (location_id, product_id);
 CREATE INDEX idx_sales_timestamp ON sales (timestamp);
+CREATE INDEX idx_inventory_logs_timestamp ON inventory_logs (timestamp);
+CREATE INDEX idx_inventory_logs_location_timestamp ON inventory_logs (location_id, timestamp);
 CREATE INDEX idx_orders_status ON orders (status);
-CREATE INDEX idx_forecasting_timestamp ON forecasting_results (timestamp);
 CREATE INDEX idx_wastage_timestamp ON wastage_records (timestamp);
+
+-- Dashboard rollups filter every aggregate by (location, time window)
+CREATE INDEX idx_sales_location_timestamp ON sales (location_id, timestamp);
+CREATE INDEX idx_orders_created_at ON orders (created_at);
+CREATE INDEX idx_orders_location_created_at ON orders (location_id, created_at);
+CREATE INDEX idx_sales_aggregates_date ON sales_aggregates (sale_date);
+-- Newest run (max timestamp), its rows by predicted demand, and pruning of old runs
+CREATE INDEX idx_forecasting_run_demand ON forecasting_results (timestamp, predicted_demand DESC);
+
+-- Reorder scans sum open order lines per (location, product)
+CREATE INDEX idx_order_items_order ON order_items (order_id);
+CREATE INDEX idx_orders_open_location ON orders (location_id, order_id) WHERE status IN ('Pending', 'Shipped');
+
+-- Lots: FEFO depletion per (location, product), and near-expiry range scans.
+-- Empty lots stay for history but drop out of every index.
+CREATE INDEX idx_inventory_lots_fefo ON inventory_lots (location_id, product_id, expires_on, lot_id) WHERE quantity > 0;
+CREATE INDEX idx_inventory_lots_location_expiry ON inventory_lots (location_id, expires_on) WHERE quantity > 0;
+CREATE INDEX idx_inventory_lots_expiry ON inventory_lots (expires_on) WHERE quantity > 0;
+
+-- Live event replay scans ids after a cursor; pruning goes by age
+CREATE INDEX idx_live_events_created_at ON live_events (created_at);
+
+-- Job history is read per job, newest first
+CREATE INDEX idx_job_runs_job_started ON job_runs (job_name, started_at DESC);
+CREATE INDEX idx_job_runs_started ON job_runs (started_at);
+
+-- Wastage: rates scan the buckets by day; record lists filter by store
+CREATE INDEX idx_wastage_aggregates_date ON wastage_aggregates (waste_date);
+CREATE INDEX idx_wastage_location_timestamp ON wastage_records (location_id, timestamp);
+
+-- At-risk stock is read riskiest first, chain-wide or per store
+CREATE INDEX idx_spoilage_risk_score ON spoilage_risk (risk_score DESC) WHERE at_risk_units > 0;
+CREATE INDEX idx_spoilage_risk_location_score ON spoilage_risk (location_id, risk_score DESC) WHERE at_risk_units > 0;
@@ -127,6 +127,21 @@ for location_id in location_ids:
             (location_id, product_id, random.randint(10, 500), fake.date_time_this_year()),
         )
 
+# 📦 One lot per inventory line, expiring after the product's shelf life
+cur.execute(
+    """
+    INSERT INTO inventory_lots (location_id, product_id, quantity, received_at, expires_on)
+    SELECT i.location_id, i.product_id, i.quantity, COALESCE(i.last_updated, NOW()),
+           (COALESCE(i.last_updated, NOW()) + make_interval(days => p.shelf_life_days))::date
+    FROM inventory i
+    JOIN products p ON p.product_id = i.product_id
+    WHERE i.quantity > 0
+      AND NOT EXISTS (
+          SELECT 1 FROM inventory_lots l WHERE l.location_id = i.location_id AND l.product_id = i.product_id
+      );
+    """
+)
+
 # 👥 Generate Customers
 customer_ids = []
 for _ in range(20):
@@ -193,33 +208,32 @@ for _ in range(15):
         ),
     )
 
-# 📊 Generate NOI and Revenue Metrics
-for location_id in location_ids:
-    revenue = round(random.uniform(100000, 500000), 2)  # Random revenue range
-    noi = round(revenue * random.uniform(0.1, 0.3), 2)  # NOI is usually 10-30% of revenue
-    cur.execute(
-        "INSERT INTO sales_aggregates (location_id, product_id, daily_sales, weekly_sales, monthly_sales) VALUES (%s, %s, %s, %s, %s);",
-        (
-            location_id,
-            random.choice(product_ids) if product_ids else None,  # Some entries without product_id
-            int(revenue / 30),
-            int(revenue / 4),
-            int(revenue),
-        ),
-    )
+# 📊 Roll the generated sales up into their daily sales_aggregates buckets
+cur.execute(
+    """
+    INSERT INTO sales_aggregates (location_id, product_id, sale_date, units_sold, revenue, sale_count)
+    SELECT location_id, product_id, timestamp::date, SUM(quantity), SUM(total_price), COUNT(*)
+    FROM sales
+    GROUP BY location_id, product_id, timestamp::date
+    ON CONFLICT (location_id, product_id, sale_date) DO UPDATE
+    SET units_sold = EXCLUDED.units_sold, revenue = EXCLUDED.revenue, sale_count = EXCLUDED.sale_count;
+    """
+)
 
-# 🤖 Mock Forecasting: AI-Driven Demand Predictions
-for _ in range(50):
-    cur.execute(
-        "INSERT INTO forecasting_results (location_id, product_id, predicted_demand, confidence_level, timestamp) VALUES (%s, %s, %s, %s, %s);",
-        (
-            random.choice(location_ids),
-            random.choice(product_ids) if product_ids else None,
-            random.randint(50, 300),
-            round(random.uniform(0.7, 0.95), 2),
-            fake.date_time_this_month(),
-        ),
-    )
+# 🗑 ... and the wastage records into their wastage_aggregates buckets
+cur.execute(
+    """
+    INSERT INTO wastage_aggregates (location_id, product_id, reason, waste_date, quantity, record_count)
+    SELECT location_id, product_id, reason, timestamp::date, SUM(quantity), COUNT(*)
+    FROM wastage_records
+    WHERE product_id IS NOT NULL
+    GROUP BY location_id, product_id, reason, timestamp::date
+    ON CONFLICT (location_id, product_id, reason, waste_date) DO UPDATE
+    SET quantity = EXCLUDED.quantity, record_count = EXCLUDED.record_count;
+    """
+)
+
+# 🤖 Demand forecasts are produced from these sales by `python manage.py run-forecast`
 
 # 📢 Generate Mock "Time for a Sale!" Alerts (Proactive Pricing Insights)
 for _ in range(20):
@@ -0,0 +1,191 @@
+"""Maintenance commands for the Grocery Inventory backend.
+
+Run from the backend directory, e.g.:
+
+    python manage.py rebuild-rollups --start 2025-01-01
+"""
+import argparse
+from datetime import date, datetime
+from pathlib import Path
+
+from api.database import SessionLocal
+
+
+def create_tables(args):
+    from api import models  # noqa: F401  (registers every table on Base.metadata)
+    from api.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    print(f"✅ Created missing tables on {engine.url.render_as_string(hide_password=True)}")
+
+
+def rebuild_rollups(args):
+    from api.services import rollups, wastage
+
+    db = SessionLocal()
+    try:
+        count = rollups.rebuild(db, args.start, args.end)
+        wastage_count = wastage.rebuild(db, args.start, args.end)
+    finally:
+        db.close()
+    print(f"✅ Rebuilt {count} sales_aggregates buckets and {wastage_count} wastage_aggregates buckets")
+
+
+def run_forecast(args):
+    from api.services import forecasting
+
+    # Same bounds as POST /api/forecasts/run
+    if args.horizon < 1:
+        raise SystemExit("❌ --horizon must be at least 1")
+    if args.history_days < forecasting.SEASON:
+        raise SystemExit(f"❌ --history-days must be at least {forecasting.SEASON} (one week)")
+
+    db = SessionLocal()
+    try:
+        result = forecasting.run(db, horizon=args.horizon, history_days=args.history_days, method=args.method)
+    finally:
+        db.close()
+    print(f"✅ Forecast {result['series']} series ({result['method']}, {result['horizon']}-day horizon)")
+
+
+def run_reorder(args):
+    from api.services import reorder
+
+    db = SessionLocal()
+    try:
+        result = reorder.run(
+            db, region_id=args.region_id, location_id=args.location_id,
+            target_multiple=args.target_multiple, dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+    verb = "Would create" if args.dry_run else "Created"
+    print(f"✅ {verb} {len(result['orders'])} orders ({result['lines']} lines, {result['units']} units)")
+
+
+def maintain_partitions(args):
+    from api.services import partitions
+
+    db = SessionLocal()
+    try:
+        if not any(partitions.is_partitioned(db, table) for table in partitions.PARTITIONED_TABLES):
+            print(f"Nothing to do: {', '.join(partitions.PARTITIONED_TABLES)} are not partitioned on this database")
+            return
+        created = partitions.ensure(db, months_ahead=args.months_ahead)
+        archived = []
+        if args.retain_months is not None:
+            archive_dir = None if args.detach_only else args.archive_dir
+            archived = partitions.archive(db, args.retain_months, archive_dir)
+    finally:
+        db.close()
+    print(f"✅ Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+    for entry in archived:
+        where = f"archived to {entry['file']}" if entry["file"] else "detached"
+        print(f"✅ {entry['partition']}: {entry['rows']} rows {where}")
+
+
+def checkpoint_inventory(args):
+    from api.services import inventory_history
+
+    db = SessionLocal()
+    try:
+        result = inventory_history.checkpoint(db)
+    finally:
+        db.close()
+    print(f"✅ Checkpointed {result['lines']} inventory lines at {result['checkpoint_at']:%Y-%m-%d %H:%M:%S}")
+
+
+def compact_inventory_logs(args):
+    from api.services import inventory_history
+
+    before = datetime.combine(args.before, datetime.min.time())
+    db = SessionLocal()
+    try:
+        result = inventory_history.compact_logs(db, before)
+    finally:
+        db.close()
+    print(f"✅ Compacted {result['removed']} inventory_logs rows into {result['written']} daily rows before {args.before}")
+
+
+def run_job(args):
+    from api.jobs import scheduler
+
+    result = scheduler.run_now(args.name)
+    if result is None:
+        print(f"Not run: {args.name} is running on another worker")
+    elif result["error"]:
+        print(f"❌ {args.name} failed after {result['duration_ms']:.0f} ms (run {result['run_id']})\n{result['error']}")
+        raise SystemExit(1)
+    else:
+        print(f"✅ {args.name} finished in {result['duration_ms']:.0f} ms (run {result['run_id']}): {result['result']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser(
+        "create-tables", help="Create tables from the ORM models (for SQLite or scratch Postgres stand-ins)"
+    )
+    create.set_defaults(handler=create_tables)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="Recompute sales_aggregates and wastage_aggregates buckets from the raw rows")
+    rebuild.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (default: all history)")
+    rebuild.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (default: all history)")
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    forecast = commands.add_parser("run-forecast", help="Forecast demand for every (location, product) series")
+    forecast.add_argument("--horizon", type=int, default=7, help="Days ahead to forecast (default: 7)")
+    forecast.add_argument("--history-days", type=int, default=56, help="Days of history to fit (default: 56)")
+    forecast.add_argument("--method", choices=["auto", "ses", "seasonal_naive"], default="auto")
+    forecast.set_defaults(handler=run_forecast)
+
+    reorder = commands.add_parser(
+        "run-reorder", help="Create purchase orders for inventory below its reorder point (run from cron)"
+    )
+    reorder.add_argument("--region-id", type=int)
+    reorder.add_argument("--location-id", type=int)
+    reorder.add_argument("--target-multiple", type=float, default=2.0,
+                         help="Order up to this many times the reorder point (default: 2)")
+    reorder.add_argument("--dry-run", action="store_true", help="Only report what would be ordered")
+    reorder.set_defaults(handler=run_reorder)
+
+    maintain = commands.add_parser(
+        "maintain-partitions",
+        help="Create upcoming monthly partitions of sales/inventory_logs and archive old ones (run from cron)",
+    )
+    maintain.add_argument("--months-ahead", type=int, default=3,
+                          help="Create partitions this many months past the current one (default: 3)")
+    maintain.add_argument("--retain-months", type=int,
+                          help="Archive months older than this many months back (default: keep everything)")
+    maintain.add_argument("--archive-dir", type=Path, default=Path("archive"),
+                          help="Where archived months are written as <partition>.csv.gz (default: ./archive)")
+    maintain.add_argument("--detach-only", action="store_true",
+                          help="Detach old months but keep them as standalone tables instead of exporting them")
+    maintain.set_defaults(handler=maintain_partitions)
+
+    checkpoint = commands.add_parser(
+        "checkpoint-inventory", help="Snapshot every inventory line for as-of queries (run daily or weekly from cron)"
+    )
+    checkpoint.set_defaults(handler=checkpoint_inventory)
+
+    compact = commands.add_parser(
+        "compact-inventory-logs", help="Fold inventory_logs rows before a date into one net row per line per day"
+    )
+    compact.add_argument("--before", type=date.fromisoformat, required=True, help="Compact rows before this day")
+    compact.set_defaults(handler=compact_inventory_logs)
+
+    from api.jobs import scheduler
+
+    job = commands.add_parser(
+        "run-job", help="Run one scheduled job now, recorded in job_runs like a scheduled run (see /api/jobs)"
+    )
+    job.add_argument("name", choices=sorted(scheduler.jobs))
+    job.set_defaults(handler=run_job)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,21 @@ const ordersApi = axios.create({
   headers: { "Content-Type": "application/json" },
 });
 
+const dashboardApi = axios.create({
+  baseURL: `${API_BASE_URL}/dashboard`,
+  headers: { "Content-Type": "application/json" },
+});
+
+const forecastsApi = axios.create({
+  baseURL: `${API_BASE_URL}/forecasts`,
+  headers: { "Content-Type": "application/json" },
+});
+
+const pricingApi = axios.create({
+  baseURL: `${API_BASE_URL}/pricing`,
+  headers: { "Content-Type": "application/json" },
+});
+
 // ✅ Helper function to attach filter params safely
 const withFilters = (regionId, locationId) => {
   const params = {};
@@ -69,6 +84,20 @@ const safeGet = async (axiosInstance, url, config = {}) => {
   }
 };
 
+// ✅ Fetch a single JSON object (aggregate endpoints), returning null on failure
+const safeGetObject = async (axiosInstance, url, config = {}) => {
+  try {
+    const response = await axiosInstance.get(url, config);
+    return response.data;
+  } catch (error) {
+    console.error(
+      `❌ Error fetching ${url}:`,
+      error.response ? error.response.data : error.message
+    );
+    return null;
+  }
+};
+
 // ✅ API calls for each endpoint using their dedicated axios instances
 
 // Suppliers endpoints (GET)
@@ -95,6 +124,27 @@ export const getSales = (regionId = null, locationId = null) =>
 export const getOrders = (regionId = null, locationId = null) =>
   safeGet(ordersApi, "/", withFilters(regionId, locationId));
 
+// Dashboard aggregate endpoints (GET) with optional filters
+export const getDashboardSummary = (regionId = null, locationId = null) =>
+  safeGetObject(dashboardApi, "/summary", withFilters(regionId, locationId));
+
+export const getDashboardOrdersByStatus = (regionId = null, locationId = null) =>
+  safeGet(dashboardApi, "/summary/orders-by-status", withFilters(regionId, locationId));
+
+export const getDashboardStockAlerts = (regionId = null, locationId = null) =>
+  safeGetObject(dashboardApi, "/summary/stock-alerts", withFilters(regionId, locationId));
+
+export const getDashboardRecentOrders = (regionId = null, locationId = null) =>
+  safeGet(dashboardApi, "/summary/recent-orders", withFilters(regionId, locationId));
+
+// Forecast endpoints (GET): latest forecast per location/product
+export const getForecasts = (regionId = null, locationId = null) =>
+  safeGet(forecastsApi, "/", withFilters(regionId, locationId));
+
+// Pricing endpoints (GET): per-location recommendations computed server-side
+export const getPricingRecommendations = (regionId = null, locationId = null) =>
+  safeGet(pricingApi, "/recommendations", withFilters(regionId, locationId));
+
 // Orders endpoints (POST)
 export const createOrder = async (data) => {
   try {
@@ -140,6 +190,46 @@ export const updateInventory = async (data) => {
   }
 };
 
+// ✅ Live order/sale events over a WebSocket, filtered like the list endpoints.
+// Reconnects after a drop and resumes from the last event id it saw; a
+// "resync" event means the gap couldn't be replayed and data should be refetched.
+export const subscribeLiveEvents = ({ regionId = null, locationId = null, types = [] }, onEvent) => {
+  let socket = null;
+  let lastEventId = null;
+  let retryDelay = 1000;
+  let closed = false;
+
+  const connect = () => {
+    const params = new URLSearchParams();
+    if (regionId) params.set("region_id", regionId);
+    if (locationId) params.set("location_id", locationId);
+    if (types.length) params.set("types", types.join(","));
+    if (lastEventId !== null) params.set("last_event_id", lastEventId);
+
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    socket = new WebSocket(`${protocol}://${window.location.host}${API_BASE_URL}/events/ws?${params}`);
+    socket.onopen = () => {
+      retryDelay = 1000;
+    };
+    socket.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      if (event.id) lastEventId = event.id;
+      onEvent(event);
+    };
+    socket.onclose = () => {
+      if (closed) return;
+      setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    if (socket) socket.close();
+  };
+};
+
 export default {
   getSuppliers,
   getLocations,
@@ -148,7 +238,14 @@ export default {
   getInventory,
   getSales,
   getOrders,
+  getDashboardSummary,
+  getDashboardOrdersByStatus,
+  getDashboardStockAlerts,
+  getDashboardRecentOrders,
+  getForecasts,
+  getPricingRecommendations,
   createOrder,
   createSale,
   updateInventory,
+  subscribeLiveEvents,
 };
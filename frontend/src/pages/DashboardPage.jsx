@@ -1,5 +1,11 @@
 import React, { useEffect, useState } from "react";
-import { getOrders, getSales, getInventory } from "../api/api";
+import {
+  getDashboardSummary,
+  getDashboardOrdersByStatus,
+  getDashboardStockAlerts,
+  getDashboardRecentOrders,
+  subscribeLiveEvents,
+} from "../api/api";
 import {
   ResponsiveContainer,
   XAxis,
@@ -19,70 +25,59 @@ import { useFilters } from "../context/FilterContext";
 const { Title } = Typography;
 
 const DashboardPage = () => {
-  const [orders, setOrders] = useState([]);
-  const [sales, setSales] = useState([]);
-  const [inventory, setInventory] = useState([]);
+  const [summary, setSummary] = useState(null);
+  const [orderStatusData, setOrderStatusData] = useState([]);
+  const [stockAlerts, setStockAlerts] = useState({ low_stock: [], overstocked: [] });
   const [liveOrders, setLiveOrders] = useState([]);
   const [lastDayOrders, setLastDayOrders] = useState([]);
   const [ordersModalVisible, setOrdersModalVisible] = useState(false);
   const { selectedRegion, selectedLocation } = useFilters();
 
   useEffect(() => {
-    // Fetch Orders
-    getOrders(selectedRegion, selectedLocation)
-      .then((data) => {
-        console.log("Fetched Orders Data:", data);
-        if (!Array.isArray(data)) {
-          console.error("⚠️ Data is not an array!", data);
-          return;
-        }
-        setOrders(data);
-
-        // Orders in the last 72 hours
-        const seventyTwoHoursAgo = new Date().getTime() - 72 * 60 * 60 * 1000;
-        const recentOrders = data.filter(
-          (order) => new Date(order.created_at).getTime() > seventyTwoHoursAgo
-        );
-        setLastDayOrders(recentOrders);
-      })
-      .catch((err) => console.error("Error fetching orders:", err));
-
-    // Fetch Sales
-    getSales(selectedRegion, selectedLocation)
-      .then((data) => {
-        setSales(Array.isArray(data) ? data : [data]);
-      })
-      .catch((err) => console.error("Error fetching sales:", err));
-
-    // Fetch Inventory
-    getInventory(selectedRegion, selectedLocation)
-      .then((data) => {
-        setInventory(Array.isArray(data) ? data : [data]);
-      })
-      .catch((err) => console.error("Error fetching inventory:", err));
-
-    // Live Orders Data (Mock Stream)
-    const interval = setInterval(() => {
-      setLiveOrders((prevOrders) => [
-        ...prevOrders,
-        { timestamp: new Date().toLocaleTimeString(), count: prevOrders.length + 1 },
-      ]);
-    }, 5000);
-
-    return () => clearInterval(interval);
+    // ✅ Headline numbers are aggregated server-side
+    getDashboardSummary(selectedRegion, selectedLocation)
+      .then((data) => setSummary(data))
+      .catch((err) => console.error("Error fetching dashboard summary:", err));
+
+    // Orders by status per day
+    getDashboardOrdersByStatus(selectedRegion, selectedLocation)
+      .then((data) => setOrderStatusData(Array.isArray(data) ? data : []))
+      .catch((err) => console.error("Error fetching orders by status:", err));
+
+    // Low / overstock lists
+    getDashboardStockAlerts(selectedRegion, selectedLocation)
+      .then((data) => setStockAlerts(data || { low_stock: [], overstocked: [] }))
+      .catch((err) => console.error("Error fetching stock alerts:", err));
+
+    // Orders in the last 72 hours (for the modal)
+    getDashboardRecentOrders(selectedRegion, selectedLocation)
+      .then((data) => setLastDayOrders(Array.isArray(data) ? data : []))
+      .catch((err) => console.error("Error fetching recent orders:", err));
+
+    // ✅ Live Orders: new orders pushed by the server, counted per minute
+    setLiveOrders([]);
+    const unsubscribe = subscribeLiveEvents(
+      { regionId: selectedRegion, locationId: selectedLocation, types: ["order_created"] },
+      (event) => {
+        if (event.type !== "order_created") return;
+        const minute = new Date(event.at + "Z").toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" });
+        setLiveOrders((prevOrders) => {
+          const last = prevOrders[prevOrders.length - 1];
+          if (last && last.timestamp === minute) {
+            return [...prevOrders.slice(0, -1), { timestamp: minute, count: last.count + 1 }];
+          }
+          return [...prevOrders, { timestamp: minute, count: 1 }].slice(-60);
+        });
+      }
+    );
+
+    return unsubscribe;
   }, [selectedRegion, selectedLocation]);
 
-  // Orders by Status Over Time (using created_at for date)
-  const orderStatusData = orders.map((order) => ({
-    date: order.created_at ? new Date(order.created_at).toLocaleDateString() : "Unknown",
-    Pending: order.status === "Pending" ? 1 : 0,
-    Shipped: order.status === "Shipped" ? 1 : 0,
-    Delivered: order.status === "Delivered" ? 1 : 0,
-  }));
-
   // Sales Revenue & Average Order Value
-  const totalRevenue = sales.reduce((acc, sale) => acc + sale.total_price, 0);
-  const avgOrderValue = sales.length > 0 ? (totalRevenue / sales.length).toFixed(2) : 0;
+  const totalRevenue = summary ? summary.total_revenue : 0;
+  const avgOrderValue = summary ? summary.avg_order_value.toFixed(2) : 0;
+  const recentOrderCount = summary ? summary.recent_orders : lastDayOrders.length;
 
   // Additional Metric: Net Operating Income (NOI)
   const fixedOperatingExpense = .3; // For prototype purposes
@@ -92,20 +87,16 @@ const DashboardPage = () => {
   const momRevenueGrowth = ((Math.random() * 20) - 10).toFixed(2);
 
   // Overstocked Products: items with quantity > 400
-  const overstockedProducts = inventory
-    .filter((item) => item.quantity > 400)
-    .map((item) => ({
-      name: `Product ${item.product_id}`,
-      quantity: item.quantity,
-    }));
+  const overstockedProducts = stockAlerts.overstocked.map((item) => ({
+    name: item.product_name || `Product ${item.product_id}`,
+    quantity: item.quantity,
+  }));
 
   // Low Stock Products: items with quantity < 20
-  const lowStockProducts = inventory
-    .filter((item) => item.quantity < 20)
-    .map((item) => ({
-      name: `Product ${item.product_id}`,
-      quantity: item.quantity,
-    }));
+  const lowStockProducts = stockAlerts.low_stock.map((item) => ({
+    name: item.product_name || `Product ${item.product_id}`,
+    quantity: item.quantity,
+  }));
 
   // Define columns for the modal table displaying orders processed in the last 72 hours
   const ordersModalColumns = [
@@ -156,7 +147,7 @@ const DashboardPage = () => {
       <Card title="📦 Orders Processed (Last 72 Hours)">
         <div style={{ textAlign: "center" }}>
           <h2 style={{ fontSize: "48px", fontWeight: "bold", margin: "20px 0" }}>
-            {lastDayOrders.length}
+            {recentOrderCount}
           </h2>
           <p>Total orders in the last 72 hours</p>
           <Button type="primary" onClick={() => setOrdersModalVisible(true)}>
@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 import { useQuery } from "@tanstack/react-query";
-import { getInventory, getSales } from "../api/api";
+import { getPricingRecommendations } from "../api/api";
 import { Table, Card, Select, Row, Col } from "antd";
 import { useFilters } from "../context/FilterContext";
 
@@ -10,59 +10,17 @@ const PricingAdjustmentsPage = () => {
   const [filterType, setFilterType] = useState("All");
   const { selectedRegion, selectedLocation } = useFilters();
 
-  // Fetch inventory data using the current filters
-  const { data: inventory = [] } = useQuery({
-    queryKey: ["inventory", selectedRegion, selectedLocation],
+  // ✅ Velocity, days of cover and recommendations are computed per location on the server
+  const { data: recommendations = [] } = useQuery({
+    queryKey: ["pricing-recommendations", selectedRegion, selectedLocation],
     queryFn: async () => {
-      const data = await getInventory(selectedRegion, selectedLocation);
-      return Array.isArray(data) ? data : [];
+      const data = await getPricingRecommendations(selectedRegion, selectedLocation);
+      return Array.isArray(data)
+        ? data.map((item) => ({ ...item, key: `${item.product_id}-${item.location_id}` }))
+        : [];
     },
   });
 
-  // Fetch sales data using the current filters
-  const { data: sales = [] } = useQuery({
-    queryKey: ["sales", selectedRegion, selectedLocation],
-    queryFn: async () => {
-      const data = await getSales(selectedRegion, selectedLocation);
-      return Array.isArray(data) ? data : [];
-    },
-  });
-
-  // Aggregate sales by product_id (summing across all locations)
-  const salesByProduct = {};
-  sales.forEach((sale) => {
-    const productId = sale.product_id;
-    const qty = sale.quantity || 0;
-    salesByProduct[productId] = (salesByProduct[productId] || 0) + qty;
-  });
-
-  // Combine inventory with sales and generate recommendations (including location info)
-  const recommendations = inventory.map((item) => {
-    const productId = item.product_id;
-    const productName = item.product_name;
-    const availableStock = item.quantity;
-    const location = item.location_name; // include location info
-    const salesCount = salesByProduct[productId] || 0;
-    let recommendation = "Maintain Price";
-
-    // Simple mock logic:
-    if (availableStock > 300 && salesCount < 10) {
-      recommendation = "Reduce Price";
-    } else if (availableStock < 50 && salesCount > 20) {
-      recommendation = "Increase Price";
-    }
-
-    return {
-      key: `${productId}-${item.location_id}`, // Unique key per product-location
-      product_id: productId,
-      product_name: productName,
-      location, // include location in the row
-      inventory: availableStock,
-      salesCount,
-      recommendation,
-    };
-  });
-
   // Filter recommendations based on the selected recommendation filter
   const filteredRecommendations = recommendations.filter((item) => {
     return filterType === "All" ? true : item.recommendation === filterType;
@@ -72,10 +30,23 @@ const PricingAdjustmentsPage = () => {
   const columns = [
     { title: "Product ID", dataIndex: "product_id", key: "product_id" },
     { title: "Product Name", dataIndex: "product_name", key: "product_name" },
-    { title: "Location", dataIndex: "location", key: "location" },
+    { title: "Location", dataIndex: "location_name", key: "location_name" },
     { title: "Inventory", dataIndex: "inventory", key: "inventory" },
-    { title: "Sales (Recent)", dataIndex: "salesCount", key: "salesCount" },
+    { title: "Sales (Recent)", dataIndex: "units_sold", key: "units_sold" },
+    {
+      title: "Days of Cover",
+      dataIndex: "days_of_cover",
+      key: "days_of_cover",
+      render: (value) => (value === null || value === undefined ? "∞" : value),
+    },
+    { title: "Shelf Life (Days)", dataIndex: "shelf_life_days", key: "shelf_life_days" },
     { title: "Recommendation", dataIndex: "recommendation", key: "recommendation" },
+    {
+      title: "Suggested Change",
+      dataIndex: "suggested_price_change_pct",
+      key: "suggested_price_change_pct",
+      render: (value) => (value ? `${value > 0 ? "+" : ""}${value}%` : "—"),
+    },
   ];
 
   return (